@@ -0,0 +1,227 @@
+# benchmarks/fakes.py
+"""Stand-ins for the discord.py objects the cogs touch, with every REST call counted."""
+import asyncio
+import datetime
+from bisect import bisect_left, bisect_right
+from collections import Counter
+import discord
+
+PAGE_SIZE = 100
+
+
+class RestCounter:
+    def __init__(self):
+        self.routes = Counter()
+
+    def hit(self, route):
+        self.routes[route] += 1
+
+    @property
+    def total(self):
+        return sum(self.routes.values())
+
+
+def snowflake_id(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return discord.utils.time_snowflake(value)
+    return value.id
+
+
+class FakeUser:
+    def __init__(self, user_id, bot=False, guild=None):
+        self.id = user_id
+        self.bot = bot
+        self.guild = guild
+        self.name = f'user{user_id}'
+        self.display_name = self.name
+        self.avatar = self.display_avatar = self.default_avatar = _FakeAsset()
+        self.created_at = discord.utils.snowflake_time(user_id)
+        self.joined_at = discord.utils.utcnow()
+        self.mention = f'<@{user_id}>'
+
+    def __str__(self):
+        return self.name
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class _FakeAsset:
+    url = 'https://cdn.discordapp.com/embed/avatars/0.png'
+
+
+class FakeMessage:
+    __slots__ = ('id', 'author', 'channel', 'guild', 'content', 'created_at', 'edited_at', 'jump_url')
+
+    def __init__(self, message_id, author, channel, content):
+        self.id = message_id
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.created_at = discord.utils.snowflake_time(message_id)
+        self.edited_at = None
+        self.jump_url = f'https://discord.com/channels/{channel.guild.id}/{channel.id}/{message_id}'
+
+
+class FakeWebhook:
+    def __init__(self, rest, name, user):
+        self.rest = rest
+        self.name = name
+        self.user = user
+
+    async def send(self, **kwargs):
+        self.rest.hit('webhook.send')
+
+
+class FakeTextChannel:
+    """A channel whose history is generated on the fly from sorted message IDs and author indices.
+
+    Every page of up to 100 messages counts as one REST call and waits ``latency`` seconds.
+    """
+
+    def __init__(self, guild, channel_id, name, message_ids, author_indices, rest, latency=0.0):
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.mention = f'<#{channel_id}>'
+        self.created_at = discord.utils.snowflake_time(channel_id)
+        self.message_ids = message_ids
+        self.author_indices = author_indices
+        self.rest = rest
+        self.latency = latency
+        self.sent = []
+        self.hooks = []
+
+    def message(self, position):
+        author = self.guild.authors[self.author_indices[position]]
+        return FakeMessage(self.message_ids[position], author, self, 'x' * (self.message_ids[position] % 200))
+
+    async def history(self, limit=100, before=None, after=None, oldest_first=None):
+        before, after = snowflake_id(before), snowflake_id(after)
+        lo = bisect_right(self.message_ids, after) if after is not None else 0
+        hi = bisect_left(self.message_ids, before) if before is not None else len(self.message_ids)
+        if oldest_first is None:
+            oldest_first = after is not None
+        positions = range(lo, hi) if oldest_first else range(hi - 1, lo - 1, -1)
+        if limit is not None:
+            positions = positions[:limit]
+        for count, position in enumerate(positions):
+            if count % PAGE_SIZE == 0:
+                self.rest.hit('channel.history')
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+            yield self.message(position)
+
+    def permissions_for(self, member):
+        return discord.Permissions.all()
+
+    async def send(self, content=None, **kwargs):
+        self.rest.hit('channel.send')
+        self.sent.append((content, kwargs))
+
+    async def webhooks(self):
+        self.rest.hit('channel.webhooks')
+        return list(self.hooks)
+
+    async def create_webhook(self, name):
+        self.rest.hit('channel.create_webhook')
+        webhook = FakeWebhook(self.rest, name, self.guild.bot_user)
+        self.hooks.append(webhook)
+        return webhook
+
+
+class FakeRole:
+    def __init__(self, role_id, name, members, guild=None):
+        self.id = role_id
+        self.name = name
+        self.members = members
+        self.guild = guild
+
+
+class FakeMemberState:
+    """Just enough of discord.py's connection state to build real Member objects."""
+
+    def store_user(self, data, *, cache=True):
+        return discord.User(state=self, data=data)
+
+
+def member_payload(user_id, role_ids):
+    """A GUILD_MEMBER payload as the gateway or the REST API sends it."""
+    return {
+        'user': {'id': str(user_id), 'username': f'user{user_id}', 'discriminator': '0', 'avatar': None, 'global_name': None},
+        'roles': [str(role_id) for role_id in role_ids],
+        'joined_at': '2024-01-01T00:00:00+00:00',
+        'flags': 0,
+        'deaf': False,
+        'mute': False,
+    }
+
+
+class FakeGuild:
+    def __init__(self, guild_id, name, authors, bot_user):
+        self.id = guild_id
+        self.name = name
+        self.authors = authors
+        self.members = authors
+        self.member_count = len(authors)
+        self.bot_user = bot_user
+        self.me = bot_user
+        self.icon = _FakeAsset()
+        self.text_channels = []
+        self.created_at = discord.utils.snowflake_time(guild_id)
+        self.chunked = True
+        self.member_payloads = None  # callable returning member payloads, for chunk
+        self.rest = None
+        self._channels = {}
+        self._roles = {}
+
+    def add_channel(self, channel):
+        self.text_channels.append(channel)
+        self._channels[channel.id] = channel
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_member(self, user_id):
+        return None
+
+    def add_role(self, role):
+        self._roles[role.id] = role
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    async def chunk(self, *, cache=True):
+        # The whole member list arrives over the gateway, so no REST requests are counted
+        state = FakeMemberState()
+        return [discord.Member(data=payload, guild=self, state=state) for payload in self.member_payloads()]
+
+
+class FakeBot:
+    def __init__(self, guild, bot_user):
+        self.guild = guild
+        self.user = bot_user
+        self.guilds = [guild]
+
+    def get_channel(self, channel_id):
+        return self.guild.get_channel(channel_id)
+
+    def get_guild(self, guild_id):
+        return self.guild if guild_id == self.guild.id else None
+
+
+class FakeContext:
+    def __init__(self, bot, guild, channel, author):
+        self.bot = bot
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+
+    async def send(self, content=None, **kwargs):
+        await self.channel.send(content, **kwargs)
@@ -0,0 +1,57 @@
+# benchmarks/generator.py
+"""Builds a synthetic guild with skewed author and channel activity."""
+import random
+from array import array
+from itertools import accumulate
+import discord
+from benchmarks.fakes import FakeBot, FakeGuild, FakeRole, FakeTextChannel, FakeUser, RestCounter
+
+DAY_MS = 86400 * 1000
+
+
+def zipf_weights(count, skew):
+    """Weights where the n-th item is 1/n**skew as likely as the first; skew=0 is uniform."""
+    return list(accumulate(1 / (rank ** skew) for rank in range(1, count + 1)))
+
+
+def make_guild(
+    messages=10_000, channels=20, authors=500, author_skew=1.1, channel_skew=0.8,
+    days=730, latency=0.0, mods=30, seed=0,
+):
+    """Returns (bot, guild, mod_role, rest_counter) for a guild holding ``messages`` messages.
+
+    Channels and authors follow Zipf-like distributions, so a few channels and a few
+    members carry most of the traffic, as they do in real guilds.
+    """
+    rng = random.Random(seed)
+    rest = RestCounter()
+    end_ms = int(discord.utils.utcnow().timestamp() * 1000)
+    start_ms = end_ms - days * DAY_MS
+    epoch = discord.utils.DISCORD_EPOCH
+
+    bot_user = FakeUser((start_ms - epoch - DAY_MS) << 22, bot=True)
+    author_list = [FakeUser(((start_ms - epoch - DAY_MS) << 22) + index + 1) for index in range(authors)]
+    guild = FakeGuild((start_ms - epoch - 2 * DAY_MS) << 22, 'Benchmark Guild', author_list, bot_user)
+
+    channel_of = rng.choices(range(channels), cum_weights=zipf_weights(channels, channel_skew), k=messages)
+    author_of = rng.choices(range(authors), cum_weights=zipf_weights(authors, author_skew), k=messages)
+    per_channel = [[] for _ in range(channels)]
+    for channel_index, author_index in zip(channel_of, author_of):
+        created_ms = rng.randrange(start_ms, end_ms)
+        per_channel[channel_index].append((((created_ms - epoch) << 22) | rng.getrandbits(22), author_index))
+
+    for channel_index, rows in enumerate(per_channel):
+        rows.sort()
+        channel_id = ((start_ms - epoch - DAY_MS) << 22) + authors + channel_index + 1
+        channel = FakeTextChannel(
+            guild, channel_id, f'channel-{channel_index}',
+            array('q', (row[0] for row in rows)), array('l', (row[1] for row in rows)), rest, latency,
+        )
+        guild.add_channel(channel)
+        del rows[:]
+
+    mod_role = FakeRole(guild.id + 1, 'Moderators', author_list[:mods], guild)
+    guild.add_role(mod_role)
+    guild.rest = rest
+    return FakeBot(guild, bot_user), guild, mod_role, rest
+
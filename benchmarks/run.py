@@ -0,0 +1,292 @@
+# benchmarks/run.py
+"""Offline benchmarks for the stats and logging hot paths.
+
+    python -m benchmarks.run --messages 100000 --latency 0.05 --output bench_results.json
+
+Each scenario runs in its own process (so peak RSS is per scenario) inside a scratch
+directory, against a synthetic guild whose history() pages count as REST calls.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import discord
+from benchmarks.fakes import FakeContext, FakeMemberState, FakeTextChannel, FakeUser, member_payload
+from benchmarks.generator import make_guild
+from utils.options import parse_date
+
+SCENARIOS = {}
+
+
+def scenario(name, prepare_index=False):
+    def decorator(func):
+        SCENARIOS[name] = (func, prepare_index)
+        return func
+    return decorator
+
+
+def log_channel(guild, rest):
+    channel = FakeTextChannel(guild, guild.id + 2, 'logs', [], [], rest)
+    guild.add_channel(channel)
+    guild.text_channels.remove(channel)  # not a channel the stats commands should scan
+    return channel
+
+
+async def run_stats_command(bot, guild, setup):
+    from cogs.stats import Stats
+    cog = Stats(bot)
+    await cog.charts.render('pie', labels=['warm-up'], counts=[1], title='warm-up')
+    ctx = FakeContext(bot, guild, log_channel(guild, setup['rest']), guild.authors[0])
+    setup['rest'].routes.clear()
+    started = time.perf_counter()
+    await cog.send_server_stats(ctx, None, None, parse_date('2000'), None)
+    elapsed = time.perf_counter() - started
+    cog.charts.close()
+    return setup['messages'], 'messages', elapsed
+
+
+async def run_mod_command(bot, guild, setup):
+    from cogs.mod_activity import ModActivity
+    cog = ModActivity(bot)
+    ctx = FakeContext(bot, guild, log_channel(guild, setup['rest']), guild.authors[0])
+    setup['rest'].routes.clear()
+    started = time.perf_counter()
+    await cog.send_mod_stats(ctx, setup['role'], None, None, None, None, {})
+    return setup['messages'], 'messages', time.perf_counter() - started
+
+
+@scenario('backfill')
+async def backfill(bot, guild, setup):
+    from utils.backfill import Backfill
+    started = time.perf_counter()
+    await Backfill(bot).crawl_guild(guild)
+    return setup['messages'], 'messages', time.perf_counter() - started
+
+
+@scenario('serverstats_crawl')
+async def serverstats_crawl(bot, guild, setup):
+    return await run_stats_command(bot, guild, setup)
+
+
+@scenario('serverstats_index', prepare_index=True)
+async def serverstats_index(bot, guild, setup):
+    return await run_stats_command(bot, guild, setup)
+
+
+@scenario('heatmap_index', prepare_index=True)
+async def heatmap_index(bot, guild, setup):
+    from cogs.stats import Stats
+    cog = Stats(bot)
+    await cog.charts.render('pie', labels=['warm-up'], counts=[1], title='warm-up')
+    ctx = FakeContext(bot, guild, log_channel(guild, setup['rest']), guild.authors[0])
+    setup['rest'].routes.clear()
+    started = time.perf_counter()
+    await cog.send_heatmap(ctx, None, None, 'the beginning to now')
+    elapsed = time.perf_counter() - started
+    cog.charts.close()
+    return setup['messages'], 'messages', elapsed
+
+
+@scenario('serverstats_approx')
+async def serverstats_approx(bot, guild, setup):
+    """Samples every channel and reports how close the estimates land to the exact counts."""
+    from cogs.stats import Stats
+    from utils.approx import Estimate
+    cog = Stats(bot)
+    started = time.perf_counter()
+    estimates = await cog.estimate_activity(guild, None, None)
+    elapsed = time.perf_counter() - started
+    cog.charts.close()
+
+    overall = Estimate()
+    covered = 0
+    for channel in guild.text_channels:
+        estimate = estimates[channel.id]
+        overall.merge(estimate)
+        covered += abs(estimate.total - len(channel.message_ids)) <= estimate.margin
+    authors = len({author for channel in guild.text_channels for author in channel.author_indices})
+    return setup['messages'], 'messages', elapsed, {
+        'estimated_messages': round(overall.total),
+        'margin_95': round(overall.margin),
+        'relative_error': round(abs(overall.total - setup['messages']) / setup['messages'], 4),
+        'total_within_margin': abs(overall.total - setup['messages']) <= overall.margin,
+        'channels_within_margin': f'{covered}/{len(guild.text_channels)}',
+        'estimated_authors': overall.sketch.estimate(),
+        'exact_authors': authors,
+    }
+
+
+@scenario('modstats_crawl')
+async def modstats_crawl(bot, guild, setup):
+    return await run_mod_command(bot, guild, setup)
+
+
+@scenario('modstats_index', prepare_index=True)
+async def modstats_index(bot, guild, setup):
+    return await run_mod_command(bot, guild, setup)
+
+
+@scenario('message_delete_logging')
+async def message_delete_logging(bot, guild, setup):
+    from cogs.message_logging import MessageLogging
+    cog = MessageLogging(bot)
+    cog.log_channels[str(guild.id)] = log_channel(guild, setup['rest']).id
+    source = max(guild.text_channels, key=lambda channel: len(channel.message_ids))
+    events = min(setup['events'], len(source.message_ids))
+    messages = [source.message(position) for position in range(events)]
+    payloads = [
+        discord.RawMessageDeleteEvent({'id': message.id, 'channel_id': source.id, 'guild_id': guild.id})
+        for message in messages
+    ]
+    started = time.perf_counter()
+    for message in messages:
+        await cog.on_message(message)
+    for payload in payloads:
+        await cog.on_raw_message_delete(payload)
+    await cog.webhooks.flush()
+    return events, 'events', time.perf_counter() - started
+
+
+@scenario('member_join_logging')
+async def member_join_logging(bot, guild, setup):
+    from cogs.member_logging import MemberLogging
+    cog = MemberLogging(bot)
+    cog.config[str(guild.id)] = {'member_log_channel': log_channel(guild, setup['rest']).id}
+    members = [FakeUser(guild.id + 1000 + index, guild=guild) for index in range(setup['events'])]
+    started = time.perf_counter()
+    for member in members:
+        await cog.on_member_join(member)
+    await cog.send_summaries()
+    return len(members), 'events', time.perf_counter() - started
+
+
+def member_payloads(guild, setup):
+    # Every tenth member holds the role being looked up
+    role_id = setup['role'].id
+    for index in range(setup['members']):
+        yield member_payload(guild.id + 10_000 + index, [role_id] if index % 10 == 0 else [])
+
+
+@scenario('role_members_chunked')
+async def role_members_chunked(bot, guild, setup):
+    # The default mode: every member is chunked into the cache at startup and role.members filters it
+    state = FakeMemberState()
+    started = time.perf_counter()
+    cache = {}
+    for payload in member_payloads(guild, setup):
+        member = discord.Member(data=payload, guild=guild, state=state)
+        cache[member.id] = member
+    role_members = [member for member in cache.values() if member.get_role(setup['role'].id) is not None]
+    assert len(role_members) == (setup['members'] + 9) // 10
+    return setup['members'], 'members', time.perf_counter() - started
+
+
+@scenario('role_members_lean')
+async def role_members_lean(bot, guild, setup):
+    # LEAN_MEMBERS=1: nothing is cached up front and role members come from an uncached gateway chunk on demand
+    from utils.members import RoleMembers
+    guild.chunked = False
+    guild.member_payloads = lambda: member_payloads(guild, setup)
+    started = time.perf_counter()
+    role_members = await RoleMembers().members(setup['role'])
+    assert len(role_members) == (setup['members'] + 9) // 10
+    return setup['members'], 'members', time.perf_counter() - started
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+async def run_scenario(name, args):
+    func, prepare_index = SCENARIOS[name]
+    bot, guild, role, rest = make_guild(
+        messages=args.messages, channels=args.channels, authors=args.authors,
+        author_skew=args.author_skew, channel_skew=args.channel_skew, latency=args.latency, seed=args.seed,
+    )
+    setup = {'rest': rest, 'role': role, 'messages': args.messages, 'events': args.events, 'members': args.members}
+    if prepare_index:
+        from utils.backfill import Backfill
+        await Backfill(bot).crawl_guild(guild)
+    rest.routes.clear()
+
+    # Scenarios may return a dict of extra measurements after the timing
+    operations, unit, seconds, *extra = await func(bot, guild, setup)
+    return {
+        'scenario': name,
+        'operations': operations,
+        'unit': unit,
+        'seconds': round(seconds, 4),
+        'throughput_per_second': round(operations / seconds, 1) if seconds else None,
+        'rest_calls': rest.total,
+        'rest_calls_by_route': dict(rest.routes),
+        'peak_rss_bytes': peak_rss_bytes(),
+        **(extra[0] if extra else {}),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100_000, help='messages in the synthetic guild (10k to 10M)')
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--authors', type=int, default=500)
+    parser.add_argument('--author-skew', type=float, default=1.1)
+    parser.add_argument('--channel-skew', type=float, default=0.8)
+    parser.add_argument('--events', type=int, default=2_000, help='events replayed by the logging scenarios')
+    parser.add_argument('--members', type=int, default=100_000, help='members in the guild for the role member scenarios')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated seconds per history page')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)  # internal: run one scenario in this process
+    return parser.parse_args(argv)
+
+
+def forwarded_args(args):
+    return [
+        '--messages', str(args.messages), '--channels', str(args.channels), '--authors', str(args.authors),
+        '--author-skew', str(args.author_skew), '--channel-skew', str(args.channel_skew),
+        '--events', str(args.events), '--members', str(args.members), '--latency', str(args.latency), '--seed', str(args.seed),
+    ]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.scenario:
+        with tempfile.TemporaryDirectory() as scratch:
+            os.chdir(scratch)
+            result = asyncio.run(run_scenario(args.scenario, args))
+        print(json.dumps(result))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for name in args.scenarios:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run', '--scenario', name, *forwarded_args(args)],
+            cwd=root, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            print(f'{name}: failed\n{completed.stderr}', file=sys.stderr)
+            results.append({'scenario': name, 'error': completed.stderr.strip().splitlines()[-1:]})
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(
+            f"{name:<24} {result['seconds']:>9.3f}s {result['throughput_per_second'] or 0:>12.1f} {result['unit']}/s "
+            f"{result['rest_calls']:>8} REST {result['peak_rss_bytes'] / 2**20:>8.1f} MiB"
+        )
+
+    with open(args.output, 'w') as f:
+        json.dump({'config': vars(args) | {'scenario': None}, 'results': results}, f, indent=4)
+    print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# cogs/activity.py
+import asyncio
+from datetime import timedelta
+from discord.utils import snowflake_time
+from discord.ext import commands, tasks
+from utils.activity_index import get_index, message_row
+from utils.backfill import get_backfill
+from utils.result_cache import get_result_cache
+from cogs.developer import is_bot_owner
+
+class Activity(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.index = get_index(bot)
+        self.backfill = get_backfill(bot)
+        self.result_cache = get_result_cache(bot)
+        self.pending = []
+        self.pending_changes = set()  # (guild_id, created_at) of pending rows that should refresh cached results
+
+    async def cog_load(self):
+        self.flush_pending.start()
+        self.compact_rollups.start()
+
+    async def cog_unload(self):
+        self.flush_pending.cancel()
+        self.compact_rollups.cancel()
+        self.backfill.stop_all()
+        await self.flush()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Resume interrupted crawls, and run the forward pass for finished ones to pick up
+        # whatever was posted while the bot was offline or disconnected
+        guild_ids = await asyncio.to_thread(self.index.backfilled_guilds)
+        for guild_id in guild_ids:
+            guild = self.bot.get_guild(guild_id)
+            if guild is not None:
+                self.backfill.start(guild)
+
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        # Messages can be missed until the next on_ready catch-up, so live rows stop moving high-water marks
+        self.backfill.caught_up.clear()
+
+    async def flush(self):
+        if self.pending:
+            rows, self.pending = self.pending, []
+            changes, self.pending_changes = self.pending_changes, set()
+            await asyncio.to_thread(self.index.add_messages, rows)
+            # Only now can a recomputed result include these rows
+            for guild_id, created_at in changes:
+                self.result_cache.invalidate(guild_id, created_at)
+            # Live rows only move the high-water mark once the channel has caught up, so the
+            # forward pass never skips messages posted while the bot was offline
+            high_waters = {}
+            for message_id, _, channel_id, *_ in rows:
+                if channel_id in self.backfill.caught_up:
+                    high_waters[channel_id] = max(message_id, high_waters.get(channel_id, 0))
+            if high_waters:
+                await asyncio.to_thread(self.index.advance_high_water, high_waters)
+
+    # Messages are written in small batches so the listener never touches the disk itself
+    @tasks.loop(seconds=2)
+    async def flush_pending(self):
+        await self.flush()
+
+    @tasks.loop(hours=6)
+    async def compact_rollups(self):
+        await asyncio.to_thread(self.index.compact)
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.guild is not None:
+            row = message_row(message)
+            self.pending.append(row)
+            # Every indexed message changes the counts, commands included; results whose window
+            # reaches the present are only expired LIVE_STALENESS seconds later, so commands fired
+            # together still share one result
+            self.pending_changes.add((message.guild.id, row[4]))
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        if payload.guild_id is not None:
+            await self.flush()
+            await asyncio.to_thread(self.index.remove_messages, [payload.message_id])
+            self.result_cache.invalidate(payload.guild_id, snowflake_time(payload.message_id).timestamp())
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        if payload.guild_id is not None:
+            await self.flush()
+            await asyncio.to_thread(self.index.remove_messages, payload.message_ids)
+            for message_id in payload.message_ids:
+                self.result_cache.invalidate(payload.guild_id, snowflake_time(message_id).timestamp())
+
+    @commands.command(name='backfill', hidden=True)
+    @is_bot_owner()  # Restrict this command to bot owners only
+    async def backfill_command(self, ctx, action: str = 'status', guild_id: int = None):
+        """Starts, stops or reports the history backfill for a guild (start/stop/status)."""
+        guild = self.bot.get_guild(guild_id) if guild_id else ctx.guild
+        if guild is None:
+            await ctx.send(f'Could not find server with ID {guild_id}')
+            return
+
+        action = action.lower()
+        if action == 'start':
+            self.backfill.start(guild)
+            await ctx.send(f'Backfill started for "{guild.name}".')
+        elif action == 'stop':
+            self.backfill.stop(guild.id)
+            await ctx.send(f'Backfill stopped for "{guild.name}". It will resume from its checkpoint next time.')
+        else:
+            fraction, ingested, complete = await self.backfill.progress(guild)
+            eta = self.backfill.eta(guild, fraction)
+            state = 'running' if self.backfill.is_running(guild.id) else 'idle'
+            eta_text = str(timedelta(seconds=int(eta))) if eta is not None else 'unknown'
+            await ctx.send(
+                f'```ini\nGuild: {guild.name}\nState: {state}\nProgress: {fraction:.1%}\n'
+                f'Channels complete: {complete}/{len(guild.text_channels)}\nMessages ingested: {ingested}\nETA: {eta_text}\n```'
+            )
+
+async def setup(bot):
+    await bot.add_cog(Activity(bot))
@@ -3,6 +3,11 @@ import discord
 from discord.ext import commands
 import asyncio
 import inspect
+import os
+import time
+from datetime import timedelta
+from utils.perf import perf
+from utils.snapshot import get_snapshots
 
 def is_bot_owner():
     async def predicate(ctx):
@@ -13,6 +18,19 @@ class Developer(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        perf.install(self.bot)
+        # Optional local Prometheus endpoint, e.g. PERF_METRICS_PORT=9464
+        port = os.getenv('PERF_METRICS_PORT')
+        if port:
+            await perf.serve_metrics(int(port))
+
+    async def cog_unload(self):
+        await perf.uninstall(self.bot)
+        # bot.close() unloads extensions in load order, so the activity cog has already
+        # flushed its pending rows and the other cogs' state is still in memory
+        get_snapshots(self.bot).save()
+
     @commands.command(name='eval', hidden=True)
     @is_bot_owner()  # Restrict this command to bot owners only
     async def eval_command(self, ctx, *, code: str):
@@ -45,9 +63,9 @@ class Developer(commands.Cog):
     @commands.command(name='restart', hidden=True)
     @is_bot_owner()  # Restrict this command to bot owners only
     async def restart_bot(self, ctx):
-        """Restarts the bot."""
+        """Restarts the bot, saving a snapshot of its caches so it comes back warm."""
         await ctx.send('Restarting...')
-        await self.bot.logout()
+        await self.bot.close()
 
     @restart_bot.error
     async def restart_bot_error(self, ctx, error):
@@ -76,5 +94,27 @@ class Developer(commands.Cog):
         else:
             await ctx.send(f'Could not find server with ID {server_id}')
 
+    @commands.command(name='perf', hidden=True)
+    @is_bot_owner()  # Restrict this command to bot owners only
+    async def perf_report(self, ctx):
+        """Shows command latency, event loop lag, REST usage and listener timings."""
+        uptime = timedelta(seconds=int(time.time() - perf.started_at))
+        lines = [f'[Uptime {uptime}]', '', '[Commands]  count    p50     p95     max   rest  429s']
+        for name, hist in sorted(perf.command_latency.items(), key=lambda item: -item[1].count):
+            lines.append(
+                f'{name:<12}{hist.count:>5} {hist.quantile(0.5):>6.2f}s {hist.quantile(0.95):>6.2f}s '
+                f'{hist.max:>6.2f}s {perf.rest_calls[name]:>6} {perf.rate_limits[name]:>5}'
+            )
+        lines.append(f'{"background":<12}{"":>30}{perf.rest_calls["background"]:>6} {perf.rate_limits["background"]:>5}')
+        lines += ['', '[Listeners]            count   p50       p95       max']
+        for name, hist in sorted(perf.listener_latency.items()):
+            lines.append(
+                f'{name:<22}{hist.count:>6} {hist.quantile(0.5) * 1000:>7.1f}ms {hist.quantile(0.95) * 1000:>7.1f}ms {hist.max * 1000:>7.1f}ms'
+            )
+        lag = perf.loop_lag
+        lines += ['', f'[Event loop lag] p50 {lag.quantile(0.5) * 1000:.1f}ms  p95 {lag.quantile(0.95) * 1000:.1f}ms  max {lag.max * 1000:.1f}ms']
+        report = '\n'.join(lines)
+        await ctx.send(f'```ini\n{report[:1900]}\n```')
+
 async def setup(bot):
     await bot.add_cog(Developer(bot))
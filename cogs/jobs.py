@@ -0,0 +1,42 @@
+# cogs/jobs.py
+import discord
+from discord.ext import commands
+from utils.jobs import get_job_manager
+
+class Jobs(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.jobs = get_job_manager(bot)
+
+    @commands.command(name='jobs', help='List the stats jobs running or queued in this server')
+    async def list_jobs(self, ctx):
+        guild_jobs = self.jobs.guild_jobs(ctx.guild.id)
+        if not guild_jobs:
+            await ctx.send('No stats jobs are running in this server.')
+            return
+        await ctx.send('\n'.join(f'{job.describe()} Started by <@{job.author_id}>.' for job in guild_jobs),
+                       allowed_mentions=discord.AllowedMentions.none())
+
+    @commands.command(name='cancel', help='Cancel a stats job by its ID, or your most recent one if no ID is provided')
+    async def cancel_job(self, ctx, job_id: int = None):
+        guild_jobs = self.jobs.guild_jobs(ctx.guild.id)
+        if job_id is None:
+            own_jobs = [job for job in guild_jobs if job.author_id == ctx.author.id]
+            job = own_jobs[-1] if own_jobs else None
+        else:
+            job = next((job for job in guild_jobs if job.id == job_id), None)
+
+        if job is None:
+            await ctx.send('No matching stats job found.')
+            return
+
+        # Anyone can cancel their own jobs; managing the server is needed to cancel someone else's
+        if job.author_id != ctx.author.id and not ctx.author.guild_permissions.manage_guild:
+            await ctx.send('You can only cancel your own jobs.')
+            return
+
+        self.jobs.cancel(job)
+        await ctx.send(f'Cancelled job #{job.id}.')
+
+async def setup(bot):
+    await bot.add_cog(Jobs(bot))
@@ -1,40 +1,102 @@
 #cogs/member_logging.py
 import discord
-from discord.ext import commands
-import json
-import os
+from discord.ext import commands, tasks
+import io
+from utils.burst import BurstDetector, DEFAULT_THRESHOLD, DEFAULT_WINDOW
+from utils.config_store import get_config_store
+from utils.perf import timed_listener
+
+SUMMARY_INTERVAL = 15
+SUMMARY_PREVIEW_LIMIT = 3500
 
 class MemberLogging(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.config_file = 'member_log_config.json'
-        self.config = self.load_config()
+        self.config_store = get_config_store(bot)
+        self.config = self.config_store.section('member_log')
+        self.detectors = {}  # (guild_id, kind) -> BurstDetector
+        self.raid_buffers = {}  # (guild_id, kind) -> [member lines]
 
-    def load_config(self):
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r') as f:
-                return json.load(f)
-        else:
-            return {}
+    async def cog_load(self):
+        self.flush_raid_buffers.start()
 
-    def save_config(self):
-        with open(self.config_file, 'w') as f:
-            json.dump(self.config, f, indent=4)
+    async def cog_unload(self):
+        self.flush_raid_buffers.cancel()
+        await self.send_summaries()
+        await self.config_store.close()
 
-    async def send_log(self, embed, guild_id):
+    async def send_log(self, embed, guild_id, file=None):
         guild_id = str(guild_id)
         if guild_id in self.config and 'member_log_channel' in self.config[guild_id]:
             log_channel_id = self.config[guild_id]['member_log_channel']
             log_channel = self.bot.get_channel(log_channel_id)
             if log_channel:
-                await log_channel.send(embed=embed)
+                await log_channel.send(embed=embed, file=file)
             else:
                 print(f'Error: Log channel with ID {log_channel_id} not found for guild {guild_id}.')
         else:
             print(f'Error: Log channel not configured for guild ID {guild_id}. Use .setmemberlog command to set it.')
 
+    def get_detector(self, guild_id, kind):
+        guild_config = self.config.get(str(guild_id), {})
+        threshold = guild_config.get('raid_threshold', DEFAULT_THRESHOLD)
+        window = guild_config.get('raid_window', DEFAULT_WINDOW)
+        detector = self.detectors.get((guild_id, kind))
+        if detector is None or (detector.threshold, detector.window) != (threshold, window):
+            detector = self.detectors[(guild_id, kind)] = BurstDetector(threshold, window)
+        return detector
+
+    def buffer_during_raid(self, guild_id, member, kind):
+        """Records a join/leave and buffers it instead of logging it individually while a raid is underway."""
+        key = (guild_id, kind)
+        bursting = self.get_detector(*key).record()
+        if bursting or key in self.raid_buffers:
+            created = member.created_at.strftime("%Y-%m-%d %H:%M:%S")
+            self.raid_buffers.setdefault(key, []).append(f'{member} ({member.id}) - created {created} UTC')
+            return True
+        return False
+
+    async def send_summaries(self):
+        for key in list(self.raid_buffers):
+            guild_id, kind = key
+            lines = self.raid_buffers.pop(key)
+            if self.get_detector(guild_id, kind).is_bursting():
+                # Keep buffering until the rate drops, then resume per-member embeds
+                self.raid_buffers[key] = []
+            if not lines:
+                continue
+
+            verb = 'Joined' if kind == 'join' else 'Left'
+            embed = discord.Embed(
+                title=f'Raid Detected: {len(lines)} Members {verb}',
+                color=discord.Color.green() if kind == 'join' else discord.Color.red()
+            )
+            preview = ''
+            for index, line in enumerate(lines):
+                if len(preview) + len(line) + 1 > SUMMARY_PREVIEW_LIMIT:
+                    preview += f'... and {len(lines) - index} more'
+                    break
+                preview += line + '\n'
+            embed.description = preview
+            embed.set_footer(text=f'Summary at {discord.utils.utcnow().strftime("%Y-%m-%d %H:%M:%S")} UTC')
+
+            file = None
+            if self.config.get(str(guild_id), {}).get('raid_attach_file', True):
+                file = discord.File(io.BytesIO('\n'.join(lines).encode()), filename=f'raid_{kind}s.txt')
+            try:
+                await self.send_log(embed, guild_id, file=file)
+            except discord.HTTPException as e:
+                print(f'Error: Failed to send raid summary for guild {guild_id}: {e}')
+
+    @tasks.loop(seconds=SUMMARY_INTERVAL)
+    async def flush_raid_buffers(self):
+        await self.send_summaries()
+
     @commands.Cog.listener()
+    @timed_listener
     async def on_member_join(self, member):
+        if self.buffer_during_raid(member.guild.id, member, 'join'):
+            return
         guild_id = member.guild.id
         embed = discord.Embed(
             title="Member Joined",
@@ -46,15 +108,20 @@ class MemberLogging(commands.Cog):
         await self.send_log(embed, guild_id)
 
     @commands.Cog.listener()
-    async def on_member_remove(self, member):
-        guild_id = member.guild.id
+    @timed_listener
+    async def on_raw_member_remove(self, payload):
+        # The raw event fires whether or not the member was cached, which lean member mode relies on
+        member = payload.user
+        if self.buffer_during_raid(payload.guild_id, member, 'leave'):
+            return
+        guild_id = payload.guild_id
         embed = discord.Embed(
             title="Member Left",
             color=discord.Color.red()
         )
         embed.add_field(name='User', value=f'{member} ({member.id})')
         embed.set_footer(text=f'Left at {discord.utils.utcnow().strftime("%Y-%m-%d %H:%M:%S")} UTC')
-        embed.set_thumbnail(url=member.avatar.url)
+        embed.set_thumbnail(url=member.display_avatar.url)
         await self.send_log(embed, guild_id)
 
     @commands.command(name='setmemberlog')
@@ -64,8 +131,20 @@ class MemberLogging(commands.Cog):
         if guild_id not in self.config:
             self.config[guild_id] = {}
         self.config[guild_id]['member_log_channel'] = channel.id
-        self.save_config()
+        self.config_store.mark_dirty()
         await ctx.send(f'Member join/leave log channel has been set to {channel.mention}')
 
+    @commands.command(name='setraidthreshold', help='Summarize join/leave logs once this many happen within the given seconds')
+    @commands.has_permissions(administrator=True)
+    async def set_raid_threshold(self, ctx, count: int, seconds: float, attach_file: bool = True):
+        guild_id = str(ctx.guild.id)
+        if guild_id not in self.config:
+            self.config[guild_id] = {}
+        self.config[guild_id]['raid_threshold'] = count
+        self.config[guild_id]['raid_window'] = seconds
+        self.config[guild_id]['raid_attach_file'] = attach_file
+        self.config_store.mark_dirty()
+        await ctx.send(f'Join/leave logs will be summarized once {count} events happen within {seconds:g} seconds.')
+
 async def setup(bot):
     await bot.add_cog(MemberLogging(bot))
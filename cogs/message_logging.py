@@ -1,30 +1,33 @@
 # cogs/logging.py
 import discord
 from discord.ext import commands
-import json
-import os
+from datetime import datetime
+from utils.config_store import get_config_store
+from utils.message_store import MessageRecord, author_name, get_message_store, record_from
+from utils.perf import timed_listener
+from utils.webhooks import WebhookBatcher
 
 class MessageLogging(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.log_channels = {}
-        self.load_log_channels()
+        self.config_store = get_config_store(bot)
+        self.log_channels = self.config_store.section('log_channels')
+        self.webhooks = WebhookBatcher(bot, name='Message Log')
+        self.message_store = get_message_store(bot)
 
-    def load_log_channels(self):
-        if os.path.exists('log_channels.json'):
-            with open('log_channels.json', 'r') as f:
-                self.log_channels = json.load(f)
+    async def cog_load(self):
+        self.webhooks.start()
 
-    def save_log_channels(self):
-        with open('log_channels.json', 'w') as f:
-            json.dump(self.log_channels, f)
+    async def cog_unload(self):
+        await self.webhooks.stop()
+        await self.config_store.close()
 
     @commands.command(name='setlogchannel', help='Set the channel for message logging')
     @commands.has_permissions(administrator=True)
     async def set_log_channel(self, ctx, channel: discord.TextChannel):
         guild_id = str(ctx.guild.id)
         self.log_channels[guild_id] = channel.id
-        self.save_log_channels()
+        self.config_store.mark_dirty()
         await ctx.send(f'Log channel set to {channel.mention} for this server.')
 
     async def send_log(self, embed: discord.Embed, guild_id: int):
@@ -34,47 +37,112 @@ class MessageLogging(commands.Cog):
             if log_channel:
                 permissions = log_channel.permissions_for(log_channel.guild.me)
                 if permissions.manage_webhooks and permissions.send_messages:
-                    try:
-                        webhook = await log_channel.create_webhook(name='Message Log')
-                        bot_user = self.bot.user
-                        await webhook.send(embed=embed, username=bot_user.display_name, avatar_url=bot_user.avatar.url)
-                        await webhook.delete()
-                    except discord.Forbidden:
-                        print(f'Error: Missing permissions to create webhook in channel {log_channel.id}.')
+                    self.webhooks.enqueue(log_channel, embed)
                 else:
                     print(f'Error: Bot lacks required permissions in channel {log_channel.id}.')
             else:
                 print(f'Error: Log channel with ID {self.log_channels[guild_id]} not found.')
 
-    @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        guild_id = message.guild.id
+    def field_text(self, content):
+        # Embed field values must be 1-1024 characters
+        if not content:
+            return '*No text content*'
+        return content if len(content) <= 1024 else content[:1021] + '...'
+
+    def remember(self, message):
+        # Only guilds that log messages need their content kept around
+        if message.guild is not None and str(message.guild.id) in self.log_channels:
+            self.message_store.add(message)
+
+    def stored_message(self, guild_id, message_id, cached_message):
+        record = self.message_store.pop(guild_id, message_id)
+        if record is None and cached_message is not None:
+            record = record_from(cached_message)
+        return record
+
+    def deleted_embed(self, record, channel_id):
         embed = discord.Embed(
             title="Message Deleted",
             color=discord.Color.red()
         )
-        embed.add_field(name='Author', value=f'{message.author} ({message.author.id})')
-        embed.add_field(name='Channel', value=message.channel.mention)
-        embed.add_field(name='Message Content', value=message.content, inline=False)
+        if record is not None:
+            embed.add_field(name='Author', value=f'{record.author_name} ({record.author_id})')
+        embed.add_field(name='Channel', value=f'<#{channel_id}>')
+        content = self.field_text(record.content) if record is not None else '*Not available: sent before the bot started tracking it*'
+        embed.add_field(name='Message Content', value=content, inline=False)
         embed.set_footer(text=f'Deleted at {discord.utils.utcnow().strftime("%Y-%m-%d %H:%M:%S")} UTC')
-        embed.set_author(name=self.bot.user.display_name, icon_url=self.bot.user.avatar.url)
-        await self.send_log(embed, guild_id)
+        embed.set_author(name=self.bot.user.display_name, icon_url=self.bot.user.display_avatar.url)
+        return embed
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        self.remember(message)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.message_store.drop_guild(guild.id)
 
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        guild_id = after.guild.id
+    @timed_listener
+    async def on_raw_message_delete(self, payload):
+        if payload.guild_id is None or str(payload.guild_id) not in self.log_channels:
+            return
+        record = self.stored_message(payload.guild_id, payload.message_id, payload.cached_message)
+        await self.send_log(self.deleted_embed(record, payload.channel_id), payload.guild_id)
+
+    @commands.Cog.listener()
+    @timed_listener
+    async def on_raw_bulk_message_delete(self, payload):
+        if payload.guild_id is None or str(payload.guild_id) not in self.log_channels:
+            return
+        cached = {message.id: message for message in payload.cached_messages}
+        for message_id in sorted(payload.message_ids):
+            record = self.stored_message(payload.guild_id, message_id, cached.get(message_id))
+            await self.send_log(self.deleted_embed(record, payload.channel_id), payload.guild_id)
+
+    @commands.Cog.listener()
+    @timed_listener
+    async def on_raw_message_edit(self, payload):
+        # Updates without a content change (embeds unfurling, pins) aren't edits worth logging
+        if payload.guild_id is None or 'content' not in payload.data or str(payload.guild_id) not in self.log_channels:
+            return
+        content = payload.data['content']
+        record = self.stored_message(payload.guild_id, payload.message_id, payload.cached_message)
+        if record is None:
+            author = payload.data.get('author')
+            if author is None or author.get('bot'):
+                return
+            before = '*Not available: sent before the bot started tracking it*'
+            name = author_name(author['username'], author.get('discriminator'))
+            record = MessageRecord(payload.message_id, int(author['id']), name, payload.channel_id, None)
+        elif record.content == content:
+            self.message_store.put(payload.guild_id, record)
+            return
+        else:
+            before = self.field_text(record.content)
+        author_text = f'{record.author_name} ({record.author_id})'
+
+        # Keep the edited content, so later edits and the deletion show what the message said last
+        self.message_store.put(payload.guild_id, MessageRecord(
+            record.id, record.author_id, record.author_name, record.channel_id, content
+        ))
+
+        edited_at = payload.data.get('edited_timestamp')
+        edited_at = datetime.fromisoformat(edited_at) if edited_at else discord.utils.utcnow()
+        jump_url = f'https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}'
+
         embed = discord.Embed(
             title="Message Edited",
             color=discord.Color.gold()
         )
-        embed.add_field(name='Author', value=f'{after.author} ({after.author.id})')
-        embed.add_field(name='Channel', value=after.channel.mention)
-        embed.add_field(name='Original Message', value=before.content, inline=False)
-        embed.add_field(name='Edited Message', value=after.content, inline=False)
-        embed.add_field(name='Jump to Message', value=f'[Click here]({after.jump_url})')
-        embed.set_footer(text=f'Edited at {after.edited_at.strftime("%Y-%m-%d %H:%M:%S")} UTC')
-        embed.set_author(name=self.bot.user.display_name, icon_url=self.bot.user.avatar.url)
-        await self.send_log(embed, guild_id)
+        embed.add_field(name='Author', value=author_text)
+        embed.add_field(name='Channel', value=f'<#{payload.channel_id}>')
+        embed.add_field(name='Original Message', value=before, inline=False)
+        embed.add_field(name='Edited Message', value=self.field_text(content), inline=False)
+        embed.add_field(name='Jump to Message', value=f'[Click here]({jump_url})')
+        embed.set_footer(text=f'Edited at {edited_at.strftime("%Y-%m-%d %H:%M:%S")} UTC')
+        embed.set_author(name=self.bot.user.display_name, icon_url=self.bot.user.display_avatar.url)
+        await self.send_log(embed, payload.guild_id)
 
 async def setup(bot):
     await bot.add_cog(MessageLogging(bot))
@@ -1,43 +1,110 @@
 import discord
 from discord.ext import commands
-import os
-import json
+import asyncio
+import heapq
+from collections import Counter
 from datetime import datetime
+from utils.activity_index import get_index, time_bounds
+from utils.approx import exact_estimate, sample_channel
+from utils.columnar import get_columns
+from utils.config_store import get_config_store
+from utils.history import count_partitioned, snowflake_bounds
+from utils.jobs import get_job_manager, report_progress
+from utils.members import get_role_members
+from utils.mod_ledger import describe_actions, get_mod_ledger
+from utils.options import parse_options, parse_range, parse_top
+from utils.pagination import Paginator
+from utils.result_cache import get_result_cache
+from utils.scanner import get_scanner
 
-roles_filename = 'roles.json'
+MEMBERS_PER_PAGE = 5
+LEADERBOARD_PAGE_SIZE = 10
+DEFAULT_TOP = 10
+ESTIMATE_ROWS = 20  # --approx lists the most active members in one field
 
-# Function to load allowed roles from roles.json
-def load_allowed_roles():
-    if os.path.exists(roles_filename):
-        with open(roles_filename, 'r') as f:
-            return json.load(f)
-    else:
-        return {}
+def field_text(text):
+    # Embed field values are capped at 1024 characters
+    return text if len(text) <= 1024 else text[:1021] + '...'
 
-allowed_roles = load_allowed_roles()
+# Function to count messages by a set of authors in a specific channel, reading its history once
+async def count_role_messages_in_channel(author_ids, channel, start=None, end=None, target_month=None):
+    after, before = snowflake_bounds(start, end)
+    return await count_partitioned(channel, role_message_key(author_ids, target_month), after, before)
 
-# Function to save allowed roles to roles.json
-def save_allowed_roles():
-    with open(roles_filename, 'w') as f:
-        json.dump(allowed_roles, f, indent=4)
-
-# Function to count user messages in a specific channel
-async def count_user_messages_in_channel(user, channel, target_month=None, target_year=None):
-    message_count = 0
-    async for message in channel.history(limit=None):
-        if message.author == user:
-            if (target_month is None or message.created_at.month == target_month) and (target_year is None or message.created_at.year == target_year):
-                message_count += 1
-    return message_count
+def role_message_key(author_ids, target_month=None):
+    def key(message):
+        if message.author.id in author_ids and (target_month is None or message.created_at.month == target_month):
+            return message.author.id
+    return key
 
 class ModActivity(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.config_store = get_config_store(bot)
+        self.allowed_roles = self.config_store.section('allowed_roles')
+        self.columns = get_columns(bot)
+
+    async def cog_unload(self):
+        await self.config_store.close()
+
+    async def collect_role_counts(self, guild, member_ids, start=None, end=None, target_month=None):
+        """Returns a Counter of {(author_id, channel_id): message count} for the given members."""
+        index = get_index(self.bot)
+        complete = await asyncio.to_thread(index.complete_channels, guild.id)
+        indexed = await asyncio.to_thread(
+            index.range_counts, guild.id, start, end, ('author_id', 'channel_id'), None, member_ids, target_month
+        )
+        counts = Counter({key: count for key, count in indexed.items() if key[1] in complete})
+
+        # Channels the backfill hasn't finished yet are read once for the whole role
+        pending = [channel for channel in guild.text_channels if channel.id not in complete]
+        report_progress(channels_done=len(guild.text_channels) - len(pending), channels_total=len(guild.text_channels))
+        scan = lambda channel: count_role_messages_in_channel(member_ids, channel, start, end, target_month)
+        async for channel, channel_counts in get_scanner(self.bot).scan(pending, scan):
+            for author_id, count in (channel_counts or {}).items():
+                counts[(author_id, channel.id)] = count
+            report_progress(channels_done=1)
+
+        return counts
 
-    @commands.command(name='modstats', aliases=['mstats'], help='Show detailed statistics for members with a specific role, month, and year')
-    async def mod_stats(self, ctx, role: discord.Role, month: str = None, year: str = None):
+    async def estimate_role_activity(self, guild, member_ids, start=None, end=None, target_month=None):
+        """Returns an Estimate of the members' messages, keyed by author, sampling channels the index doesn't cover."""
+        index = get_index(self.bot)
+        complete = await asyncio.to_thread(index.complete_channels, guild.id)
+        indexed = await asyncio.to_thread(
+            index.range_counts, guild.id, start, end, ('author_id', 'channel_id'), None, member_ids, target_month
+        )
+        author_counts = Counter()
+        for (author_id, channel_id), count in indexed.items():
+            if channel_id in complete:
+                author_counts[author_id] += count
+        estimate = exact_estimate(author_counts)
+
+        pending = [channel for channel in guild.text_channels if channel.id not in complete]
+        report_progress(channels_done=len(guild.text_channels) - len(pending), channels_total=len(guild.text_channels))
+        after, before = snowflake_bounds(start, end)
+        scan = lambda channel: sample_channel(channel, role_message_key(member_ids, target_month), after, before)
+        async for channel, channel_estimate in get_scanner(self.bot).scan(pending, scan):
+            if channel_estimate is not None:
+                estimate.merge(channel_estimate)
+            report_progress(channels_done=1)
+
+        return estimate
+
+    @commands.command(name='modstats', aliases=['mstats'], help='Show detailed statistics for members with a specific role, month, and year, or a --from/--to range (YYYY, YYYY-MM or YYYY-MM-DD). Add --top N to rank the most active members, or --approx for quick sampled estimates')
+    async def mod_stats(self, ctx, role: discord.Role, *args):
         current_date = datetime.utcnow()
 
+        try:
+            positionals, options = parse_options(args, flags=('from', 'to', 'top'), switches=('approx',))
+            range_start, range_end = parse_range(options)
+            top = parse_top(options)
+        except commands.BadArgument as e:
+            await ctx.send(str(e))
+            return
+        month = positionals[0] if len(positionals) > 0 else None
+        year = positionals[1] if len(positionals) > 1 else None
+
         if year:
             try:
                 target_year = int(year)
@@ -63,58 +130,186 @@ class ModActivity(commands.Cog):
                 await ctx.send("Searching messages from the future? I can't help you with that!")
                 return
 
-        members_with_role = role.members
+        # Reading history can take minutes, so it runs as a background job that reports its progress
+        await get_job_manager(self.bot).submit(
+            ctx, 'modstats', lambda: self.send_mod_stats(ctx, role, target_month, target_year, range_start, range_end, options, top, options.get('approx', False)),
+            key=('modstats', role.id, target_month, target_year, range_start, range_end, options.get('approx', False)),
+        )
+
+    async def send_mod_stats(self, ctx, role, target_month, target_year, range_start, range_end, options, top=None, approx=False):
+        members_with_role = await get_role_members(self.bot).members(role)
 
         if not members_with_role:
             await ctx.send(f'No members found with the role {role.name}.')
             return
 
-        embed = discord.Embed(title=f'{role.name} Stats', color=discord.Color.blue(), timestamp=datetime.utcnow())
+        # An explicit --from/--to range takes precedence over the year
+        ranged = range_start is not None or range_end is not None
+        start, end = (range_start, range_end) if ranged else time_bounds(target_month, target_year)
 
-        embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon.url)
+        member_ids = {member.id for member in members_with_role}
 
-        for member in members_with_role:
-            total_messages = 0
-            channel_message_counts = {}
-
-            for channel in ctx.guild.text_channels:
-                message_count = await count_user_messages_in_channel(member, channel, target_month, target_year)
-                if message_count > 0:
-                    channel_message_counts[channel.name] = message_count
-                    total_messages += message_count
-
-            if channel_message_counts:
-                channels_info = '\n'.join(f'• **{channel_name}:** {count} messages' for channel_name, count in channel_message_counts.items())
-            else:
-                channels_info = 'No messages found in any channel.'
-
-            embed.add_field(
-                name=f'{member.display_name} | {member.id}',
-                value=f'**Total Messages:** {total_messages}\n{channels_info}',
-                inline=False
-            )
-
-        if target_month and target_year:
+        footer = None
+        if ranged:
+            range_text = f"{options.get('from', 'the beginning')} to {options.get('to', 'now')}"
+            if target_month:
+                month_name = datetime(year=2000, month=target_month, day=1).strftime('%B')
+                range_text = f'{month_name}s from {range_text}'
+            footer = f'Statistics for {range_text}'
+        elif target_month and target_year:
             month_name = datetime(year=2000, month=target_month, day=1).strftime('%B')
-            embed.set_footer(text=f'Statistics for {month_name} {target_year}')
+            footer = f'Statistics for {month_name} {target_year}'
         elif target_month:
             month_name = datetime(year=2000, month=target_month, day=1).strftime('%B')
-            embed.set_footer(text=f'Statistics for {month_name}')
+            footer = f'Statistics for {month_name}'
         elif target_year:
-            embed.set_footer(text=f'Statistics for {target_year}')
+            footer = f'Statistics for {target_year}'
+
+        if approx:
+            estimate = await get_result_cache(self.bot).get_or_compute(
+                (ctx.guild.id, 'modstats_approx', role.id, target_month, start, end),
+                lambda: self.estimate_role_activity(ctx.guild, member_ids, start, end, target_month),
+                (start, end),
+            )
+            await self.send_role_estimate(ctx, role, estimate, top or DEFAULT_TOP, footer)
+            return
+
+        # Identical requests share one computation and reuse its result until new messages land in the window
+        counts = await get_result_cache(self.bot).get_or_compute(
+            (ctx.guild.id, 'modstats', role.id, target_month, start, end),
+            lambda: self.collect_role_counts(ctx.guild, member_ids, start, end, target_month),
+            (start, end),
+        )
+
+        member_channels = {}
+        for (author_id, channel_id), count in counts.items():
+            if count > 0:
+                member_channels.setdefault(author_id, {})[channel_id] = count
+        totals = {member_id: sum(channel_counts.values()) for member_id, channel_counts in member_channels.items()}
 
+        # Moderator actions come from the local ledger, never from paging the audit log
+        member_actions = {}
+        action_counts = await asyncio.to_thread(get_mod_ledger(self.bot).action_counts, ctx.guild.id, member_ids, start, end, target_month)
+        for (moderator_id, action), count in action_counts.items():
+            member_actions.setdefault(moderator_id, {})[action] = count
+
+        if top:
+            # A bounded heap ranks the role without sorting every member
+            ranked = heapq.nlargest(top, members_with_role, key=lambda member: totals.get(member.id, 0))
+            entries = [(member.id, totals.get(member.id, 0)) for member in ranked]
+            await self.send_leaderboard(ctx, f'{role.name} Leaderboard', entries, footer)
+            return
+
+        channel_order = {channel.id: position for position, channel in enumerate(ctx.guild.text_channels)}
+
+        def build_page(index):
+            embed = discord.Embed(title=f'{role.name} Stats', color=discord.Color.blue(), timestamp=datetime.utcnow())
+            embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon.url)
+            for member in members_with_role[index * MEMBERS_PER_PAGE:(index + 1) * MEMBERS_PER_PAGE]:
+                lines = []
+                for channel_id, count in sorted(member_channels.get(member.id, {}).items(), key=lambda item: channel_order.get(item[0], len(channel_order))):
+                    channel = ctx.guild.get_channel(channel_id)
+                    if channel is not None:
+                        lines.append(f'• **{channel.name}:** {count} messages')
+                channels_info = '\n'.join(lines) if lines else 'No messages found in any channel.'
+                actions = member_actions.get(member.id)
+                actions_info = f'**Moderation Actions:** {describe_actions(actions)}\n' if actions else ''
+                embed.add_field(
+                    name=f'{member.display_name} | {member.id}',
+                    value=field_text(f'**Total Messages:** {totals.get(member.id, 0)}\n{actions_info}{channels_info}'),
+                    inline=False
+                )
+            if footer:
+                embed.set_footer(text=footer)
+            return embed
+
+        page_count = -(-len(members_with_role) // MEMBERS_PER_PAGE)
+        await Paginator(ctx.author.id, page_count, build_page).start(ctx)
+
+    async def send_role_estimate(self, ctx, role, estimate, top, footer=None):
+        embed = discord.Embed(title=f'{role.name} Stats (approximate)', color=discord.Color.blue(), timestamp=datetime.utcnow())
+        embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon.url)
+        if estimate.sampled:
+            total = f'~{round(estimate.total):,} ± {round(estimate.margin):,}'
+            active = f'~{estimate.sketch.estimate():,} (±{estimate.sketch.relative_error:.1%}), a lower bound: sampled channels only count members seen in the sample'
+        else:
+            total = f'{round(estimate.total):,} (exact)'
+            active = f'{len(estimate.counts):,} (exact)'
+        embed.add_field(name='Total Messages', value=total, inline=False)
+        embed.add_field(name='Active Members', value=active, inline=False)
+
+        ranked = heapq.nlargest(min(top, ESTIMATE_ROWS), estimate.counts.items(), key=lambda item: item[1])
+        lines = [f'**{rank}.** <@{user_id}> — ~{round(count):,} messages' for rank, (user_id, count) in enumerate(ranked, start=1)]
+        embed.add_field(name='Most Active', value=field_text('\n'.join(lines) or 'No messages found.'), inline=False)
+
+        confidence = '± is a 95% confidence interval'
+        embed.set_footer(text=f'{footer} • {confidence}' if footer else confidence)
         await ctx.send(embed=embed)
 
+    async def send_leaderboard(self, ctx, title, entries, footer=None):
+        """Sends (user ID, message count) entries, highest first, LEADERBOARD_PAGE_SIZE to a page."""
+        def build_page(index):
+            embed = discord.Embed(title=title, color=discord.Color.blue(), timestamp=datetime.utcnow())
+            embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon.url)
+            first = index * LEADERBOARD_PAGE_SIZE
+            embed.description = '\n'.join(
+                f'**{rank}.** <@{user_id}> — {count:,} messages'
+                for rank, (user_id, count) in enumerate(entries[first:first + LEADERBOARD_PAGE_SIZE], start=first + 1)
+            ) or 'No messages found.'
+            if footer:
+                embed.set_footer(text=footer)
+            return embed
+
+        page_count = max(-(-len(entries) // LEADERBOARD_PAGE_SIZE), 1)
+        await Paginator(ctx.author.id, page_count, build_page).start(ctx)
+
+    async def collect_author_counts(self, guild, start=None, end=None):
+        """Returns {author_id: message count} for the whole guild in [start, end)."""
+        complete, counts = await self.columns.count(guild.id, 'author', start, end)
+        counts = Counter(counts)
+
+        pending = [channel for channel in guild.text_channels if channel.id not in complete]
+        report_progress(channels_done=len(guild.text_channels) - len(pending), channels_total=len(guild.text_channels))
+        after, before = snowflake_bounds(start, end)
+        scan = lambda channel: count_partitioned(channel, lambda message: message.author.id, after, before)
+        async for channel, channel_counts in get_scanner(self.bot).scan(pending, scan):
+            counts.update(channel_counts or {})
+            report_progress(channels_done=1)
+
+        return counts
+
+    async def send_guild_leaderboard(self, ctx, top, start, end, range_text):
+        counts = await get_result_cache(self.bot).get_or_compute(
+            (ctx.guild.id, 'leaderboard', None, start, end), lambda: self.collect_author_counts(ctx.guild, start, end), (start, end)
+        )
+        entries = heapq.nlargest(top, counts.items(), key=lambda item: item[1])
+        await self.send_leaderboard(ctx, 'Server Leaderboard', entries, f'Most active members for {range_text}')
+
+    @commands.command(name='leaderboard', aliases=['lb'], help='Show the most active members of the server. Options: --top N (default 10) and a --from/--to range (YYYY, YYYY-MM or YYYY-MM-DD)')
+    async def leaderboard(self, ctx, *args):
+        try:
+            _, options = parse_options(args, flags=('from', 'to', 'top'))
+            start, end = parse_range(options)
+            top = parse_top(options, default=DEFAULT_TOP)
+        except commands.BadArgument as e:
+            await ctx.send(str(e))
+            return
+
+        range_text = f"{options.get('from', 'the beginning')} to {options.get('to', 'now')}"
+        await get_job_manager(self.bot).submit(
+            ctx, 'leaderboard', lambda: self.send_guild_leaderboard(ctx, top, start, end, range_text), key=('leaderboard', start, end)
+        )
+
     @commands.command(name='setadminrole', aliases=['sar'], help='Set a role that can use modstats command')
     @commands.has_permissions(administrator=True)
     async def set_mod_role(self, ctx, role: discord.Role):
         guild_id = str(ctx.guild.id)
-        if guild_id not in allowed_roles:
-            allowed_roles[guild_id] = []
+        if guild_id not in self.allowed_roles:
+            self.allowed_roles[guild_id] = []
 
-        if role.id not in allowed_roles[guild_id]:
-            allowed_roles[guild_id].append(role.id)
-            save_allowed_roles()
+        if role.id not in self.allowed_roles[guild_id]:
+            self.allowed_roles[guild_id].append(role.id)
+            self.config_store.mark_dirty()
             await ctx.send(f'{role.name} role can now use modstats command.')
         else:
             await ctx.send(f'{role.name} role already has permission.')
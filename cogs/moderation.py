@@ -1,17 +1,54 @@
 import discord
 from discord.ext import commands
+import asyncio
+from datetime import datetime, timezone
+from utils.mod_ledger import audit_log_action, get_mod_ledger
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.ledger = get_mod_ledger(bot)
+
+    async def record_action(self, ctx, member, action, reason=None):
+        # Actions issued here are credited to the moderator who ran the command, not to the bot
+        await asyncio.to_thread(
+            self.ledger.record, ctx.guild.id, ctx.author.id, member.id, action, discord.utils.utcnow().timestamp(), reason
+        )
 
     @commands.command()
     @commands.has_permissions(kick_members=True)
     async def kick(self, ctx, member: discord.Member, *, reason=None):
         await member.kick(reason=reason)
+        await self.record_action(ctx, member, 'kick', reason)
         await ctx.send(f'Kicked {member.mention}')
 
     # Add more moderation commands here
 
+    @commands.command(name='modlog', help='Show the latest moderation actions taken against a member')
+    @commands.has_permissions(kick_members=True)
+    async def mod_log(self, ctx, user: discord.User):
+        rows = await asyncio.to_thread(self.ledger.target_actions, ctx.guild.id, user.id)
+        if not rows:
+            await ctx.send(f'No moderation actions recorded for {user}.')
+            return
+        lines = []
+        for moderator_id, action, created_at, reason in rows:
+            when = discord.utils.format_dt(datetime.fromtimestamp(created_at, timezone.utc), 'R')
+            line = f'• **{action.title()}** by <@{moderator_id}> {when}'
+            lines.append(f'{line}: {reason[:200]}' if reason else line)
+        embed = discord.Embed(title=f'Moderation Log for {user}', description='\n'.join(lines), color=discord.Color.orange())
+        await ctx.send(embed=embed)
+
+    @commands.Cog.listener()
+    async def on_audit_log_entry_create(self, entry):
+        action = audit_log_action(entry)
+        # The bot's own entries were already recorded with the moderator who ran the command
+        if action is None or entry.user_id is None or entry.user_id == self.bot.user.id:
+            return
+        await asyncio.to_thread(
+            self.ledger.record, entry.guild.id, entry.user_id, getattr(entry.target, 'id', None), action,
+            entry.created_at.timestamp(), entry.reason, entry.id,
+        )
+
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
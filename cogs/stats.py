@@ -1,33 +1,178 @@
 import discord
 from discord.ext import commands
 from datetime import datetime
-import matplotlib.pyplot as plt
-import seaborn as sns
 import io
+import asyncio
+import tempfile
+from collections import Counter
+from utils.activity_index import get_index, time_bounds
+from utils.approx import Estimate, exact_estimate, sample_channel
+from utils.charts import ChartRenderer
+from utils.columnar import get_columns, hour_of_week_key
+from utils.export import BATCH_SIZE, ExportWriter, format_available
+from utils.history import count_channel_months, count_partitioned, snowflake_bounds
+from utils.jobs import get_job_manager, report_progress
+from utils.options import parse_month, parse_options, parse_range
+from utils.result_cache import get_result_cache
+from utils.scanner import get_scanner
+
+MAX_MONTH_FIELDS = 24
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def describe_estimate(estimate):
+    if not estimate.sampled:
+        return f'{round(estimate.total):,} messages (exact)'
+    return f'~{round(estimate.total):,} ± {round(estimate.margin):,} messages'
+
 
 class Stats(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.charts = ChartRenderer()
+        self.columns = get_columns(bot)
+
+    async def cog_unload(self):
+        self.charts.close()
+
+    async def collect_period_activity(self, guild, start, end):
+        """Returns {'YYYY-MM': {channel name: message count}} for messages in [start, end)."""
+        period_activity = {}  # Dictionary to store message counts per 'YYYY-MM' and per channel
+
+        # Message counts per month and per channel come from the activity index rollups
+        index = get_index(self.bot)
+        complete = await asyncio.to_thread(index.complete_channels, guild.id)
+        counts = await asyncio.to_thread(index.range_counts, guild.id, start, end, ('channel_id',), '%Y-%m')
+        for (period, channel_id), count in counts.items():
+            channel = guild.get_channel(channel_id)
+            if channel is None or channel_id not in complete:
+                continue
+            period_activity.setdefault(period, {})
+            period_activity[period][channel.name] = period_activity[period].get(channel.name, 0) + count
+
+        # Channels the backfill hasn't finished yet are still counted from their history
+        pending = [channel for channel in guild.text_channels if channel.id not in complete]
+        report_progress(channels_done=len(guild.text_channels) - len(pending), channels_total=len(guild.text_channels))
+        scan = lambda channel: count_channel_months(channel, start, end)
+        async for channel, month_counts in get_scanner(self.bot).scan(pending, scan):
+            for period, count in (month_counts or {}).items():
+                period_activity.setdefault(period, {})
+                period_activity[period][channel.name] = period_activity[period].get(channel.name, 0) + count
+            report_progress(channels_done=1)
+
+        return period_activity
+
+    async def collect_hour_of_week(self, guild, start, end):
+        """Returns 7x24 nested lists of message counts by UTC weekday (Monday first) and hour in [start, end)."""
+        complete, grid = await self.columns.hour_of_week(guild.id, start, end)
+        grid = grid.tolist()
+
+        pending = [channel for channel in guild.text_channels if channel.id not in complete]
+        report_progress(channels_done=len(guild.text_channels) - len(pending), channels_total=len(guild.text_channels))
+        after, before = snowflake_bounds(start, end)
+        scan = lambda channel: count_partitioned(channel, hour_of_week_key, after, before)
+        async for channel, counts in get_scanner(self.bot).scan(pending, scan):
+            for (weekday, hour), count in (counts or {}).items():
+                grid[weekday][hour] += count
+            report_progress(channels_done=1)
+
+        return grid
+
+    async def send_heatmap(self, ctx, start, end, range_text):
+        grid = await get_result_cache(self.bot).get_or_compute(
+            (ctx.guild.id, 'heatmap', None, start, end), lambda: self.collect_hour_of_week(ctx.guild, start, end), (start, end)
+        )
+
+        embed = discord.Embed(title='Server Activity Heatmap', color=discord.Color.blue(), timestamp=datetime.utcnow())
+        embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon.url)
+        embed.set_footer(text=f'Messages by weekday and hour (UTC) for {range_text}')
+
+        total_messages = sum(map(sum, grid))
+        if not total_messages:
+            embed.add_field(name='Total Messages', value='No messages found.', inline=False)
+            await ctx.send(embed=embed)
+            return
+
+        weekday, hour = max(((day, hour) for day in range(7) for hour in range(24)), key=lambda cell: grid[cell[0]][cell[1]])
+        embed.add_field(name='Total Messages', value=f'{total_messages:,}', inline=True)
+        embed.add_field(name='Busiest Hour', value=f'{WEEKDAYS[weekday]} {hour:02d}:00-{hour:02d}:59 ({grid[weekday][hour]:,} messages)', inline=True)
+
+        png = await self.charts.render(
+            'heatmap', grid=grid, title='Messages by Weekday and Hour (UTC)',
+            xlabels=[f'{hour:02d}' for hour in range(24)], ylabels=WEEKDAYS,
+        )
+        file = discord.File(io.BytesIO(png), filename='activity_heatmap.png')
+        embed.set_image(url='attachment://activity_heatmap.png')
+        await ctx.send(embed=embed, file=file)
+
+    @commands.command(name='serverstats', aliases=['sstats'], help='Show server message statistics. Optionally specify a month (e.g., June), a --from/--to range (YYYY, YYYY-MM or YYYY-MM-DD), --heatmap for activity by weekday and hour, or --approx for quick sampled estimates')
+    async def server_stats(self, ctx, *args):
+        try:
+            positionals, options = parse_options(args, flags=('from', 'to'), switches=('heatmap', 'approx'))
+            start, end = parse_range(options)
+        except commands.BadArgument as e:
+            await ctx.send(str(e))
+            return
+
+        if options.get('heatmap'):
+            range_text = f"{options.get('from', 'the beginning')} to {options.get('to', 'now')}"
+            await get_job_manager(self.bot).submit(
+                ctx, 'heatmap', lambda: self.send_heatmap(ctx, start, end, range_text), key=('heatmap', start, end)
+            )
+            return
+
+        if options.get('approx'):
+            if start is None and end is None:
+                start, end = time_bounds(year=datetime.utcnow().year)
+                range_text = str(datetime.utcnow().year)
+            else:
+                range_text = f"{options.get('from', 'the beginning')} to {options.get('to', 'now')}"
+            await get_job_manager(self.bot).submit(
+                ctx, 'serverstats', lambda: self.send_approx_stats(ctx, start, end, range_text), key=('serverstats_approx', start, end)
+            )
+            return
+
+        month = positionals[0] if positionals else None
+
+        target_month = None
+        if month:
+            target_month = parse_month(month)
+            if target_month is None:
+                await ctx.send('Invalid month. Use a month name such as June or Jun.')
+                return
+
+        # Reading history can take minutes, so it runs as a background job that reports its progress
+        await get_job_manager(self.bot).submit(
+            ctx, 'serverstats', lambda: self.send_server_stats(ctx, month, target_month, start, end), key=('serverstats', start, end)
+        )
 
-    @commands.command(name='serverstats', aliases=['sstats'], help='Show server message statistics. Optionally specify a month (e.g., June)')
-    async def server_stats(self, ctx, month: str = None):
+    async def send_server_stats(self, ctx, month, target_month, start, end):
         current_date = datetime.utcnow()
-        total_messages = 0
-        month_activity = {}  # Dictionary to store message counts per month and per channel
-
-        # Calculate message counts for each channel and each month
-        for channel in ctx.guild.text_channels:
-            async for message in channel.history(limit=None):
-                if message.created_at.year == current_date.year:
-                    month_name = message.created_at.strftime('%B')
-                    if month_name not in month_activity:
-                        month_activity[month_name] = {}
-                    if channel.name not in month_activity[month_name]:
-                        month_activity[month_name][channel.name] = 0
-                    month_activity[month_name][channel.name] += 1
-
-                    if month and message.created_at.strftime('%b').lower() == month.lower():
-                        total_messages += 1
+
+        # Without an explicit range, statistics cover the current year
+        ranged = start is not None or end is not None
+        if not ranged:
+            start, end = time_bounds(year=current_date.year)
+
+        # Identical requests share one computation and reuse its result until new messages land in the window
+        period_activity = await get_result_cache(self.bot).get_or_compute(
+            (ctx.guild.id, 'serverstats', None, start, end), lambda: self.collect_period_activity(ctx.guild, start, end), (start, end)
+        )
+
+        # Months are labelled by name, with the year added when an explicit range was asked for
+        label_format = '%B %Y' if ranged else '%B'
+        month_activity = {
+            datetime.strptime(period, '%Y-%m').strftime(label_format): period_activity[period]
+            for period in sorted(period_activity)
+        }
+
+        # Combine every occurrence of the requested month within the range
+        selected_month = {}
+        if target_month:
+            for period, channel_counts in period_activity.items():
+                if int(period[5:]) == target_month:
+                    for channel_name, count in channel_counts.items():
+                        selected_month[channel_name] = selected_month.get(channel_name, 0) + count
 
         # Determine the month with the highest activity
         if month_activity:
@@ -38,32 +183,26 @@ class Stats(commands.Cog):
         # Create an embed for displaying statistics
         embed = discord.Embed(title='Server Message Statistics', color=discord.Color.blue(), timestamp=current_date)
         embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon.url)
+        file = None
 
         if month:
             embed.set_footer(text=f'Statistics for {month.capitalize()}')
-            total_messages = sum(month_activity.get(month.capitalize(), {}).values())
+            total_messages = sum(selected_month.values())
             if total_messages:
                 channel_names = []
                 message_counts = []
-                for channel_name, count in month_activity.get(month.capitalize(), {}).items():
+                for channel_name, count in sorted(selected_month.items()):
                     embed.add_field(name=channel_name, value=f'• **{count}** messages', inline=True)
                     channel_names.append(channel_name)
                     message_counts.append(count)
 
-                # Generate a pie chart for the message distribution across channels
-                plt.figure(figsize=(8, 6))
-                plt.pie(message_counts, labels=channel_names, autopct='%1.1f%%', startangle=140)
-                plt.title(f'Message Distribution in {month.capitalize()}')
-                plt.axis('equal')
-
-                # Save the pie chart to a BytesIO object
-                buf = io.BytesIO()
-                plt.savefig(buf, format='png')
-                buf.seek(0)
-                plt.close()
+                # Render a pie chart for the message distribution across channels
+                png = await self.charts.render(
+                    'pie', labels=channel_names, counts=message_counts, title=f'Message Distribution in {month.capitalize()}'
+                )
 
                 # Send the pie chart as a file
-                file = discord.File(buf, filename='channel_distribution.png')
+                file = discord.File(io.BytesIO(png), filename='channel_distribution.png')
                 embed.set_image(url='attachment://channel_distribution.png')
             else:
                 embed.add_field(name=f'Total Messages in {month.capitalize()}', value='No messages found.', inline=False)
@@ -74,27 +213,17 @@ class Stats(commands.Cog):
             months = list(month_activity.keys())
             message_counts = [sum(channel_counts.values()) for channel_counts in month_activity.values()]
 
-            # Generate a line chart for the trend of messages over the months
-            plt.figure(figsize=(12, 6))
-            sns.lineplot(x=months, y=message_counts, marker='o')
-            plt.xlabel('Months')
-            plt.ylabel('Messages')
-            plt.title('Monthly Message Activity Trend')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-
-            # Save the line chart to a BytesIO object
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png')
-            buf.seek(0)
-            plt.close()
+            # Render a line chart for the trend of messages over the months
+            png = await self.charts.render(
+                'line', x=months, y=message_counts, title='Monthly Message Activity Trend', xlabel='Months', ylabel='Messages'
+            )
 
             # Send the line chart as a file
-            file = discord.File(buf, filename='monthly_trend.png')
+            file = discord.File(io.BytesIO(png), filename='monthly_trend.png')
             embed.set_image(url='attachment://monthly_trend.png')
 
-            # Display activity for each month
-            for month_name, channel_counts in month_activity.items():
+            # Display activity for each month, most recent last, within the embed's field limit
+            for month_name, channel_counts in list(month_activity.items())[-MAX_MONTH_FIELDS:]:
                 channels_info = '\n'.join(f'• **{channel}:** {count} messages' for channel, count in channel_counts.items())
                 embed.add_field(name=f'{month_name} Activity', value=channels_info, inline=True)
 
@@ -106,5 +235,133 @@ class Stats(commands.Cog):
         else:
             await ctx.send(embed=embed, file=file)
 
+    async def estimate_activity(self, guild, start, end):
+        """Returns {channel_id: Estimate} of messages in [start, end), keyed by author.
+
+        Indexed channels are counted exactly; the rest are sampled instead of crawled.
+        """
+        index = get_index(self.bot)
+        complete = await asyncio.to_thread(index.complete_channels, guild.id)
+        counts = await asyncio.to_thread(index.range_counts, guild.id, start, end, ('channel_id', 'author_id'))
+        channel_authors = {}
+        for (channel_id, author_id), count in counts.items():
+            if channel_id in complete:
+                channel_authors.setdefault(channel_id, Counter())[author_id] += count
+        estimates = {channel_id: exact_estimate(author_counts) for channel_id, author_counts in channel_authors.items()}
+
+        pending = [channel for channel in guild.text_channels if channel.id not in complete]
+        report_progress(channels_done=len(guild.text_channels) - len(pending), channels_total=len(guild.text_channels))
+        after, before = snowflake_bounds(start, end)
+        scan = lambda channel: sample_channel(channel, lambda message: message.author.id, after, before)
+        async for channel, estimate in get_scanner(self.bot).scan(pending, scan):
+            if estimate is not None:
+                estimates[channel.id] = estimate
+            report_progress(channels_done=1)
+
+        return estimates
+
+    async def send_approx_stats(self, ctx, start, end, range_text):
+        estimates = await get_result_cache(self.bot).get_or_compute(
+            (ctx.guild.id, 'serverstats_approx', None, start, end), lambda: self.estimate_activity(ctx.guild, start, end), (start, end)
+        )
+
+        embed = discord.Embed(title='Server Message Statistics (approximate)', color=discord.Color.blue(), timestamp=datetime.utcnow())
+        embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon.url)
+        embed.set_footer(text=f'Estimates for {range_text}; ± is a 95% confidence interval')
+
+        channels = [(ctx.guild.get_channel(channel_id), estimate) for channel_id, estimate in estimates.items()]
+        channels = sorted((item for item in channels if item[0] is not None and item[1].total), key=lambda item: -item[1].total)
+        if not channels:
+            embed.add_field(name='Total Messages', value='No messages found.', inline=False)
+            await ctx.send(embed=embed)
+            return
+
+        overall = Estimate()
+        for channel, estimate in channels:
+            overall.merge(estimate)
+        for channel, estimate in channels[:MAX_MONTH_FIELDS - 2]:
+            embed.add_field(name=channel.name, value=describe_estimate(estimate), inline=True)
+
+        embed.add_field(name='Total Messages', value=describe_estimate(overall), inline=False)
+        authors = f'~{overall.sketch.estimate():,} (±{overall.sketch.relative_error:.1%})'
+        if overall.sampled:
+            authors += '\nA lower bound: sampled channels only count authors seen in the sample.'
+        embed.add_field(name='Distinct Authors', value=authors, inline=False)
+        await ctx.send(embed=embed)
+
+    async def export_rows(self, guild, start, end, writer):
+        """Writes every message in [start, end) to ``writer`` in batches of BATCH_SIZE rows."""
+        index = get_index(self.bot)
+        complete = await asyncio.to_thread(index.complete_channels, guild.id)
+        indexed = [channel.id for channel in guild.text_channels if channel.id in complete]
+        pending = [channel for channel in guild.text_channels if channel.id not in complete]
+        report_progress(channels_total=len(guild.text_channels))
+
+        # Indexed channels are paged out of the index in time order
+        after = None
+        while True:
+            rows = await asyncio.to_thread(index.export_rows, guild.id, indexed, start, end, after, BATCH_SIZE)
+            if not rows:
+                break
+            await writer.write(rows)
+            report_progress(messages_scanned=len(rows))
+            after = (rows[-1][3], rows[-1][0])
+        report_progress(channels_done=len(indexed))
+
+        # The rest are read from history one channel at a time, so only one batch is ever buffered
+        history_after, history_before = snowflake_bounds(start, end)
+        for channel in pending:
+            rows = []
+            try:
+                async for message in channel.history(limit=None, after=history_after, before=history_before, oldest_first=True):
+                    rows.append((message.id, channel.id, message.author.id, int(message.created_at.timestamp()), len(message.content)))
+                    if len(rows) == BATCH_SIZE:
+                        await writer.write(rows)
+                        report_progress(messages_scanned=len(rows))
+                        rows = []
+            except discord.Forbidden:
+                pass
+            await writer.write(rows)
+            report_progress(channels_done=1, messages_scanned=len(rows))
+
+    async def send_export(self, ctx, file_format, start, end):
+        async def upload(path, part):
+            await ctx.send(f'Activity export, part {part}:', file=discord.File(path))
+
+        with tempfile.TemporaryDirectory() as directory:
+            writer = ExportWriter(directory, f'activity-{ctx.guild.id}', file_format, ctx.guild.filesize_limit, upload)
+            try:
+                await self.export_rows(ctx.guild, start, end, writer)
+            except BaseException:
+                # Cancelled or failed exports drop their last part rather than upload it truncated
+                await writer.abort()
+                raise
+            await writer.close()
+
+        if writer.rows:
+            await ctx.send(f'Exported {writer.rows:,} messages in {writer.parts} file(s).')
+        else:
+            await ctx.send('No messages found to export.')
+
+    @commands.command(name='exportstats', help='Export raw message activity (message id, channel, author, timestamp, length) as a compressed file. Options: --format csv or parquet, and a --from/--to range (YYYY, YYYY-MM or YYYY-MM-DD)')
+    @commands.has_permissions(manage_guild=True)
+    async def export_stats(self, ctx, *args):
+        try:
+            _, options = parse_options(args, flags=('from', 'to', 'format'))
+            start, end = parse_range(options)
+        except commands.BadArgument as e:
+            await ctx.send(str(e))
+            return
+
+        file_format = options.get('format', 'csv').lower()
+        if file_format not in ('csv', 'parquet'):
+            await ctx.send('Invalid format. Use csv or parquet.')
+            return
+        if not format_available(file_format):
+            await ctx.send('Parquet export needs the pyarrow package installed on the bot host.')
+            return
+
+        await get_job_manager(self.bot).submit(ctx, 'export', lambda: self.send_export(ctx, file_format, start, end))
+
 async def setup(bot):
     await bot.add_cog(Stats(bot))
@@ -2,10 +2,50 @@ import discord
 from discord.ext import commands
 from datetime import timedelta
 import re
+from utils.guild_summary import get_guild_summaries
+from utils.user_cache import UserID, get_user_cache
 
 class Utility(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.summaries = get_guild_summaries(bot)
+        self.users = get_user_cache(bot)
+
+    # Member counts and the owner are kept up to date here so serverinfo never walks the member list
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        self.summaries.build(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.summaries.build(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.summaries.drop(guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        self.summaries.member_changed(member.guild.id, member, 1)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload):
+        self.summaries.member_changed(payload.guild_id, payload.user, -1)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if after.id == after.guild.owner_id:
+            self.summaries.owner_changed(after.guild.id, after.id, after)
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before, after):
+        if before.owner_id != after.owner_id:
+            self.summaries.owner_changed(after.id, after.owner_id, after.owner)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before, after):
+        # A changed avatar or name makes the cached profile stale
+        self.users.invalidate(after.id)
 
     @commands.command(name='ping', help='Check the bot\'s latency')
     async def ping(self, ctx):
@@ -32,12 +72,9 @@ class Utility(commands.Cog):
             await ctx.send(f'Failed to fetch avatar. Error: {e}')
 
     @commands.command(name='banner', help='Get the banner of a user by mention, Discord user ID, or the author\'s banner if no ID is provided')
-    async def banner(self, ctx, user: discord.User = None):
-        if user is None:
-            user = ctx.author
-        
+    async def banner(self, ctx, user_id: UserID = None):
         try:
-            user = await self.bot.fetch_user(user.id)
+            user = await self.users.fetch(user_id or ctx.author.id)
             
             if user.banner:
                 banner_url = user.banner.url
@@ -54,12 +91,9 @@ class Utility(commands.Cog):
             await ctx.send(f'Failed to fetch banner. Error: {e}')
 
     @commands.command(name='userinfo', aliases=['ui'], help='Show information about a user')
-    async def userinfo(self, ctx, user: discord.User = None):
-        if user is None:
-            user = ctx.author
-        
+    async def userinfo(self, ctx, user_id: UserID = None):
         try:
-            user = await self.bot.fetch_user(user.id)  # Ensure we fetch the full user object
+            user = await self.users.fetch(user_id or ctx.author.id)  # Ensure we have the full user object, banner included
             embed = discord.Embed(title=f"User Info - {user.name}", color=discord.Color.blue())
             embed.set_thumbnail(url=user.avatar.url if user.avatar else user.default_avatar.url)
 
@@ -96,9 +130,10 @@ class Utility(commands.Cog):
     @commands.command(name='serverinfo', aliases=['si'], help='Show detailed information about the server')
     async def serverinfo(self, ctx):
      guild = ctx.guild
+     summary = await self.summaries.get(guild)
     
-    # Fetching the owner
-     owner = await self.bot.fetch_user(guild.owner_id)
+    # The owner comes from the member cache, or from a cached gateway lookup when members aren't cached
+     owner = await self.summaries.owner(guild) or 'Unknown'
     
     # Getting the number of roles
      role_count = len(guild.roles)
@@ -114,8 +149,8 @@ class Utility(commands.Cog):
     # Getting the number of members
      member_count = guild.member_count
     
-    # Getting the number of bots
-     bot_count = sum(1 for member in guild.members if member.bot)
+    # Getting the number of bots, which unchunked guilds count in the background on first use
+     bot_count = summary.bots if summary.bots is not None else 'Counting…'
     
     # Getting the server boost level
      boost_level = guild.premium_tier
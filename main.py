@@ -1,8 +1,13 @@
 # main.py
+import time
+started_at = time.perf_counter()
+
 import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
+from utils.perf import perf
+from utils.snapshot import get_snapshots
 
 load_dotenv()
 
@@ -12,20 +17,32 @@ intents.message_content = True
 intents.members = True
 intents.webhooks = True
 intents.guilds = True
-bot = commands.Bot(command_prefix='.', intents=intents)
+# LEAN_MEMBERS=1 skips member chunking and the member cache; commands that need members fetch them on demand
+lean_members = bool(os.getenv('LEAN_MEMBERS'))
+member_cache_flags = discord.MemberCacheFlags.none() if lean_members else discord.MemberCacheFlags.from_intents(intents)
+# Message logging keeps its own compact store of recent messages, so discord.py's cache of full Message objects is off
+bot = commands.Bot(
+    command_prefix='.', intents=intents, max_messages=None,
+    chunk_guilds_at_startup=not lean_members, member_cache_flags=member_cache_flags, http_trace=perf.http_trace,
+)
+
+# (phase, seconds) pairs printed once the bot is ready
+startup_timings = [('imports', time.perf_counter() - started_at)]
 
 async def load_cogs():
     cogs_loaded = []
     cogs_failed = []
 
-    for filename in os.listdir('./cogs'):
+    for filename in sorted(os.listdir('./cogs')):
         if filename.endswith('.py'):
             cog_name = f'cogs.{filename[:-3]}'
+            cog_started = time.perf_counter()
             try:
                 await bot.load_extension(cog_name)
                 cogs_loaded.append(cog_name)
             except Exception as e:
                 cogs_failed.append((cog_name, str(e)))
+            startup_timings.append((f'setup {cog_name}', time.perf_counter() - cog_started))
 
     print("Cogs loaded successfully:")
     for cog in cogs_loaded:
@@ -36,9 +53,27 @@ async def load_cogs():
         for cog, error in cogs_failed:
             print(f"- {cog}: {error}")
 
+def print_startup_report():
+    print("Startup timings:")
+    for phase, seconds in startup_timings:
+        print(f"- {phase}: {seconds * 1000:.1f} ms")
+    print(f"- total: {(time.perf_counter() - started_at) * 1000:.1f} ms")
+
 @bot.event
-async def on_ready(): 
+async def setup_hook():
+    # Runs once per process, before the gateway connects, unlike on_ready which fires on every reconnect
     await load_cogs()
+    # Every cog has restored its state from the last snapshot by now
+    get_snapshots(bot).finish_restore()
+    bot.setup_finished_at = time.perf_counter()
+
+@bot.event
+async def on_ready():
+    if not getattr(bot, 'startup_reported', False):
+        startup_timings.append(('gateway connect', time.perf_counter() - bot.setup_finished_at))
+        print_startup_report()
+        bot.startup_reported = True
     print(f'{bot.user} has connected to Discord!')
 
-bot.run(os.getenv('DISCORD_TOKEN'))
+if __name__ == '__main__':
+    bot.run(os.getenv('DISCORD_TOKEN'))
@@ -0,0 +1,110 @@
+# tests/test_activity_index.py
+import os
+import random
+import tempfile
+import time
+import unittest
+from collections import Counter
+from benchmarks.generator import make_guild
+from utils.activity_index import ActivityIndex, message_row, time_bounds
+
+GROUPINGS = (('channel_id',), ('author_id',), ('author_id', 'channel_id'))
+
+
+def guild_rows(guild):
+    return [message_row(channel.message(position)) for channel in guild.text_channels for position in range(len(channel.message_ids))]
+
+
+def expected_counts(rows, start=None, end=None, group_by=('channel_id',), period=None, author_ids=None, month=None):
+    """Counts rows the slow way, to check the index's rollup queries against."""
+    columns = {'channel_id': 2, 'author_id': 3}
+    counts = Counter()
+    for row in rows:
+        created_at = row[4]
+        if start is not None and created_at < start or end is not None and created_at >= end:
+            continue
+        if author_ids is not None and row[3] not in author_ids:
+            continue
+        if month is not None and time.gmtime(created_at).tm_mon != month:
+            continue
+        key = tuple(row[columns[column]] for column in group_by)
+        if period:
+            key = (time.strftime(period, time.gmtime(created_at)),) + key
+        counts[key] += 1
+    return counts
+
+
+class ActivityIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = ActivityIndex(os.path.join(self.directory.name, 'activity.db'))
+        # 400 days of fake messages, so queries span month, day and hour rollups and the raw table
+        _, self.guild, _, _ = make_guild(messages=4000, channels=6, authors=40, days=400, seed=3)
+        self.rows = guild_rows(self.guild)
+        self.index.add_messages(self.rows)
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def assert_counts(self, rows=None, **query):
+        rows = self.rows if rows is None else rows
+        for group_by in GROUPINGS:
+            with self.subTest(group_by=group_by, **query):
+                self.assertEqual(
+                    +self.index.range_counts(self.guild.id, group_by=group_by, **query),
+                    expected_counts(rows, group_by=group_by, **query),
+                )
+
+    def test_message_row(self):
+        channel = self.guild.text_channels[0]
+        message = channel.message(0)
+        self.assertEqual(
+            message_row(message),
+            (message.id, self.guild.id, channel.id, message.author.id, int(message.created_at.timestamp()), len(message.content)),
+        )
+
+    def test_open_range(self):
+        self.assert_counts()
+
+    def test_unaligned_ranges(self):
+        rng = random.Random(1)
+        now = int(time.time())
+        for _ in range(10):
+            start = rng.randrange(now - 400 * 86400, now)
+            end = rng.randrange(start, now + 86400)
+            self.assert_counts(start=start, end=end)
+        self.assert_counts(start=now - 3 * 3600 - 17)
+        self.assert_counts(end=now - 200 * 86400 + 5)
+
+    def test_calendar_ranges(self):
+        year = time.gmtime().tm_year
+        self.assert_counts(**dict(zip(('start', 'end'), time_bounds(year=year))))
+        self.assert_counts(**dict(zip(('start', 'end'), time_bounds(month=1, year=year))))
+
+    def test_period_month_and_author_filters(self):
+        authors = {author.id for author in self.guild.authors[:5]}
+        self.assert_counts(period='%Y-%m')
+        self.assert_counts(author_ids=authors)
+        self.assert_counts(month=time.gmtime().tm_mon)
+        self.assert_counts(period='%Y-%m', author_ids=authors, start=int(time.time()) - 100 * 86400)
+
+    def test_reingesting_does_not_double_count(self):
+        self.index.add_messages(self.rows[:500])
+        self.index.ingest_page(self.guild.id, self.rows[0][2], self.rows[500:600], None, None, False)
+        self.assert_counts()
+
+    def test_removed_messages_are_not_counted(self):
+        removed = {row[0] for row in self.rows[::7]}
+        self.index.remove_messages(list(removed) + [12345])
+        self.index.compact()
+        self.assert_counts(rows=[row for row in self.rows if row[0] not in removed])
+
+    def test_guilds_are_separate(self):
+        self.index.add_messages([(1, self.guild.id + 1, 2, 3, int(time.time()), 0)])
+        self.assert_counts()
+        self.assertEqual(self.index.range_counts(self.guild.id + 1), Counter({(2,): 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
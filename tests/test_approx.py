@@ -0,0 +1,86 @@
+# tests/test_approx.py
+import random
+import unittest
+from collections import Counter
+from benchmarks.generator import make_guild
+from utils.approx import Estimate, HyperLogLog, exact_estimate, sample_channel
+
+
+def author_key(message):
+    return message.author.id
+
+
+class HyperLogLogTest(unittest.TestCase):
+    def test_estimates_stay_within_three_standard_errors(self):
+        rng = random.Random(3)
+        for distinct in (10, 1_000, 50_000):
+            with self.subTest(distinct=distinct):
+                sketch = HyperLogLog()
+                # Snowflake-shaped values: close together, low bits barely varying
+                values = sorted(rng.sample(range(1 << 40, (1 << 40) + distinct * 50), distinct))
+                for value in values + values[:distinct // 2]:
+                    sketch.add(value << 22)
+                error = abs(sketch.estimate() - distinct) / distinct
+                self.assertLess(error, 3 * sketch.relative_error)
+
+    def test_merged_sketches_estimate_the_union(self):
+        left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for value in range(0, 6_000):
+            (left if value % 2 else right).add(value)
+            union.add(value)
+        for value in range(0, 3_000):
+            left.add(value)
+        left.merge(right)
+        self.assertEqual(left.registers, union.registers)
+
+
+class SampleChannelTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        _, guild, _, _ = make_guild(messages=20_000, channels=1, authors=40, days=365, seed=11)
+        self.channel = guild.text_channels[0]
+        self.exact = Counter(self.channel.message(position).author.id for position in range(len(self.channel.message_ids)))
+
+    async def test_reading_every_slice_is_exact(self):
+        estimate = await sample_channel(self.channel, author_key, slices=16, samples=16, cap=10_000)
+        self.assertFalse(estimate.sampled)
+        self.assertEqual(estimate.total, sum(self.exact.values()))
+        self.assertEqual(estimate.margin, 0)
+        self.assertEqual(estimate.counts, self.exact)
+
+    async def test_sampled_totals_fall_within_their_margin(self):
+        exact_total = sum(self.exact.values())
+        trials = 20
+        covered = 0
+        for seed in range(trials):
+            estimate = await sample_channel(self.channel, author_key, rng=random.Random(seed))
+            self.assertTrue(estimate.sampled)
+            self.assertGreater(estimate.margin, 0)
+            self.assertAlmostEqual(sum(estimate.counts.values()), estimate.total, delta=1e-6 * exact_total)
+            covered += abs(estimate.total - exact_total) <= estimate.margin
+        # A 95% interval should miss rarely; allow a few misses rather than a flaky exact rate
+        self.assertGreaterEqual(covered, trials - 4)
+
+    async def test_capped_slices_are_extrapolated(self):
+        exact_total = sum(self.exact.values())
+        estimate = await sample_channel(self.channel, author_key, slices=8, samples=8, cap=100, rng=random.Random(0))
+        # Each slice holds about 2,500 messages but only 100 are read, so the total comes from scaling
+        self.assertLess(abs(estimate.total - exact_total) / exact_total, 0.1)
+
+    async def test_messages_without_a_key_are_not_counted(self):
+        estimate = await sample_channel(self.channel, lambda message: None, slices=4, samples=4, cap=10_000)
+        self.assertEqual((estimate.total, estimate.counts), (0, Counter()))
+
+
+class EstimateTest(unittest.TestCase):
+    def test_merged_estimates_add_totals_and_variances(self):
+        merged = Estimate()
+        merged.merge(exact_estimate({1: 3, 2: 4}))
+        merged.merge(Estimate(total=10.0, variance=4.0, counts=Counter({2: 10.0}), sampled=True))
+        self.assertEqual((merged.total, merged.variance, merged.sampled), (17.0, 4.0, True))
+        self.assertEqual(merged.counts, Counter({1: 3, 2: 14.0}))
+        self.assertAlmostEqual(merged.margin, 1.96 * 2)
+        self.assertEqual(merged.sketch.estimate(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
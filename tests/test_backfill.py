@@ -0,0 +1,104 @@
+# tests/test_backfill.py
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+import discord
+from benchmarks.fakes import FakeTextChannel
+from benchmarks.generator import make_guild
+from utils.activity_index import ActivityIndex
+from utils.backfill import Backfill
+
+
+def post(channel, count):
+    """Appends ``count`` messages newer than everything in the channel, as if posted while the bot was offline."""
+    newest = channel.message_ids[-1] if channel.message_ids else channel.id
+    now = discord.utils.time_snowflake(discord.utils.utcnow())
+    for offset in range(1, count + 1):
+        channel.message_ids.append(max(newest, now) + offset)
+        channel.author_indices.append(0)
+
+
+class BackfillTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.bot, self.guild, _, self.rest = make_guild(messages=1500, channels=3, authors=10, days=30, seed=5)
+        self.bot.activity_index = self.index = ActivityIndex(os.path.join(self.directory.name, 'activity.db'))
+        self.backfill = Backfill(self.bot)
+
+    async def asyncTearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def indexed(self):
+        return sum(self.index.range_counts(self.guild.id).values())
+
+    def stored(self):
+        return sum(len(channel.message_ids) for channel in self.guild.text_channels)
+
+    async def test_restart_catches_up_complete_channels(self):
+        await self.backfill.crawl_guild(self.guild)
+        self.assertEqual(self.indexed(), self.stored())
+        self.assertEqual(self.index.complete_channels(self.guild.id), {channel.id for channel in self.guild.text_channels})
+
+        post(self.guild.text_channels[0], 250)
+        self.rest.routes.clear()
+        await Backfill(self.bot).crawl_guild(self.guild)
+        self.assertEqual(self.indexed(), self.stored())
+        # The fake only counts pages that hold messages: three for the 250 new ones
+        self.assertEqual(self.rest.routes['channel.history'], 3)
+
+    async def test_empty_channel_catches_up(self):
+        empty = FakeTextChannel(self.guild, self.guild.text_channels[-1].id + 1, 'empty', [], [], self.rest)
+        self.guild.add_channel(empty)
+        await self.backfill.crawl_guild(self.guild)
+        self.assertEqual(self.index.get_cursor(empty.id)[:3], (None, None, 1))
+
+        post(empty, 5)
+        await Backfill(self.bot).crawl_guild(self.guild)
+        self.assertEqual(self.indexed(), self.stored())
+        self.assertEqual(self.index.get_cursor(empty.id)[0], empty.message_ids[-1])
+
+    async def test_live_rows_advance_high_water_after_catch_up(self):
+        await self.backfill.crawl_guild(self.guild)
+        channel = self.guild.text_channels[0]
+        self.assertIn(channel.id, self.backfill.caught_up)
+
+        # Messages the bot saw live move the high-water mark, so the next crawl doesn't fetch them again
+        post(channel, 150)
+        rows = [(message_id, self.guild.id, channel.id, self.guild.authors[0].id, 0, 0) for message_id in channel.message_ids[-150:]]
+        self.index.add_messages(rows)
+        self.index.advance_high_water({channel.id: channel.message_ids[-1]})
+        self.rest.routes.clear()
+        await Backfill(self.bot).crawl_guild(self.guild)
+        self.assertEqual(self.rest.routes['channel.history'], 0)
+        self.assertEqual(self.indexed(), self.stored())
+
+    async def test_high_water_never_moves_back(self):
+        await self.backfill.crawl_guild(self.guild)
+        channel = self.guild.text_channels[0]
+        high_water = self.index.get_cursor(channel.id)[0]
+        self.index.advance_high_water({channel.id: high_water - 1000})
+        self.assertEqual(self.index.get_cursor(channel.id)[0], high_water)
+
+    async def test_http_error_in_one_channel_does_not_stop_the_rest(self):
+        broken = self.guild.text_channels[0]
+
+        async def history(**kwargs):
+            raise discord.HTTPException(SimpleNamespace(status=503, reason='Service Unavailable'), 'upstream error')
+            yield
+
+        broken.history = history
+        await self.backfill.crawl_guild(self.guild)
+        self.assertEqual(
+            self.index.complete_channels(self.guild.id), {channel.id for channel in self.guild.text_channels[1:]}
+        )
+
+        fraction, ingested, complete = await self.backfill.progress(self.guild)
+        self.assertEqual(complete, len(self.guild.text_channels) - 1)
+        self.assertEqual(ingested, self.stored() - len(broken.message_ids))
+        self.assertLess(fraction, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
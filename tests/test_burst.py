@@ -0,0 +1,109 @@
+# tests/test_burst.py
+import datetime
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from cogs.member_logging import MemberLogging
+from utils.burst import BurstDetector
+from utils.config_store import ConfigStore
+
+GUILD_ID = 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMember:
+    def __init__(self, member_id):
+        self.id = member_id
+        self.guild = SimpleNamespace(id=GUILD_ID)
+        self.created_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        self.joined_at = self.created_at
+        self.avatar = SimpleNamespace(url='https://example.invalid/a.png')
+
+    def __str__(self):
+        return f'user{self.id}'
+
+
+class BurstDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.detector = BurstDetector(threshold=3, window=10.0, clock=self.clock)
+
+    def test_flags_once_the_threshold_is_reached(self):
+        self.assertEqual([self.detector.record() for _ in range(4)], [False, False, True, True])
+
+    def test_events_outside_the_window_are_forgotten(self):
+        self.detector.record()
+        self.detector.record()
+        self.clock.now = 10.5
+        self.assertFalse(self.detector.record())
+        self.assertFalse(self.detector.is_bursting())
+
+    def test_burst_ends_once_the_window_passes(self):
+        for _ in range(3):
+            self.detector.record()
+        self.assertTrue(self.detector.is_bursting())
+        self.clock.now = 10.0
+        self.assertTrue(self.detector.is_bursting())
+        self.clock.now = 10.1
+        self.assertFalse(self.detector.is_bursting())
+
+
+class RaidCoalescingTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        bot = SimpleNamespace(config_store=ConfigStore(os.path.join(self.directory.name, 'config.json')))
+        self.cog = MemberLogging(bot)
+        self.cog.config[str(GUILD_ID)] = {'raid_threshold': 5, 'raid_window': 10.0, 'raid_attach_file': True}
+        self.clock = FakeClock()
+        self.cog.detectors[(GUILD_ID, 'join')] = BurstDetector(5, 10.0, clock=self.clock)
+        self.sent = []
+
+        async def send_log(embed, guild_id, file=None):
+            self.sent.append((embed, file))
+        self.cog.send_log = send_log
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    async def join(self, count, start, spacing):
+        for n in range(count):
+            self.clock.now = start + n * spacing
+            await self.cog.on_member_join(FakeMember(start * 1000 + n))
+
+    async def test_slow_joins_are_logged_one_by_one(self):
+        await self.join(20, start=0, spacing=3.0)
+        self.assertEqual([embed.title for embed, _ in self.sent], ['Member Joined'] * 20)
+
+    async def test_raid_is_summarized_and_per_member_logs_resume_after_the_cooldown(self):
+        # Four joins go out individually, the fifth trips the detector and the rest of the raid is buffered
+        await self.join(200, start=0, spacing=0.01)
+        self.assertEqual(len(self.sent), 4)
+
+        await self.cog.send_summaries()
+        embed, file = self.sent[-1]
+        self.assertEqual(embed.title, 'Raid Detected: 196 Members Joined')
+        self.assertEqual(file.fp.read().decode().count('\n'), 195)
+
+        # Still inside the window: stragglers keep going into the next summary
+        await self.join(2, start=5, spacing=1.0)
+        self.assertEqual(len(self.sent), 5)
+
+        # Once the rate has dropped the buffer is flushed one last time and single embeds come back
+        self.clock.now = 30
+        await self.cog.send_summaries()
+        self.assertEqual(self.sent[-1][0].title, 'Raid Detected: 2 Members Joined')
+        self.assertNotIn((GUILD_ID, 'join'), self.cog.raid_buffers)
+        await self.join(1, start=30, spacing=0)
+        self.assertEqual(self.sent[-1][0].title, 'Member Joined')
+
+
+if __name__ == '__main__':
+    unittest.main()
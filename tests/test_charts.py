@@ -0,0 +1,46 @@
+# tests/test_charts.py
+import unittest
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+from utils import chart_worker
+from utils.charts import ChartRenderer
+
+
+class BrokenExecutor(Executor):
+    """Stands in for a process pool whose worker died."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool('A child process terminated abruptly'))
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shut_down = True
+
+
+class ChartRendererTest(unittest.IsolatedAsyncioTestCase):
+    async def test_broken_pool_is_replaced(self):
+        broken = BrokenExecutor()
+        healthy = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(healthy.shutdown)
+        renderer = ChartRenderer()
+        with mock.patch.object(renderer, '_start_pool', side_effect=[broken, healthy]), \
+                mock.patch.object(chart_worker, 'render', return_value=b'png'):
+            self.assertEqual(await renderer.render('pie', labels=['a'], counts=[1], title='t'), b'png')
+        self.assertTrue(broken.shut_down)
+        self.assertIs(renderer._executor, healthy)
+
+    async def test_pool_broken_twice_raises_and_is_replaced_next_time(self):
+        renderer = ChartRenderer()
+        with mock.patch.object(renderer, '_start_pool', side_effect=[BrokenExecutor(), BrokenExecutor()]):
+            with self.assertRaises(BrokenProcessPool):
+                await renderer.render('pie', labels=['a'], counts=[1], title='t')
+        self.assertIsNone(renderer._executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
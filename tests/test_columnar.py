@@ -0,0 +1,99 @@
+# tests/test_columnar.py
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from benchmarks.generator import make_guild
+from utils import columnar
+from utils.activity_index import ActivityIndex, message_row
+from utils.columnar import ColumnCache
+
+
+def ingest(index, guild):
+    rows = []
+    for channel in guild.text_channels:
+        channel_rows = [message_row(channel.message(position)) for position in range(len(channel.message_ids))]
+        index.ingest_page(guild.id, channel.id, channel_rows, channel.message_ids[-1], channel.message_ids[0], True)
+        rows.extend(channel_rows)
+    return rows
+
+
+class ColumnCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = ActivityIndex(os.path.join(self.directory.name, 'activity.db'))
+        _, self.guild, _, _ = make_guild(messages=600, channels=3, authors=12, days=30, seed=5)
+        self.rows = ingest(self.index, self.guild)
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def test_rows_written_during_a_load_are_caught_up(self):
+        cache = ColumnCache(self.index)
+        index = self.index
+        late = [(row[0] + 2**40,) + row[1:] for row in self.rows[:10]]
+
+        class WritingColumns(columnar.ActivityColumns):
+            # The first chunk read writes to the index, which only works if the load doesn't hold its lock
+            def append(self, *args, **kwargs):
+                if late:
+                    rows = late[:]
+                    late.clear()
+                    index.add_messages(rows)
+                super().append(*args, **kwargs)
+
+        with mock.patch.object(columnar, 'ActivityColumns', WritingColumns):
+            _, counts = cache._query(self.guild.id, 'count', 'channel')
+        self.assertEqual(sum(counts.values()), len(self.rows) + 10)
+
+    def test_least_recently_queried_guild_is_evicted(self):
+        _, other, _, _ = make_guild(messages=600, channels=3, authors=12, days=30, seed=6)
+        ingest(self.index, other)
+        cache = ColumnCache(self.index, max_bytes=1)
+        cache._query(self.guild.id, 'count', 'channel')
+        cache._query(other.id, 'count', 'channel')
+        self.assertEqual(list(cache.guilds), [other.id])
+
+    def test_deleted_rows_are_compacted_into_the_base(self):
+        cache = ColumnCache(self.index)
+        cache._query(self.guild.id, 'count', 'author')
+        deleted = self.rows[::5]
+        self.index.remove_messages([row[0] for row in deleted])
+        columns = cache.guilds[self.guild.id]
+        self.assertEqual(columns.removed.size, 0)
+        self.assertEqual(columns.rows.size, len(self.rows) - len(deleted))
+
+        expected = {}
+        for n, row in enumerate(self.rows):
+            if n % 5:
+                expected[row[3]] = expected.get(row[3], 0) + 1
+        _, counts = cache._query(self.guild.id, 'count', 'author')
+        self.assertEqual(counts, expected)
+
+    def test_newly_complete_channel_is_merged_without_a_reload(self):
+        channel = self.guild.text_channels[0]
+        with self.index.lock, self.index.conn:
+            self.index.conn.execute('UPDATE backfill_cursors SET complete = 0 WHERE channel_id = ?', (channel.id,))
+        cache = ColumnCache(self.index)
+        complete, counts = cache._query(self.guild.id, 'count', 'channel')
+        self.assertNotIn(channel.id, complete)
+        columns = cache.guilds[self.guild.id]
+
+        self.index.ingest_page(self.guild.id, channel.id, [], channel.message_ids[-1], channel.message_ids[0], True)
+        with mock.patch.object(columnar.sqlite3, 'connect') as connect:
+            complete, counts = cache._query(self.guild.id, 'count', 'channel')
+        connect.assert_not_called()
+        self.assertIs(cache.guilds[self.guild.id], columns)
+        self.assertEqual(counts[channel.id], len(channel.message_ids))
+
+    def test_rolled_back_writes_never_reach_the_cache(self):
+        cache = ColumnCache(self.index)
+        cache._query(self.guild.id, 'count', 'channel')
+        late = [(self.rows[0][0] + 2**40,) + self.rows[0][1:]]
+        # The cursor update fails after the rows were inserted, rolling the whole page back
+        with self.assertRaises(sqlite3.Error):
+            self.index.ingest_page(self.guild.id, late[0][2], late, object(), None, False)
+        _, counts = cache._query(self.guild.id, 'count', 'channel')
+        self.assertEqual(sum(counts.values()), len(self.rows))
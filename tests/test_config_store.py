@@ -0,0 +1,37 @@
+# tests/test_config_store.py
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from utils.config_store import ConfigStore
+
+
+class ConfigStoreTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'config.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def saved(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    async def test_debounced_flush_writes_once_things_settle(self):
+        store = ConfigStore(self.path, debounce=0.01)
+        store.section('log_channels')['1'] = 2
+        store.mark_dirty()
+        store.mark_dirty()
+        self.assertFalse(os.path.exists(self.path))
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.saved(), {'log_channels': {'1': 2}})
+
+    async def test_close_writes_pending_changes(self):
+        store = ConfigStore(self.path, debounce=60)
+        store.section('allowed_roles')['1'] = [3]
+        store.mark_dirty()
+        await store.close()
+        self.assertIsNone(store.save_handle)
+        self.assertEqual(self.saved(), {'allowed_roles': {'1': [3]}})
@@ -0,0 +1,100 @@
+# tests/test_export.py
+import csv
+import gzip
+import io
+import os
+import random
+import tempfile
+import unittest
+from utils.export import COLUMNS, ExportWriter, format_available
+
+
+def make_rows(count, first=0):
+    return [(first + n, 10, 20, 1_700_000_000 + first + n, (first + n) % 50) for n in range(count)]
+
+
+def read_csv(data):
+    with io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(data)), encoding='utf-8', newline='') as text:
+        return list(csv.reader(text))
+
+
+class ExportWriterTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.uploads = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    async def upload(self, path, part):
+        with open(path, 'rb') as f:
+            self.uploads.append((part, f.read()))
+
+    def writer(self, part_limit=8 * 2**20, file_format='csv'):
+        return ExportWriter(self.directory.name, 'export', file_format, part_limit, self.upload)
+
+    async def test_csv_rows_stream_into_one_part(self):
+        writer = self.writer()
+        await writer.write(make_rows(300))
+        await writer.write([])
+        await writer.write(make_rows(200, first=300))
+        await writer.close()
+        self.assertEqual([part for part, _ in self.uploads], [1])
+        rows = read_csv(self.uploads[0][1])
+        self.assertEqual(tuple(rows[0]), COLUMNS)
+        self.assertEqual([tuple(map(int, row)) for row in rows[1:]], make_rows(500))
+        self.assertEqual((writer.rows, writer.parts), (500, 1))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    async def test_csv_parts_roll_over_before_the_limit(self):
+        rng = random.Random(7)
+        # Random IDs barely compress, so the parts fill up quickly
+        batches = [
+            [(rng.getrandbits(63), rng.getrandbits(63), rng.getrandbits(63), rng.getrandbits(40), rng.randrange(2000)) for _ in range(500)]
+            for _ in range(40)
+        ]
+        part_limit = 256 * 1024
+        writer = self.writer(part_limit)
+        for batch in batches:
+            await writer.write(batch)
+        await writer.close()
+
+        self.assertGreater(len(self.uploads), 2)
+        self.assertEqual([part for part, _ in self.uploads], list(range(1, len(self.uploads) + 1)))
+        self.assertTrue(all(len(data) < part_limit for _, data in self.uploads))
+        rows = []
+        for _, data in self.uploads:
+            part_rows = read_csv(data)
+            self.assertEqual(tuple(part_rows[0]), COLUMNS)
+            rows.extend(tuple(map(int, row)) for row in part_rows[1:])
+        self.assertEqual(rows, [row for batch in batches for row in batch])
+
+    async def test_close_without_rows_uploads_nothing(self):
+        writer = self.writer()
+        await writer.write([])
+        await writer.close()
+        self.assertEqual(self.uploads, [])
+
+    @unittest.skipUnless(format_available('parquet'), 'pyarrow is not installed')
+    async def test_parquet_rows_stream_into_row_groups(self):
+        import pyarrow.parquet as pq
+        writer = self.writer(file_format='parquet')
+        for first in range(0, 3000, 1000):
+            await writer.write(make_rows(1000, first=first))
+        await writer.close()
+        self.assertEqual(len(self.uploads), 1)
+        table = pq.read_table(io.BytesIO(self.uploads[0][1]))
+        self.assertEqual(tuple(table.column_names), COLUMNS)
+        self.assertEqual(pq.ParquetFile(io.BytesIO(self.uploads[0][1])).num_row_groups, 3)
+        self.assertEqual(list(zip(*(table.column(name).to_pylist() for name in COLUMNS))), make_rows(3000))
+
+    async def test_aborted_export_uploads_nothing_and_deletes_the_part(self):
+        writer = self.writer()
+        await writer.write(make_rows(100))
+        await writer.abort()
+        self.assertEqual(self.uploads, [])
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# tests/test_guild_summary.py
+import asyncio
+import unittest
+from types import SimpleNamespace
+from utils.guild_summary import GuildSummaries
+
+GUILD_ID = 1
+OWNER_ID = 2
+
+
+class LeanGuild:
+    """An unchunked guild whose member list is only available as an uncached gateway chunk."""
+
+    def __init__(self, humans, bots):
+        self.id = GUILD_ID
+        self.owner_id = OWNER_ID
+        self.owner = None
+        self.chunked = False
+        self.channels = []
+        self.roles = []
+        self.member_count = humans + bots
+        self.members = [SimpleNamespace(bot=False)] * humans + [SimpleNamespace(bot=True)] * bots
+        self.crawls = 0
+        self.owner_queries = 0
+        self.owner_present = True
+        self.release = asyncio.Event()
+
+    async def chunk(self, cache=True):
+        self.crawls += 1
+        await self.release.wait()
+        return list(self.members)
+
+    async def query_members(self, user_ids, cache=True):
+        self.owner_queries += 1
+        return [SimpleNamespace(id=user_id) for user_id in user_ids] if self.owner_present else []
+
+
+class GuildSummariesTest(unittest.IsolatedAsyncioTestCase):
+    async def test_unchunked_guild_is_counted_once_in_the_background(self):
+        summaries = GuildSummaries()
+        guild = LeanGuild(humans=5, bots=2)
+
+        first, second = await asyncio.gather(summaries.get(guild), summaries.get(guild))
+        self.assertIsNone(first.bots)
+        self.assertIsNone(second.humans)
+
+        guild.release.set()
+        await asyncio.gather(*summaries.counting.values())
+        summary = await summaries.get(guild)
+        self.assertEqual((summary.humans, summary.bots), (5, 2))
+        self.assertEqual(guild.crawls, 1)
+
+
+    async def test_owner_lookup_is_cached_including_misses(self):
+        summaries = GuildSummaries()
+        guild = LeanGuild(humans=1, bots=0)
+        guild.owner_present = False
+        for _ in range(3):
+            self.assertIsNone(await summaries.owner(guild))
+        self.assertEqual(guild.owner_queries, 1)
+
+        # A member update for the owner refreshes the cached lookup without another query
+        member = SimpleNamespace(id=OWNER_ID)
+        summaries.owner_changed(GUILD_ID, OWNER_ID, member)
+        self.assertIs(await summaries.owner(guild), member)
+        self.assertEqual(guild.owner_queries, 1)
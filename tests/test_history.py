@@ -0,0 +1,86 @@
+# tests/test_history.py
+import unittest
+from array import array
+from collections import Counter
+import discord
+from benchmarks.fakes import FakeGuild, FakeTextChannel, FakeUser, RestCounter
+from utils.history import count_partitioned, snowflake_windows
+
+CHANNEL_ID = 1 << 40
+
+
+def make_channel(message_ids):
+    """A fake paginated channel holding ``message_ids``, all posted by one author."""
+    author = FakeUser(7)
+    guild = FakeGuild(1, 'Test Guild', [author], FakeUser(8, bot=True))
+    rest = RestCounter()
+    channel = FakeTextChannel(guild, CHANNEL_ID, 'test', array('q', sorted(message_ids)), array('l', [0] * len(message_ids)), rest)
+    guild.add_channel(channel)
+    return channel, rest
+
+
+class SnowflakeWindowsTest(unittest.TestCase):
+    def assert_partitions(self, after_id, before_id, partitions):
+        windows = snowflake_windows(after_id, before_id, partitions)
+        self.assertLessEqual(len(windows), partitions)
+        covered = []
+        for window_after, window_before in windows:
+            self.assertGreaterEqual(window_after, after_id)
+            self.assertLessEqual(window_before, before_id)
+            covered.extend(range(window_after + 1, window_before))
+        # Every ID strictly between the bounds falls in exactly one window
+        self.assertEqual(covered, list(range(after_id + 1, before_id)))
+
+    def test_windows_cover_range_once(self):
+        for partitions in (1, 2, 3, 4, 7, 16):
+            for after_id, before_id in ((0, 100), (10, 11), (10, 12), (10, 13), (5, 5 + partitions), (1000, 1997)):
+                with self.subTest(partitions=partitions, after_id=after_id, before_id=before_id):
+                    self.assert_partitions(after_id, before_id, partitions)
+
+    def test_empty_range_has_no_windows(self):
+        self.assertEqual(snowflake_windows(10, 10, 4), [])
+        self.assertEqual(snowflake_windows(10, 5, 4), [])
+
+
+class CountPartitionedTest(unittest.IsolatedAsyncioTestCase):
+    async def assert_counts(self, message_ids, after_id, before_id):
+        channel, _ = make_channel(message_ids)
+        expected = Counter(message_id for message_id in message_ids if after_id < message_id < before_id)
+        for partitions in (1, 2, 3, 4, 8, 50):
+            with self.subTest(partitions=partitions):
+                counts = await count_partitioned(
+                    channel, lambda message: message.id, discord.Object(id=after_id), discord.Object(id=before_id), partitions
+                )
+                self.assertEqual(counts, expected)
+
+    async def test_bounds_are_exclusive(self):
+        after_id, before_id = CHANNEL_ID + 1000, CHANNEL_ID + 2000
+        await self.assert_counts([after_id - 1, after_id, after_id + 1, before_id - 1, before_id, before_id + 1], after_id, before_id)
+
+    async def test_messages_on_window_edges_counted_once(self):
+        after_id, before_id = CHANNEL_ID, CHANNEL_ID + 1200
+        # Multiples of every step size used above, so messages sit exactly on window edges
+        message_ids = [after_id + offset for offset in range(1, 1200) if offset % 24 == 0 or offset % 400 in (0, 1, 399)]
+        await self.assert_counts(message_ids, after_id, before_id)
+
+    async def test_range_narrower_than_partitions(self):
+        after_id = CHANNEL_ID + 10
+        await self.assert_counts([after_id, after_id + 1, after_id + 2, after_id + 3], after_id, after_id + 3)
+
+    async def test_whole_channel_by_default(self):
+        now = discord.utils.time_snowflake(discord.utils.utcnow())
+        message_ids = [CHANNEL_ID + 1, CHANNEL_ID + 5000, now - 10]
+        channel, rest = make_channel(message_ids)
+        counts = await count_partitioned(channel, lambda message: message.author.id, partitions=4)
+        self.assertEqual(counts, Counter({7: 3}))
+        # Only the windows holding messages fetch a page: the two oldest share the first one
+        self.assertEqual(rest.routes['channel.history'], 2)
+
+    async def test_key_none_skips_message(self):
+        channel, _ = make_channel([CHANNEL_ID + offset for offset in range(1, 301)])
+        counts = await count_partitioned(channel, lambda message: 'even' if message.id % 2 == 0 else None, partitions=3)
+        self.assertEqual(counts, Counter({'even': 150}))
+
+
+if __name__ == '__main__':
+    unittest.main()
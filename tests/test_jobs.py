@@ -0,0 +1,152 @@
+# tests/test_jobs.py
+import asyncio
+import unittest
+from types import SimpleNamespace
+from utils.jobs import JobManager
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+    async def edit(self, content):
+        self.content = content
+
+
+class FakeContext:
+    def __init__(self, guild_id):
+        self.guild = SimpleNamespace(id=guild_id)
+        self.author = SimpleNamespace(id=100)
+        self.sent = []
+
+    async def send(self, content):
+        message = FakeMessage(content)
+        self.sent.append(message)
+        return message
+
+
+class JobManagerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.manager = JobManager()
+        self.started = []
+        self.releases = {}
+
+    async def asyncTearDown(self):
+        for release in self.releases.values():
+            release.set()
+        await asyncio.gather(*(job.task for job in list(self.manager.jobs.values()) if job.task), return_exceptions=True)
+        await self.settle()
+
+    def work(self, name):
+        """A plain coroutine that records when it starts and finishes when the test releases it."""
+        release = self.releases[name] = asyncio.Event()
+
+        async def run():
+            self.started.append(name)
+            await release.wait()
+        return run
+
+    async def submit(self, guild_id, name, key=None):
+        return await self.manager.submit(FakeContext(guild_id), 'test', self.work(name), key)
+
+    async def settle(self):
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    async def finish(self, name):
+        self.releases[name].set()
+        await self.settle()
+
+    async def test_one_job_per_guild_at_a_time(self):
+        first = await self.submit(1, 'a1')
+        second = await self.submit(1, 'a2')
+        await self.settle()
+        self.assertEqual(self.started, ['a1'])
+        self.assertEqual((first.state, second.state), ('running', 'queued'))
+
+        await self.finish('a1')
+        self.assertEqual(self.started, ['a1', 'a2'])
+        self.assertEqual(first.state, 'finished')
+        self.assertEqual(first.status_message.content, first.describe())
+        await self.finish('a2')
+        self.assertEqual(self.manager.running, {})
+
+    async def test_no_more_than_three_jobs_run_at_once(self):
+        for guild_id in range(1, 6):
+            await self.submit(guild_id, f'g{guild_id}')
+        await self.settle()
+        self.assertEqual(self.started, ['g1', 'g2', 'g3'])
+        self.assertEqual(sum(self.manager.running.values()), 3)
+
+        await self.finish('g2')
+        self.assertEqual(self.started, ['g1', 'g2', 'g3', 'g4'])
+
+    async def test_a_busy_guild_cannot_starve_the_others(self):
+        self.manager.global_limit = 1
+        await self.submit(1, 'blocker')
+        for n in range(3):
+            await self.submit(1, f'a{n}')
+        await self.submit(2, 'b0')
+        await self.submit(3, 'c0')
+        await self.settle()
+
+        for name in ['blocker', 'a0', 'b0', 'c0', 'a1']:
+            await self.finish(name)
+        self.assertEqual(self.started, ['blocker', 'a0', 'b0', 'c0', 'a1', 'a2'])
+
+    async def test_identical_job_follows_the_running_one_outside_the_limits(self):
+        leader = await self.submit(1, 'leader', key='serverstats')
+        other = await self.submit(1, 'other', key='channelstats')
+        follower = await self.submit(1, 'follower', key='serverstats')
+        await self.settle()
+        self.assertEqual(self.started, ['leader', 'follower'])
+        self.assertTrue(follower.follower)
+        self.assertEqual(other.state, 'queued')
+        self.assertEqual(self.manager.running, {1: 1})
+
+        await self.finish('follower')
+        self.assertEqual(self.manager.running, {1: 1})
+        await self.finish('leader')
+        self.assertEqual(self.started, ['leader', 'follower', 'other'])
+        self.assertEqual(leader.state, 'finished')
+
+    async def test_jobs_with_the_same_key_in_other_guilds_do_not_follow(self):
+        self.manager.global_limit = 1
+        await self.submit(1, 'a', key='serverstats')
+        await self.submit(2, 'b', key='serverstats')
+        await self.settle()
+        self.assertEqual(self.started, ['a'])
+
+    async def test_cancel_running_and_queued_jobs(self):
+        running = await self.submit(1, 'running')
+        queued = await self.submit(1, 'queued')
+        after = await self.submit(1, 'after')
+        await self.settle()
+
+        self.manager.cancel(queued)
+        await self.settle()
+        self.assertEqual(queued.state, 'cancelled')
+        self.assertEqual(queued.status_message.content, queued.describe())
+
+        self.manager.cancel(running)
+        await self.settle()
+        self.assertEqual(running.state, 'cancelled')
+        self.assertEqual(self.started, ['running', 'after'])
+        self.assertEqual([job.id for job in self.manager.guild_jobs(1)], [after.id])
+        await self.finish('after')
+
+    async def test_failed_job_reports_the_error_and_frees_its_slot(self):
+        async def broken():
+            raise RuntimeError('boom')
+        ctx = FakeContext(1)
+        job = await self.manager.submit(ctx, 'test', broken)
+        waiting = await self.submit(1, 'next')
+        await self.settle()
+        self.assertEqual(job.state, 'failed')
+        self.assertEqual(ctx.sent[-1].content, f'Job #{job.id} failed: boom')
+        self.assertEqual(waiting.state, 'running')
+        await self.finish('next')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+# tests/test_message_logging.py
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from cogs.message_logging import MessageLogging
+from utils.config_store import ConfigStore
+from utils.message_store import RECORD_OVERHEAD, MessageRecord, RecentMessageStore, author_name, record_from
+
+GUILD_ID = 1
+CHANNEL_ID = 2
+AUTHOR_ID = 3
+
+
+def make_message(message_id, content, name='alice', discriminator='0'):
+    author = SimpleNamespace(id=AUTHOR_ID, name=name, discriminator=discriminator)
+    return SimpleNamespace(
+        id=message_id, author=author, content=content, guild=SimpleNamespace(id=GUILD_ID), channel=SimpleNamespace(id=CHANNEL_ID),
+    )
+
+
+def fields(embed):
+    return {field.name: field.value for field in embed.fields}
+
+
+class RecentMessageStoreTest(unittest.TestCase):
+    def test_least_recently_seen_messages_are_dropped_past_the_budget(self):
+        store = RecentMessageStore(guild_budget=3 * (RECORD_OVERHEAD + 5))
+        for message_id in range(1, 5):
+            store.add(make_message(message_id, 'hello'))
+        self.assertIsNone(store.pop(GUILD_ID, 1))
+        self.assertEqual(store.pop(GUILD_ID, 4).content, 'hello')
+        self.assertEqual(store.stats()['hits'], 1)
+        self.assertEqual(store.stats()['misses'], 1)
+
+    def test_snapshot_round_trip(self):
+        store = RecentMessageStore()
+        store.add(make_message(1, 'héllo'))
+        store.put(GUILD_ID, MessageRecord(2, AUTHOR_ID, 'bob#0420', CHANNEL_ID, ''))
+        restored = RecentMessageStore()
+        restored.restore([memoryview(part) for part in store.dump()], age=0)
+        records = list(restored.guilds[GUILD_ID].records.values())
+        self.assertEqual([(r.id, r.author_name, r.content) for r in records], [(1, 'alice', 'héllo'), (2, 'bob#0420', '')])
+
+    def test_author_names_match_str_user(self):
+        self.assertEqual(record_from(make_message(1, 'x')).author_name, 'alice')
+        self.assertEqual(record_from(make_message(1, 'x', 'bob', '0420')).author_name, 'bob#0420')
+        self.assertEqual(author_name('bob', '0420'), 'bob#0420')
+        self.assertEqual(author_name('alice', None), 'alice')
+
+
+class MessageLoggingTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        user = SimpleNamespace(display_name='StatWizard', display_avatar=SimpleNamespace(url='https://example.invalid/a.png'))
+        bot = SimpleNamespace(
+            user=user,
+            config_store=ConfigStore(os.path.join(self.directory.name, 'config.json')),
+            message_store=RecentMessageStore(),
+        )
+        self.cog = MessageLogging(bot)
+        self.cog.log_channels[str(GUILD_ID)] = 99
+        self.sent = []
+
+        async def send_log(embed, guild_id):
+            self.sent.append(embed)
+        self.cog.send_log = send_log
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def edit_payload(self, message_id, content, author=None):
+        data = {'content': content, 'edited_timestamp': None}
+        if author is not None:
+            data['author'] = author
+        return SimpleNamespace(guild_id=GUILD_ID, channel_id=CHANNEL_ID, message_id=message_id, data=data, cached_message=None)
+
+    async def test_raw_delete_logs_stored_content(self):
+        await self.cog.on_message(make_message(10, 'secret plans'))
+        await self.cog.on_raw_message_delete(
+            SimpleNamespace(guild_id=GUILD_ID, channel_id=CHANNEL_ID, message_id=10, cached_message=None)
+        )
+        self.assertEqual(fields(self.sent[0])['Message Content'], 'secret plans')
+        self.assertEqual(fields(self.sent[0])['Author'], f'alice ({AUTHOR_ID})')
+
+    async def test_raw_delete_of_an_unknown_message_still_logs(self):
+        await self.cog.on_raw_message_delete(
+            SimpleNamespace(guild_id=GUILD_ID, channel_id=CHANNEL_ID, message_id=11, cached_message=None)
+        )
+        self.assertNotIn('Author', fields(self.sent[0]))
+
+    async def test_edits_of_stored_and_unstored_messages_name_the_author_the_same_way(self):
+        author = {'id': str(AUTHOR_ID), 'username': 'bob', 'discriminator': '0420'}
+        await self.cog.on_message(make_message(12, 'first', 'bob', '0420'))
+        await self.cog.on_raw_message_edit(self.edit_payload(12, 'second'))
+        await self.cog.on_raw_message_edit(self.edit_payload(13, 'edited', author))
+        stored, unstored = (fields(embed) for embed in self.sent)
+        self.assertEqual(stored['Author'], unstored['Author'])
+        self.assertEqual(stored['Original Message'], 'first')
+
+        # The edited content is kept, so the deletion shows what the message said last
+        await self.cog.on_raw_message_delete(
+            SimpleNamespace(guild_id=GUILD_ID, channel_id=CHANNEL_ID, message_id=12, cached_message=None)
+        )
+        self.assertEqual(fields(self.sent[-1])['Message Content'], 'second')
+
+    async def test_edit_without_a_content_change_is_not_logged(self):
+        await self.cog.on_message(make_message(14, 'same'))
+        await self.cog.on_raw_message_edit(self.edit_payload(14, 'same'))
+        self.assertEqual(self.sent, [])
@@ -0,0 +1,91 @@
+# tests/test_mod_ledger.py
+import datetime
+import os
+import tempfile
+import unittest
+from collections import Counter
+from types import SimpleNamespace
+import discord
+from utils.mod_ledger import ModerationLedger, audit_log_action, describe_actions
+
+GUILD_ID = 1
+OTHER_GUILD_ID = 2
+
+
+def timestamp(month, day=1):
+    return datetime.datetime(2024, month, day, tzinfo=datetime.timezone.utc).timestamp()
+
+
+class ModerationLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.ledger = ModerationLedger(os.path.join(self.directory.name, 'moderation.db'))
+
+    def tearDown(self):
+        self.ledger.close()
+        self.directory.cleanup()
+
+    def test_counts_per_moderator_and_action(self):
+        self.ledger.record(GUILD_ID, 10, 100, 'kick', timestamp(1))
+        self.ledger.record(GUILD_ID, 10, 101, 'kick', timestamp(2))
+        self.ledger.record(GUILD_ID, 10, 102, 'ban', timestamp(2))
+        self.ledger.record(GUILD_ID, 11, 100, 'timeout', timestamp(3))
+        self.ledger.record(OTHER_GUILD_ID, 10, 100, 'kick', timestamp(1))
+        self.assertEqual(
+            self.ledger.action_counts(GUILD_ID),
+            Counter({(10, 'kick'): 2, (10, 'ban'): 1, (11, 'timeout'): 1}),
+        )
+
+    def test_time_range_is_half_open(self):
+        self.ledger.record(GUILD_ID, 10, 100, 'kick', timestamp(1))
+        self.ledger.record(GUILD_ID, 10, 101, 'kick', timestamp(2))
+        self.ledger.record(GUILD_ID, 10, 102, 'kick', timestamp(3))
+        counts = self.ledger.action_counts(GUILD_ID, start=timestamp(2), end=timestamp(3))
+        self.assertEqual(counts, Counter({(10, 'kick'): 1}))
+
+    def test_month_filter_spans_years(self):
+        self.ledger.record(GUILD_ID, 10, 100, 'ban', timestamp(5, 31))
+        self.ledger.record(GUILD_ID, 10, 101, 'ban', datetime.datetime(2023, 5, 2, tzinfo=datetime.timezone.utc).timestamp())
+        self.ledger.record(GUILD_ID, 10, 102, 'ban', timestamp(6))
+        self.assertEqual(self.ledger.action_counts(GUILD_ID, month=5), Counter({(10, 'ban'): 2}))
+
+    def test_moderator_filter_is_chunked_past_the_variable_limit(self):
+        for moderator_id in range(1200):
+            self.ledger.record(GUILD_ID, moderator_id, 100, 'kick', timestamp(1))
+        counts = self.ledger.action_counts(GUILD_ID, moderator_ids=range(5, 1105))
+        self.assertEqual(len(counts), 1100)
+        self.assertEqual(sum(counts.values()), 1100)
+        self.assertEqual(self.ledger.action_counts(GUILD_ID, moderator_ids=[]), Counter())
+
+    def test_audit_log_entries_are_stored_once(self):
+        for _ in range(2):
+            self.ledger.record(GUILD_ID, 10, 100, 'ban', timestamp(1), reason='spam', entry_id=555)
+        self.ledger.record(GUILD_ID, 10, 100, 'unban', timestamp(2))
+        self.assertEqual(self.ledger.action_counts(GUILD_ID), Counter({(10, 'ban'): 1, (10, 'unban'): 1}))
+        self.assertEqual(
+            self.ledger.target_actions(GUILD_ID, 100),
+            [(10, 'unban', int(timestamp(2)), None), (10, 'ban', int(timestamp(1)), 'spam')],
+        )
+
+
+class AuditLogActionTest(unittest.TestCase):
+    def test_tracked_actions(self):
+        timed_out = SimpleNamespace(timed_out_until=discord.utils.utcnow())
+        cases = [
+            (discord.AuditLogAction.kick, None, 'kick'),
+            (discord.AuditLogAction.ban, None, 'ban'),
+            (discord.AuditLogAction.unban, None, 'unban'),
+            (discord.AuditLogAction.member_update, timed_out, 'timeout'),
+            (discord.AuditLogAction.member_update, SimpleNamespace(nick='new'), None),
+            (discord.AuditLogAction.message_delete, None, None),
+        ]
+        for action, after, expected in cases:
+            with self.subTest(action=action, after=after):
+                self.assertEqual(audit_log_action(SimpleNamespace(action=action, after=after)), expected)
+
+    def test_describe_actions(self):
+        self.assertEqual(describe_actions({'kick': 3, 'ban': 1}), '1 ban, 3 kicks')
+
+
+if __name__ == '__main__':
+    unittest.main()
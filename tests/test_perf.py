@@ -0,0 +1,50 @@
+# tests/test_perf.py
+import unittest
+import aiohttp
+from aiohttp import web
+from utils.perf import PerfRegistry, current_command
+
+
+async def rate_limited(request):
+    is_global = bool(request.query.get('global'))
+    headers = {'X-RateLimit-Scope': 'global', 'X-RateLimit-Global': 'true'} if is_global else {'X-RateLimit-Scope': 'user'}
+    body = {'message': 'You are being rate limited.', 'retry_after': 0.1, 'global': is_global}
+    return web.json_response(body, status=429, headers=headers)
+
+
+async def ok(request):
+    return web.json_response({})
+
+
+class RateLimitCountingTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        app = web.Application()
+        app.router.add_get('/limited', rate_limited)
+        app.router.add_get('/ok', ok)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.base = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    async def test_429_responses_are_counted_against_the_running_command(self):
+        perf = PerfRegistry()
+        async with aiohttp.ClientSession(trace_configs=[perf.http_trace]) as session:
+            current_command.set('serverstats')
+            for path in ('/ok', '/limited', '/limited?global=1'):
+                async with session.get(self.base + path):
+                    pass
+            current_command.set(None)
+            async with session.get(self.base + '/limited'):
+                pass
+
+        self.assertEqual(perf.rate_limits, {'serverstats': 2, 'background': 1})
+        self.assertEqual(perf.global_rate_limits, {'serverstats': 1})
+        self.assertIn('statwizard_global_rate_limits_total{command="serverstats"} 1', perf.prometheus())
+
+
+if __name__ == '__main__':
+    unittest.main()
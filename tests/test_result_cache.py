@@ -0,0 +1,110 @@
+# tests/test_result_cache.py
+import asyncio
+import time
+import unittest
+from utils.result_cache import LIVE_STALENESS, ResultCache
+
+GUILD_ID = 1
+
+
+class ResultCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_share_one_computation(self):
+        cache = ResultCache()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*(cache.get_or_compute((GUILD_ID, 'stats'), compute) for _ in range(5)))
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(await cache.get_or_compute((GUILD_ID, 'stats'), compute), 42)
+        self.assertEqual(calls, 1)
+
+    async def test_cancelling_one_caller_leaves_the_others_waiting(self):
+        cache = ResultCache()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return 'done'
+
+        first = asyncio.create_task(cache.get_or_compute((GUILD_ID, 'stats'), compute))
+        second = asyncio.create_task(cache.get_or_compute((GUILD_ID, 'stats'), compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await second, 'done')
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+    async def test_computation_cancelled_when_every_caller_leaves(self):
+        cache = ResultCache()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def compute():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.create_task(cache.get_or_compute((GUILD_ID, 'stats'), compute))
+        await started.wait()
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        self.assertEqual(cache.in_flight, {})
+        self.assertEqual(cache.entries, {})
+
+    async def test_failures_reach_every_caller_and_are_not_cached(self):
+        cache = ResultCache()
+
+        async def compute():
+            await asyncio.sleep(0)
+            raise ValueError('boom')
+
+        results = await asyncio.gather(*(cache.get_or_compute((GUILD_ID, 'stats'), compute) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(cache.entries, {})
+
+    async def test_live_windows_go_stale_instead_of_being_dropped(self):
+        cache = ResultCache()
+        now = time.time()
+        past = (GUILD_ID, 'past')
+        live = (GUILD_ID, 'live')
+        open_ended = (GUILD_ID, 'open')
+
+        async def value():
+            return 1
+
+        await cache.get_or_compute(past, value, (now - 7200, now - 3600))
+        await cache.get_or_compute(live, value, (now - 3600, now + 3600))
+        await cache.get_or_compute(open_ended, value)
+
+        cache.invalidate(GUILD_ID, now - 5000)
+        self.assertNotIn(past, cache.entries)
+        cache.invalidate(GUILD_ID, now)
+        for key in (live, open_ended):
+            self.assertLessEqual(cache.entries[key][0], time.monotonic() + LIVE_STALENESS)
+        cache.invalidate(GUILD_ID)
+        self.assertEqual(cache.entries, {})
+
+    async def test_message_during_computation_shortens_its_lifetime(self):
+        cache = ResultCache()
+
+        async def compute():
+            cache.invalidate(GUILD_ID, time.time())
+            return 1
+
+        await cache.get_or_compute((GUILD_ID, 'stats'), compute)
+        self.assertLessEqual(cache.entries[(GUILD_ID, 'stats')][0], time.monotonic() + LIVE_STALENESS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+# tests/test_snapshot.py
+import contextlib
+import io
+import os
+import struct
+import tempfile
+import time
+import unittest
+from utils.message_store import MessageRecord, RecentMessageStore
+from utils.snapshot import ALIGNMENT, HEADER, MAGIC, PART, SnapshotRegistry
+
+GUILD_ID = 1
+
+
+class FakeSection:
+    """Stands in for a cache: dumps its parts and keeps copies of whatever it's restored from."""
+
+    def __init__(self, parts=()):
+        self.parts = list(parts)
+        self.restored = None
+        self.age = None
+
+    def dump(self):
+        return self.parts
+
+    def load(self, parts, age):
+        self.restored = [bytes(part) for part in parts]
+        self.age = age
+
+
+class SnapshotRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'snapshot.bin')
+        self.output = io.StringIO()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def registry(self):
+        with contextlib.redirect_stdout(self.output):
+            return SnapshotRegistry(self.path)
+
+    def register(self, registry, name, section, version=1, max_age=60):
+        with contextlib.redirect_stdout(self.output):
+            registry.register(name, version, section.dump, section.load, max_age=max_age)
+
+    def save(self, *parts, version=1):
+        registry = self.registry()
+        self.register(registry, 'counts', FakeSection(parts), version=version)
+        with contextlib.redirect_stdout(self.output):
+            registry.save()
+
+    def patch_file(self, offset, data):
+        with open(self.path, 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+
+    def part_offsets(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        count = HEADER.unpack_from(data, 0)[2]
+        return [PART.unpack_from(data, HEADER.size + n * PART.size)[3] for n in range(count)]
+
+    def assert_rebuilds_cold(self, message):
+        """The section isn't loaded, the file is gone afterwards and the next snapshot restores normally."""
+        registry = self.registry()
+        section = FakeSection()
+        self.register(registry, 'counts', section)
+        self.assertIsNone(section.restored)
+        self.assertIn(message, self.output.getvalue())
+        registry.finish_restore()
+        self.assertFalse(os.path.exists(self.path))
+
+        self.save(b'rebuilt')
+        section = FakeSection()
+        self.register(self.registry(), 'counts', section)
+        self.assertEqual(section.restored, [b'rebuilt'])
+
+    def test_round_trip(self):
+        self.save(b'first part', bytearray(b'\x01\x02\x03'), memoryview(b'x' * 1000))
+        self.assertTrue(all(offset % ALIGNMENT == 0 for offset in self.part_offsets()))
+
+        registry = self.registry()
+        section = FakeSection()
+        self.register(registry, 'counts', section)
+        self.assertEqual(section.restored, [b'first part', b'\x01\x02\x03', b'x' * 1000])
+        self.assertLess(section.age, 5)
+
+        # A section the old snapshot never had simply starts empty
+        missing = FakeSection()
+        self.register(registry, 'other', missing)
+        self.assertIsNone(missing.restored)
+
+    def test_message_store_round_trip(self):
+        store = RecentMessageStore()
+        store.put(GUILD_ID, MessageRecord(5, 6, 'bob#0420', 7, 'héllo'))
+        registry = self.registry()
+        with contextlib.redirect_stdout(self.output):
+            registry.register('message_store', 1, store.dump, store.restore)
+            registry.save()
+
+        restored = RecentMessageStore()
+        with contextlib.redirect_stdout(self.output):
+            self.registry().register('message_store', 1, restored.dump, restored.restore)
+        record = restored.pop(GUILD_ID, 5)
+        self.assertEqual((record.author_id, record.author_name, record.channel_id, record.content), (6, 'bob#0420', 7, 'héllo'))
+
+    def test_checksum_mismatch_starts_cold(self):
+        self.save(b'some cached state')
+        self.patch_file(self.part_offsets()[0] + 3, b'!')
+        self.assert_rebuilds_cold('failed its checksum')
+
+    def test_old_snapshot_starts_cold(self):
+        self.save(b'some cached state')
+        self.patch_file(0, HEADER.pack(MAGIC, 1, 1, time.time() - 120))
+        self.assert_rebuilds_cold('old; starting cold')
+
+    def test_section_version_change_starts_cold(self):
+        self.save(b'some cached state', version=0)
+        self.assert_rebuilds_cold('is version 0, expected 1')
+
+    def test_unknown_file_format_is_ignored(self):
+        self.save(b'some cached state')
+        self.patch_file(0, HEADER.pack(MAGIC, 99, 1, time.time()))
+        self.assert_rebuilds_cold('unsupported snapshot format 99')
+
+    def test_truncated_file_is_ignored(self):
+        self.save(b'some cached state')
+        with open(self.path, 'r+b') as f:
+            f.truncate(self.part_offsets()[0] + 4)
+        self.assert_rebuilds_cold('truncated snapshot')
+
+    def test_failing_load_starts_cold(self):
+        self.save(struct.pack('<I', 1))
+        registry = self.registry()
+
+        def load(parts, age):
+            raise ValueError('bad layout')
+        with contextlib.redirect_stdout(self.output):
+            registry.register('counts', 1, list, load)
+        self.assertIn('Could not restore counts from snapshot: bad layout', self.output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
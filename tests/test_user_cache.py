@@ -0,0 +1,44 @@
+# tests/test_user_cache.py
+import asyncio
+import unittest
+from types import SimpleNamespace
+import discord
+from utils.user_cache import UserCache, UserID
+
+UNKNOWN_ID = 123456789012345678
+KNOWN_ID = 223456789012345678
+
+
+class FakeBot:
+    def __init__(self):
+        self.rest_calls = 0
+
+    async def fetch_user(self, user_id):
+        self.rest_calls += 1
+        await asyncio.sleep(0)
+        if user_id == UNKNOWN_ID:
+            raise discord.NotFound(SimpleNamespace(status=404, reason='Not Found'), 'Unknown User')
+        return SimpleNamespace(id=user_id)
+
+
+class UserCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_repeated_unknown_id_makes_one_rest_call(self):
+        bot = FakeBot()
+        cache = UserCache(bot)
+        for _ in range(3):
+            with self.assertRaises(discord.NotFound):
+                await cache.fetch(UNKNOWN_ID)
+        self.assertEqual(bot.rest_calls, 1)
+
+    async def test_concurrent_lookups_share_one_request(self):
+        bot = FakeBot()
+        cache = UserCache(bot)
+        users = await asyncio.gather(*(cache.fetch(KNOWN_ID) for _ in range(5)))
+        self.assertEqual({user.id for user in users}, {KNOWN_ID})
+        self.assertEqual(bot.rest_calls, 1)
+
+    async def test_user_id_converter_never_fetches(self):
+        converter = UserID()
+        self.assertEqual(await converter.convert(None, str(UNKNOWN_ID)), UNKNOWN_ID)
+        self.assertEqual(await converter.convert(None, f'<@!{UNKNOWN_ID}>'), UNKNOWN_ID)
+        self.assertEqual(await converter.convert(None, f'<@{UNKNOWN_ID}>'), UNKNOWN_ID)
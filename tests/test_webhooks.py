@@ -0,0 +1,86 @@
+# tests/test_webhooks.py
+import asyncio
+import unittest
+from types import SimpleNamespace
+import discord
+from utils.webhooks import WebhookBatcher
+
+CHANNEL_ID = 10
+
+
+class FakeWebhook:
+    def __init__(self, channel):
+        self.channel = channel
+        self.name = 'Log'
+        self.user = channel.bot_user
+
+    async def send(self, embeds, **kwargs):
+        if self.channel.webhook_missing:
+            raise discord.NotFound(SimpleNamespace(status=404, reason='Not Found'), 'Unknown Webhook')
+        await asyncio.sleep(self.channel.latency)
+        self.channel.delivered.extend(embeds)
+
+
+class FakeChannel:
+    def __init__(self, bot_user, latency=0.0):
+        self.id = CHANNEL_ID
+        self.bot_user = bot_user
+        self.latency = latency
+        self.webhook_missing = False
+        self.delivered = []
+        self.sent_directly = []
+
+    async def webhooks(self):
+        return []
+
+    async def create_webhook(self, name):
+        return FakeWebhook(self)
+
+    async def send(self, embeds):
+        self.sent_directly.extend(embeds)
+
+
+class FakeBot:
+    def __init__(self, latency=0.0):
+        self.user = SimpleNamespace(display_name='StatWizard', display_avatar=SimpleNamespace(url='https://example.invalid/a.png'))
+        self.channel = FakeChannel(self.user, latency)
+
+    def get_channel(self, channel_id):
+        return self.channel if channel_id == CHANNEL_ID else None
+
+
+def embeds(count):
+    return [discord.Embed(description=f'message {n}') for n in range(count)]
+
+
+class WebhookBatcherTest(unittest.IsolatedAsyncioTestCase):
+    async def test_batch_falls_back_to_the_channel_when_the_webhook_keeps_vanishing(self):
+        bot = FakeBot()
+        bot.channel.webhook_missing = True
+        batcher = WebhookBatcher(bot, name='Log')
+        for embed in embeds(3):
+            batcher.enqueue(bot.channel, embed)
+        await batcher.flush()
+        self.assertEqual(len(bot.channel.sent_directly), 3)
+
+    async def test_stop_drains_a_flush_in_progress(self):
+        bot = FakeBot(latency=0.05)
+        batcher = WebhookBatcher(bot, name='Log', flush_interval=0.01)
+        for embed in embeds(25):
+            batcher.enqueue(bot.channel, embed)
+        batcher.start()
+        while not batcher.flushing:
+            await asyncio.sleep(0)
+        await batcher.stop()
+        self.assertEqual(len(bot.channel.delivered), 25)
+
+    async def test_stop_requeues_a_batch_cancelled_after_the_timeout(self):
+        bot = FakeBot(latency=0.05)
+        batcher = WebhookBatcher(bot, name='Log', flush_interval=0.01)
+        for embed in embeds(25):
+            batcher.enqueue(bot.channel, embed)
+        batcher.start()
+        while not batcher.flushing:
+            await asyncio.sleep(0)
+        await batcher.stop(timeout=0.01)
+        self.assertEqual(len(bot.channel.delivered), 25)
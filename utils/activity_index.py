@@ -0,0 +1,351 @@
+# utils/activity_index.py
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+INDEX_PATH = 'activity.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS messages (
+    message_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    length INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_messages_guild_time ON messages (guild_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_guild_author ON messages (guild_id, author_id, created_at);
+CREATE TABLE IF NOT EXISTS backfill_cursors (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    high_water INTEGER,
+    low_water INTEGER,
+    complete INTEGER NOT NULL DEFAULT 0,
+    ingested INTEGER NOT NULL DEFAULT 0
+);
+'''
+
+ROLLUP_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, bucket, channel_id, author_id)
+);
+'''
+
+# Hour buckets are only kept this long; older activity is answered from day and month buckets
+HOUR_RETENTION = 90 * 86400
+
+
+
+def message_row(message):
+    """Turns a discord.Message into an index row."""
+    return (
+        message.id,
+        message.guild.id,
+        message.channel.id,
+        message.author.id,
+        int(message.created_at.timestamp()),
+        len(message.content),
+    )
+
+
+def time_bounds(month=None, year=None):
+    """Returns (start, end) epoch bounds for a year or a month of a year, or (None, None)."""
+    if year is None:
+        return None, None
+    if month is None:
+        start = datetime(year, 1, 1, tzinfo=timezone.utc)
+        end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    else:
+        start = datetime(year, month, 1, tzinfo=timezone.utc)
+        end = datetime(year + (month == 12), month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def month_floor(timestamp):
+    date = datetime.fromtimestamp(timestamp, timezone.utc)
+    return int(datetime(date.year, date.month, 1, tzinfo=timezone.utc).timestamp())
+
+
+def month_ceil(timestamp):
+    floor = month_floor(timestamp)
+    if floor == timestamp:
+        return floor
+    return month_floor(floor + 32 * 86400)
+
+
+def day_floor(timestamp):
+    return timestamp - timestamp % 86400
+
+
+def day_ceil(timestamp):
+    return -(-timestamp // 86400) * 86400
+
+
+def hour_floor(timestamp):
+    return timestamp - timestamp % 3600
+
+
+def hour_ceil(timestamp):
+    return -(-timestamp // 3600) * 3600
+
+
+# Rollup tables from coarsest to finest, with the functions that align a timestamp to their buckets
+ROLLUPS = [
+    ('rollup_month', month_floor, month_ceil),
+    ('rollup_day', day_floor, day_ceil),
+    ('rollup_hour', hour_floor, hour_ceil),
+]
+
+
+def hour_cutoff():
+    return hour_floor(int(time.time()) - HOUR_RETENTION)
+
+
+def range_segments(start, end, cutoff):
+    """Covers [start, end) with (table, lo, hi) segments, using the coarsest bucket that fits.
+
+    Whole months come from the month rollup, the whole days around them from the day rollup,
+    whole hours around those from the hour rollup (when still retained), and any remaining
+    sub-hour edges from the messages table itself.
+    """
+    start = 0 if start is None else start
+    end = month_ceil(int(time.time()) + 86400) if end is None else end
+    segments = []
+    pending = [(start, end)]
+    for table, floor, ceil in ROLLUPS:
+        remaining = []
+        for lo, hi in pending:
+            aligned_lo, aligned_hi = ceil(lo), floor(hi)
+            if aligned_lo >= aligned_hi or (table == 'rollup_hour' and aligned_lo < cutoff):
+                remaining.append((lo, hi))
+                continue
+            segments.append((table, aligned_lo, aligned_hi))
+            if lo < aligned_lo:
+                remaining.append((lo, aligned_lo))
+            if aligned_hi < hi:
+                remaining.append((aligned_hi, hi))
+        pending = remaining
+    segments.extend(('messages', lo, hi) for lo, hi in pending)
+    return segments
+
+
+class ActivityIndex:
+    """SQLite (WAL) index of who posted where and when, one row per message."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        # Objects with rows_added(rows)/rows_removed(rows), called under the lock once a change has committed
+        self.observers = []
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        # Indexes created before message lengths were recorded get the column, NULL for existing rows
+        if 'length' not in {row[1] for row in self.conn.execute('PRAGMA table_info(messages)')}:
+            self.conn.execute('ALTER TABLE messages ADD COLUMN length INTEGER')
+        for table, _, _ in ROLLUPS:
+            self.conn.executescript(ROLLUP_SCHEMA.format(table=table))
+        if self.conn.execute('SELECT 1 FROM messages').fetchone() and not self.conn.execute('SELECT 1 FROM rollup_month').fetchone():
+            self.rebuild_rollups()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _insert(self, rows):
+        # Rollups only count rows that were actually new, so re-ingesting a page never double counts
+        deltas = Counter()
+        added = []
+        for row in rows:
+            if self.conn.execute('INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?, ?, ?)', row).rowcount:
+                deltas[row[1:5]] += 1
+                added.append(row)
+        self._apply_deltas(deltas)
+        return added
+
+    def _notify(self, event, rows):
+        # Runs after COMMIT, so a rolled-back write never reaches the observers
+        for observer in self.observers:
+            getattr(observer, event)(rows)
+
+    def _apply_deltas(self, deltas):
+        cutoff = hour_cutoff()
+        for table, floor, _ in ROLLUPS:
+            buckets = Counter()
+            for (guild_id, channel_id, author_id, created_at), delta in deltas.items():
+                if table != 'rollup_hour' or created_at >= cutoff:
+                    buckets[(guild_id, channel_id, author_id, floor(created_at))] += delta
+            self.conn.executemany(
+                f'INSERT INTO {table} VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (guild_id, bucket, channel_id, author_id) DO UPDATE SET count = count + excluded.count',
+                [key + (delta,) for key, delta in buckets.items()],
+            )
+
+    def add_messages(self, rows):
+        with self.lock:
+            with self.conn:
+                added = self._insert(rows)
+            self._notify('rows_added', added)
+
+    def remove_messages(self, message_ids):
+        with self.lock:
+            with self.conn:
+                deltas = Counter()
+                removed = []
+                for message_id in message_ids:
+                    row = self.conn.execute(
+                        'SELECT guild_id, channel_id, author_id, created_at FROM messages WHERE message_id = ?', (message_id,)
+                    ).fetchone()
+                    if row:
+                        self.conn.execute('DELETE FROM messages WHERE message_id = ?', (message_id,))
+                        deltas[row] -= 1
+                        removed.append((message_id,) + row)
+                self._apply_deltas(deltas)
+            self._notify('rows_removed', removed)
+
+    def rebuild_rollups(self):
+        """Recomputes every rollup from the messages table, e.g. for an index created before rollups existed."""
+        bucket_expressions = {
+            'rollup_month': "CAST(strftime('%s', created_at, 'unixepoch', 'start of month') AS INTEGER)",
+            'rollup_day': 'created_at - created_at % 86400',
+            'rollup_hour': 'created_at - created_at % 3600',
+        }
+        with self.lock, self.conn:
+            for table, _, _ in ROLLUPS:
+                cutoff = hour_cutoff() if table == 'rollup_hour' else 0
+                self.conn.execute(f'DELETE FROM {table}')
+                self.conn.execute(
+                    f'INSERT INTO {table} SELECT guild_id, channel_id, author_id, {bucket_expressions[table]}, COUNT(*) '
+                    'FROM messages WHERE created_at >= ? GROUP BY 1, 2, 3, 4',
+                    (cutoff,),
+                )
+
+    def compact(self):
+        """Drops hour buckets past their retention and buckets emptied by deletions."""
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM rollup_hour WHERE bucket < ?', (hour_cutoff(),))
+            for table, _, _ in ROLLUPS:
+                self.conn.execute(f'DELETE FROM {table} WHERE count <= 0')
+
+    def get_cursor(self, channel_id):
+        """Returns (high_water, low_water, complete, ingested) for a channel's backfill."""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT high_water, low_water, complete, ingested FROM backfill_cursors WHERE channel_id = ?', (channel_id,)
+            ).fetchone()
+        return row or (None, None, 0, 0)
+
+    def ingest_page(self, guild_id, channel_id, rows, high_water, low_water, complete):
+        """Stores one page of history and advances the channel's cursor in the same transaction."""
+        with self.lock:
+            with self.conn:
+                added = self._insert(rows)
+                self.conn.execute(
+                    'INSERT INTO backfill_cursors VALUES (?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (channel_id) DO UPDATE SET high_water = excluded.high_water, '
+                    'low_water = excluded.low_water, complete = excluded.complete, ingested = ingested + excluded.ingested',
+                    (channel_id, guild_id, high_water, low_water, int(complete), len(rows)),
+                )
+            self._notify('rows_added', added)
+
+    def guild_cursors(self, guild_id):
+        """Returns {channel_id: (high_water, low_water, complete, ingested)} for a guild."""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT channel_id, high_water, low_water, complete, ingested FROM backfill_cursors WHERE guild_id = ?',
+                (guild_id,),
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def complete_channels(self, guild_id):
+        return {channel_id for channel_id, cursor in self.guild_cursors(guild_id).items() if cursor[2]}
+
+    def advance_high_water(self, high_waters):
+        """Moves channels' high-water marks up to {channel_id: newest message ID} stored live."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'UPDATE backfill_cursors SET high_water = MAX(COALESCE(high_water, 0), ?) WHERE channel_id = ?',
+                [(message_id, channel_id) for channel_id, message_id in high_waters.items()],
+            )
+
+    def backfilled_guilds(self):
+        with self.lock:
+            return {row[0] for row in self.conn.execute('SELECT DISTINCT guild_id FROM backfill_cursors')}
+
+    def range_counts(self, guild_id, start=None, end=None, group_by=('channel_id',), period=None, author_ids=None, month=None):
+        """Counts messages created in [start, end), answered from the coarsest rollups that fit.
+
+        Returns a Counter keyed by tuples of the ``group_by`` columns, prefixed with the
+        ``period`` strftime key (e.g. '%Y-%m') when one is given. ``month`` keeps only that
+        month of the year, and ``author_ids`` only those authors.
+        """
+        counts = Counter()
+        author_ids = list(author_ids) if author_ids is not None else None
+        author_chunks = [author_ids[i:i + 500] for i in range(0, len(author_ids), 500)] if author_ids is not None else [None]
+        with self.lock:
+            for table, lo, hi in range_segments(start, end, hour_cutoff()):
+                time_column, count_expression = ('created_at', 'COUNT(*)') if table == 'messages' else ('bucket', 'SUM(count)')
+                columns = list(group_by)
+                if period:
+                    columns.insert(0, f"strftime('{period}', {time_column}, 'unixepoch')")
+                clause = f'guild_id = ? AND {time_column} >= ? AND {time_column} < ?'
+                params = [guild_id, lo, hi]
+                if month is not None:
+                    clause += f" AND CAST(strftime('%m', {time_column}, 'unixepoch') AS INTEGER) = ?"
+                    params.append(month)
+                for chunk in author_chunks:
+                    chunk_clause, chunk_params = clause, params
+                    if chunk is not None:
+                        chunk_clause += f" AND author_id IN ({', '.join('?' * len(chunk))})"
+                        chunk_params = params + chunk
+                    query = (
+                        f"SELECT {', '.join(columns)}, {count_expression} FROM {table} "
+                        f"WHERE {chunk_clause} GROUP BY {', '.join(columns)}"
+                    )
+                    for *key, count in self.conn.execute(query, chunk_params):
+                        counts[tuple(key)] += count
+        return counts
+
+    def export_rows(self, guild_id, channel_ids, start=None, end=None, after=None, limit=5000):
+        """Returns up to ``limit`` (message_id, channel_id, author_id, created_at, length) rows in [start, end).
+
+        Rows come in (created_at, message_id) order along the guild/time index. Passing the last
+        row's (created_at, message_id) back as ``after`` fetches the next page, so the lock is
+        never held between pages.
+        """
+        channel_ids = list(channel_ids)
+        if not channel_ids:
+            return []
+        clause = f"guild_id = ? AND channel_id IN ({', '.join('?' * len(channel_ids))})"
+        params = [guild_id, *channel_ids]
+        if after is not None:
+            clause += ' AND (created_at, message_id) > (?, ?)'
+            params.extend(after)
+        if start is not None:
+            clause += ' AND created_at >= ?'
+            params.append(start)
+        if end is not None:
+            clause += ' AND created_at < ?'
+            params.append(end)
+        with self.lock:
+            return self.conn.execute(
+                f'SELECT message_id, channel_id, author_id, created_at, length FROM messages '
+                f'WHERE {clause} ORDER BY created_at, message_id LIMIT ?',
+                params + [limit],
+            ).fetchall()
+
+
+def get_index(bot):
+    """Returns the bot's shared activity index, opening it on first use."""
+    if getattr(bot, 'activity_index', None) is None:
+        bot.activity_index = ActivityIndex()
+    return bot.activity_index
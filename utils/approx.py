@@ -0,0 +1,141 @@
+# utils/approx.py
+import asyncio
+import math
+import random
+from collections import Counter
+import discord
+from utils.history import snowflake_windows
+from utils.jobs import report_progress
+
+HLL_PRECISION = 12  # 4096 registers, about 1.6% standard error
+SAMPLE_SLICES = 64
+SAMPLE_WINDOWS = 8
+SLICE_CAP = 500
+Z_95 = 1.96
+MASK_64 = (1 << 64) - 1
+
+
+def mix64(value):
+    """SplitMix64 finalizer: spreads snowflakes, whose low bits barely vary, over all 64 bits."""
+    value = (value + 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+
+class HyperLogLog:
+    """Estimates how many distinct integers were added, in 2**precision bytes.
+
+    Sketches built separately (e.g. one per channel) merge into the sketch of their union.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        hashed = mix64(value)
+        index = hashed & ((1 << self.precision) - 1)
+        rest = hashed >> self.precision
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class Estimate:
+    """A message count with its variance, per-key counts and a sketch of the distinct keys seen."""
+
+    def __init__(self, total=0.0, variance=0.0, counts=None, sketch=None, sampled=False):
+        self.total = total
+        self.variance = variance
+        self.counts = counts if counts is not None else Counter()
+        self.sketch = sketch if sketch is not None else HyperLogLog()
+        self.sampled = sampled
+
+    def merge(self, other):
+        # Channels are sampled independently, so their variances add
+        self.total += other.total
+        self.variance += other.variance
+        self.counts.update(other.counts)
+        self.sketch.merge(other.sketch)
+        self.sampled = self.sampled or other.sampled
+
+    @property
+    def margin(self):
+        """Half-width of the 95% confidence interval for ``total``."""
+        return Z_95 * math.sqrt(self.variance)
+
+
+def exact_estimate(counts):
+    """Wraps exact {key: count} data (e.g. from the activity index) as a zero-variance Estimate."""
+    estimate = Estimate(total=float(sum(counts.values())), counts=Counter(counts))
+    for key in counts:
+        estimate.sketch.add(key)
+    return estimate
+
+
+async def sample_channel(channel, key, after=None, before=None, slices=SAMPLE_SLICES, samples=SAMPLE_WINDOWS, cap=SLICE_CAP, rng=random):
+    """Estimates how many messages in a channel have a non-None ``key(message)`` without reading them all.
+
+    The snowflake range is cut into ``slices`` equal stretches of time and ``samples`` of them
+    are read, at most ``cap`` messages each. A slice that hits the cap is extrapolated from how
+    much of its time span those messages covered. Totals are scaled by slices / samples, with the
+    variance of a simple random sample of slices.
+    """
+    after_id = after.id if after is not None else channel.id
+    before_id = before.id if before is not None else discord.utils.time_snowflake(discord.utils.utcnow(), high=True) + 1
+    windows = snowflake_windows(after_id, before_id, slices)
+    chosen = rng.sample(windows, min(samples, len(windows)))
+
+    async def read(window_after, window_before):
+        matched = []
+        oldest = None
+        seen = 0
+        history = channel.history(limit=cap, after=discord.Object(id=window_after), before=discord.Object(id=window_before), oldest_first=False)
+        async for message in history:
+            seen += 1
+            oldest = message.id
+            message_key = key(message)
+            if message_key is not None:
+                matched.append(message_key)
+        scale = 1.0
+        if seen >= cap and oldest is not None:
+            covered = (window_before - oldest) / (window_before - window_after)
+            scale = 1 / max(covered, 1 / cap)
+        report_progress(messages_scanned=seen)
+        return matched, scale
+
+    results = await asyncio.gather(*(read(*window) for window in chosen))
+
+    estimate = Estimate(sampled=len(chosen) < len(windows))
+    weight = len(windows) / len(chosen) if chosen else 0
+    slice_totals = []
+    for matched, scale in results:
+        slice_totals.append(len(matched) * scale)
+        for message_key in matched:
+            estimate.counts[message_key] += scale * weight
+            estimate.sketch.add(message_key)
+
+    estimate.total = sum(slice_totals) * weight
+    if len(slice_totals) > 1 and estimate.sampled:
+        mean = sum(slice_totals) / len(slice_totals)
+        sample_variance = sum((value - mean) ** 2 for value in slice_totals) / (len(slice_totals) - 1)
+        estimate.variance = len(windows) ** 2 * (1 - len(chosen) / len(windows)) * sample_variance / len(chosen)
+    return estimate
@@ -0,0 +1,126 @@
+# utils/backfill.py
+import asyncio
+import time
+import discord
+from utils.activity_index import get_index, message_row
+
+PAGE_SIZE = 100
+
+
+def snowflake_time(snowflake):
+    return discord.utils.snowflake_time(snowflake).timestamp()
+
+
+class Backfill:
+    """Crawls channel history into the activity index exactly once, one checkpointed page at a time.
+
+    Each channel keeps a low-water mark (oldest message ingested) and a high-water mark (newest).
+    The backward pass resumes with ``before=low_water`` until the start of the channel is reached;
+    the forward pass picks up whatever was posted after ``high_water`` while the bot was offline.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.index = get_index(bot)
+        self.tasks = {}
+        self.started = {}
+        # Channels whose forward pass finished this session; live messages advance their high-water mark
+        self.caught_up = set()
+
+    def is_running(self, guild_id):
+        task = self.tasks.get(guild_id)
+        return task is not None and not task.done()
+
+    def start(self, guild):
+        if not self.is_running(guild.id):
+            self.tasks[guild.id] = asyncio.create_task(self.run(guild))
+
+    def stop(self, guild_id):
+        task = self.tasks.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+
+    def stop_all(self):
+        for guild_id in list(self.tasks):
+            self.stop(guild_id)
+
+    async def run(self, guild):
+        self.started[guild.id] = (time.monotonic(), (await self.progress(guild))[0])
+        await self.crawl_guild(guild)
+
+    async def crawl_guild(self, guild):
+        for channel in guild.text_channels:
+            # One failing channel must not end the crawl for the rest; it resumes from its checkpoint next time
+            try:
+                await self.crawl_channel(channel)
+            except discord.Forbidden:
+                print(f'Backfill: missing access to channel {channel.id}, skipping.')
+            except discord.HTTPException as e:
+                print(f'Backfill: failed to crawl channel {channel.id}, skipping: {e}')
+
+    async def crawl_channel(self, channel):
+        high_water, low_water, complete, _ = await asyncio.to_thread(self.index.get_cursor, channel.id)
+
+        while not complete:
+            before = discord.Object(id=low_water) if low_water else None
+            page = [message async for message in channel.history(limit=PAGE_SIZE, before=before)]
+            if page:
+                high_water = high_water or page[0].id
+                low_water = page[-1].id
+            complete = len(page) < PAGE_SIZE
+            await self.ingest(channel, page, high_water, low_water, complete)
+
+        while True:
+            # A channel that was empty when first crawled has no high-water mark, so it catches up from its creation
+            after = discord.Object(id=high_water or channel.id)
+            page = [message async for message in channel.history(limit=PAGE_SIZE, after=after, oldest_first=True)]
+            if page:
+                high_water = page[-1].id
+                await self.ingest(channel, page, high_water, low_water, complete)
+            if len(page) < PAGE_SIZE:
+                break
+        self.caught_up.add(channel.id)
+
+    async def ingest(self, channel, page, high_water, low_water, complete):
+        rows = [message_row(message) for message in page]
+        await asyncio.to_thread(self.index.ingest_page, channel.guild.id, channel.id, rows, high_water, low_water, complete)
+
+    async def progress(self, guild):
+        """Returns (fraction covered, messages ingested, channels complete) for a guild.
+
+        Coverage is measured in channel time: a snowflake encodes its creation time, so the
+        span between the high and low water marks over the channel's lifetime says how much is left.
+        """
+        cursors = await asyncio.to_thread(self.index.guild_cursors, guild.id)
+        now = time.time()
+        covered = total = 0.0
+        ingested = complete_count = 0
+        for channel in guild.text_channels:
+            span = max(now - channel.created_at.timestamp(), 1.0)
+            total += span
+            high_water, low_water, complete, count = cursors.get(channel.id, (None, None, 0, 0))
+            ingested += count
+            if complete:
+                covered += span
+                complete_count += 1
+            elif high_water and low_water:
+                covered += snowflake_time(high_water) - snowflake_time(low_water)
+        fraction = covered / total if total else 1.0
+        return fraction, ingested, complete_count
+
+    def eta(self, guild, fraction):
+        """Returns the estimated seconds left for a running backfill now at ``fraction``, or None if unknown."""
+        if guild.id not in self.started:
+            return None
+        started_at, start_fraction = self.started[guild.id]
+        if fraction <= start_fraction:
+            return None
+        elapsed = time.monotonic() - started_at
+        return elapsed * (1 - fraction) / (fraction - start_fraction)
+
+
+def get_backfill(bot):
+    """Returns the bot's shared backfill crawler."""
+    if getattr(bot, 'backfill', None) is None:
+        bot.backfill = Backfill(bot)
+    return bot.backfill
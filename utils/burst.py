@@ -0,0 +1,34 @@
+# utils/burst.py
+import time
+from collections import deque
+
+DEFAULT_THRESHOLD = 10
+DEFAULT_WINDOW = 10.0
+
+
+class BurstDetector:
+    """Tracks how many events happened in a sliding window and flags when it reaches a threshold.
+
+    The clock is injectable so a synthetic event stream can be replayed without sleeping.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, window=DEFAULT_WINDOW, clock=time.monotonic):
+        self.threshold = threshold
+        self.window = window
+        self.clock = clock
+        self.events = deque()
+
+    def _trim(self, now):
+        while self.events and now - self.events[0] > self.window:
+            self.events.popleft()
+
+    def record(self):
+        """Records one event and returns True if the rate is now at or above the threshold."""
+        now = self.clock()
+        self.events.append(now)
+        self._trim(now)
+        return len(self.events) >= self.threshold
+
+    def is_bursting(self):
+        self._trim(self.clock())
+        return len(self.events) >= self.threshold
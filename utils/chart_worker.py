@@ -0,0 +1,71 @@
+# utils/chart_worker.py
+"""Chart rendering that runs inside ChartRenderer's worker processes.
+
+Workers import only this module and the plotting stack, never main.py or discord.py.
+"""
+import io
+
+
+def init_worker():
+    # Loaded once per worker so individual renders only pay for drawing
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.figure  # noqa: F401
+    import seaborn  # noqa: F401
+
+
+def warm():
+    return True
+
+
+def _to_png(figure):
+    buf = io.BytesIO()
+    figure.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+def render_pie(labels, counts, title):
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=(8, 6))
+    ax = figure.subplots()
+    ax.pie(counts, labels=labels, autopct='%1.1f%%', startangle=140)
+    ax.set_title(title)
+    ax.axis('equal')
+    return _to_png(figure)
+
+
+def render_line(x, y, title, xlabel, ylabel):
+    from matplotlib.figure import Figure
+    import seaborn as sns
+    figure = Figure(figsize=(12, 6))
+    ax = figure.subplots()
+    sns.lineplot(x=x, y=y, marker='o', ax=ax)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.tick_params(axis='x', labelrotation=45)
+    figure.tight_layout()
+    return _to_png(figure)
+
+
+def render_heatmap(grid, title, xlabels, ylabels):
+    from matplotlib.figure import Figure
+    import seaborn as sns
+    figure = Figure(figsize=(14, 5))
+    ax = figure.subplots()
+    sns.heatmap(grid, ax=ax, cmap='viridis', xticklabels=xlabels, yticklabels=ylabels, cbar_kws={'label': 'Messages'})
+    ax.set_title(title)
+    ax.tick_params(axis='y', labelrotation=0)
+    figure.tight_layout()
+    return _to_png(figure)
+
+
+RENDERERS = {
+    'pie': render_pie,
+    'line': render_line,
+    'heatmap': render_heatmap,
+}
+
+
+def render(kind, data):
+    return RENDERERS[kind](**data)
@@ -0,0 +1,96 @@
+# utils/charts.py
+import asyncio
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import sys
+import types
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils import chart_worker
+
+DEFAULT_WORKERS = 2
+DEFAULT_CACHE_SIZE = 64
+
+
+@contextlib.contextmanager
+def hidden_main():
+    """Hides the parent's __main__ from processes spawned inside the block.
+
+    A spawned process re-runs the parent's main module first, and main.py builds a Bot.
+    Without a main file to point at, workers only import what their tasks need.
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+class ChartRenderer:
+    """Renders charts to PNG bytes in a warm process pool, caching results by their input data."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, cache_size=DEFAULT_CACHE_SIZE):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self._executor = None
+
+    @property
+    def executor(self):
+        # The pool (and the plotting stack it imports) is only started by the first chart request
+        if self._executor is None:
+            self._executor = self._start_pool()
+        return self._executor
+
+    def _start_pool(self):
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=chart_worker.init_worker
+        )
+        # The pool starts a worker per submit while none is idle, and none can be idle before
+        # its initializer has imported the plotting stack, so every worker starts in here
+        with hidden_main():
+            for _ in range(self.workers):
+                executor.submit(chart_worker.warm)
+        return executor
+
+    def _discard_pool(self, executor):
+        # Only the first render to see a broken pool replaces it
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def cache_key(kind, data):
+        payload = json.dumps([kind, data], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def render(self, kind, **data):
+        key = self.cache_key(kind, data)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self.executor
+            try:
+                png = await loop.run_in_executor(executor, chart_worker.render, kind, data)
+                break
+            except BrokenProcessPool:
+                # A worker died (killed for memory, say); a broken pool fails every later
+                # submit, so it is replaced and the chart retried once
+                self._discard_pool(executor)
+                if attempt:
+                    raise
+        self.cache[key] = png
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return png
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,403 @@
+# utils/columnar.py
+import asyncio
+import sqlite3
+import struct
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.activity_index import get_index
+from utils.snapshot import get_snapshots
+
+LOAD_CHUNK = 65536
+INITIAL_CAPACITY = 1024
+# Deleted rows are subtracted from the base segment once they pass this fraction of it
+COMPACT_FRACTION = 0.1
+# A row's timestamp, channel code and author code, compared as one 16-byte key when compacting
+ROW_KEY = np.dtype([('timestamp', np.int64), ('channel', np.int32), ('author', np.int32)])
+# Loaded columns across all guilds, at 16 bytes a message plus growth headroom
+DEFAULT_MAX_BYTES = 512 * 2**20
+SNAPSHOT_VERSION = 1
+# guild ID and the guild's row count in the index when the snapshot was taken
+SNAPSHOT_GUILD = struct.Struct('<QQ')
+SNAPSHOT_ARRAYS = 9  # two segments of three columns, channel IDs, author IDs and complete channels
+
+
+def month_label(month):
+    """Turns months since January 1970 into 'YYYY-MM'."""
+    return f'{1970 + month // 12}-{month % 12 + 1:02d}'
+
+
+class ColumnSegment:
+    """Parallel, growable arrays of message timestamps, channel codes and author codes."""
+
+    def __init__(self):
+        self.timestamps = np.empty(INITIAL_CAPACITY, np.int64)
+        self.channels = np.empty(INITIAL_CAPACITY, np.int32)
+        self.authors = np.empty(INITIAL_CAPACITY, np.int32)
+        self.size = 0
+
+    def append(self, timestamps, channels, authors):
+        needed = self.size + len(timestamps)
+        if needed > len(self.timestamps):
+            # Doubling keeps appends amortized O(1) per row
+            capacity = max(needed, 2 * len(self.timestamps))
+            for name in ('timestamps', 'channels', 'authors'):
+                grown = np.empty(capacity, getattr(self, name).dtype)
+                grown[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, grown)
+        self.timestamps[self.size:needed] = timestamps
+        self.channels[self.size:needed] = channels
+        self.authors[self.size:needed] = authors
+        self.size = needed
+
+    def arrays(self):
+        return [self.timestamps[:self.size], self.channels[:self.size], self.authors[:self.size]]
+
+    def keys(self):
+        keys = np.empty(self.size, ROW_KEY)
+        keys['timestamp'], keys['channel'], keys['author'] = self.arrays()
+        return keys.view(f'V{ROW_KEY.itemsize}')
+
+    @classmethod
+    def from_keys(cls, keys):
+        segment = cls()
+        keys = keys.view(ROW_KEY)
+        segment.append(keys['timestamp'], keys['channel'], keys['author'])
+        return segment
+
+    @classmethod
+    def from_buffers(cls, timestamps, channels, authors):
+        segment = cls()
+        segment.append(np.frombuffer(timestamps, np.int64), np.frombuffer(channels, np.int32), np.frombuffer(authors, np.int32))
+        return segment
+
+
+class ActivityColumns:
+    """One guild's indexed messages as columns, aggregated with NumPy instead of per-message dicts.
+
+    Channel and author IDs are stored as small integer codes, so a message costs 16 bytes.
+    Deleted messages are kept in a second segment and subtracted from every count.
+    """
+
+    def __init__(self, complete=frozenset()):
+        self.complete = complete  # channels whose backfill was complete when these columns were loaded
+        self.rows = ColumnSegment()
+        self.removed = ColumnSegment()
+        self.channel_ids = []
+        self.channel_codes = {}
+        self.author_ids = []
+        self.author_codes = {}
+
+    def _encode(self, ids, known_ids, codes):
+        unique, inverse = np.unique(ids, return_inverse=True)
+        lookup = np.empty(len(unique), np.int32)
+        for position, value in enumerate(unique.tolist()):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(known_ids)
+                known_ids.append(value)
+            lookup[position] = code
+        return lookup[inverse]
+
+    def append(self, timestamps, channel_ids, author_ids, segment=None):
+        channel_ids = np.asarray(channel_ids, np.int64)
+        author_ids = np.asarray(author_ids, np.int64)
+        (segment or self.rows).append(
+            timestamps,
+            self._encode(channel_ids, self.channel_ids, self.channel_codes),
+            self._encode(author_ids, self.author_ids, self.author_codes),
+        )
+
+    def compact(self):
+        """Subtracts deleted rows from the base segment, so they stop costing memory and masking time.
+
+        Counts only depend on each row's timestamp, channel and author, so any one base row with
+        the same values stands in for the deleted message.
+        """
+        rows = self.rows.keys()
+        order = np.argsort(rows, kind='stable')
+        ordered = rows[order]
+        unique, counts = np.unique(self.removed.keys(), return_counts=True)
+        removed = np.repeat(unique, counts)
+        # The n-th copy of a deleted key pairs with the n-th base row holding that key
+        copy = np.arange(len(removed)) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(np.searchsorted(ordered, unique), counts) + copy
+        matched = positions < len(ordered)
+        matched[matched] = ordered[positions[matched]] == removed[matched]
+        keep = np.ones(len(rows), bool)
+        keep[order[positions[matched]]] = False
+        self.rows = ColumnSegment.from_keys(rows[keep])
+        self.removed = ColumnSegment.from_keys(removed[~matched])
+
+    def _allowed(self, ids, codes, count):
+        allowed = np.zeros(count, bool)
+        allowed[[codes[value] for value in ids if value in codes]] = True
+        return allowed
+
+    def _mask(self, segment, start, end, channel_ids, author_ids):
+        """Returns a boolean mask over the segment's rows, or None when every row matches."""
+        size = segment.size
+        mask = None
+        conditions = []
+        if start is not None:
+            conditions.append(lambda: segment.timestamps[:size] >= start)
+        if end is not None:
+            conditions.append(lambda: segment.timestamps[:size] < end)
+        # Looking codes up in a boolean table is much cheaper than np.isin over every row
+        for ids, codes, known_ids, column in (
+            (channel_ids, self.channel_codes, self.channel_ids, segment.channels),
+            (author_ids, self.author_codes, self.author_ids, segment.authors),
+        ):
+            if ids is not None:
+                allowed = self._allowed(ids, codes, len(known_ids))
+                if not allowed.all():
+                    conditions.append(lambda allowed=allowed, column=column: allowed[column[:size]])
+        for condition in conditions:
+            mask = condition() if mask is None else mask & condition()
+        return mask
+
+    def _months(self, timestamps):
+        # Converting each day once and looking rows up is far cheaper than datetime64 conversion per row
+        if not len(timestamps):
+            return timestamps
+        days = timestamps // 86400
+        first = days.min()
+        table = np.arange(first, days.max() + 1).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        return table[days - first]
+
+    def _bincount(self, by, start, end, channel_ids, author_ids):
+        """Returns (counts, offset) where counts[i] is the number of messages whose ``by`` key is i + offset."""
+        keys = []
+        for segment in (self.rows, self.removed):
+            mask = self._mask(segment, start, end, channel_ids, author_ids)
+
+            def column(name):
+                values = getattr(segment, name)[:segment.size]
+                return values if mask is None else values[mask]
+
+            if by == 'channel':
+                key = column('channels')
+            elif by == 'author':
+                key = column('authors')
+            elif by in ('month', 'month_channel'):
+                key = self._months(column('timestamps'))
+                if by == 'month_channel':
+                    key = key * len(self.channel_ids) + column('channels')
+            elif by == 'hour_of_week':
+                # 1 January 1970 was a Thursday, day 3 of a Monday-first week
+                hours = column('timestamps') // 3600
+                key = ((hours // 24 + 3) % 7) * 24 + hours % 24
+            else:
+                raise ValueError(f'Unknown grouping {by!r}')
+            keys.append(key)
+
+        offset = int(min((key.min() for key in keys if len(key)), default=0))
+        size = int(max((key.max() + 1 - offset for key in keys if len(key)), default=0))
+        counts = np.bincount(keys[0] - offset, minlength=size) - np.bincount(keys[1] - offset, minlength=size)
+        return counts, offset
+
+    def count(self, by, start=None, end=None, channel_ids=None, author_ids=None):
+        """Counts messages in [start, end) grouped by 'channel', 'author', 'month' or 'month_channel'.
+
+        Returns {channel_id: n}, {author_id: n}, {'YYYY-MM': n} or {('YYYY-MM', channel_id): n}.
+        """
+        counts, offset = self._bincount(by, start, end, channel_ids, author_ids)
+        result = {}
+        for position in np.flatnonzero(counts > 0).tolist():
+            key = position + offset
+            if by == 'channel':
+                key = self.channel_ids[key]
+            elif by == 'author':
+                key = self.author_ids[key]
+            elif by == 'month':
+                key = month_label(key)
+            else:
+                key = (month_label(key // len(self.channel_ids)), self.channel_ids[key % len(self.channel_ids)])
+            result[key] = int(counts[position])
+        return result
+
+    def hour_of_week(self, start=None, end=None, channel_ids=None, author_ids=None):
+        """Returns a 7x24 array of message counts by UTC weekday (Monday first) and hour."""
+        counts, offset = self._bincount('hour_of_week', start, end, channel_ids, author_ids)
+        grid = np.zeros(168, np.int64)
+        grid[offset:offset + len(counts)] = counts
+        return grid.reshape(7, 24)
+
+    def to_buffers(self):
+        return [
+            *self.rows.arrays(), *self.removed.arrays(),
+            np.array(self.channel_ids, np.int64), np.array(self.author_ids, np.int64),
+            np.array(sorted(self.complete), np.int64),
+        ]
+
+    @classmethod
+    def from_buffers(cls, buffers):
+        """Rebuilds columns from to_buffers() output, copying out of the buffers."""
+        columns = cls(frozenset(np.frombuffer(buffers[8], np.int64).tolist()))
+        columns.rows = ColumnSegment.from_buffers(*buffers[0:3])
+        columns.removed = ColumnSegment.from_buffers(*buffers[3:6])
+        columns.channel_ids = np.frombuffer(buffers[6], np.int64).tolist()
+        columns.author_ids = np.frombuffer(buffers[7], np.int64).tolist()
+        columns.channel_codes = {channel_id: code for code, channel_id in enumerate(columns.channel_ids)}
+        columns.author_codes = {author_id: code for code, author_id in enumerate(columns.author_ids)}
+        return columns
+
+    @property
+    def live_rows(self):
+        return self.rows.size - self.removed.size
+
+    @property
+    def nbytes(self):
+        return sum(
+            getattr(segment, name).nbytes for segment in (self.rows, self.removed) for name in ('timestamps', 'channels', 'authors')
+        )
+
+
+class ColumnCache:
+    """Keeps recently queried guilds' ActivityColumns loaded and in step with the activity index.
+
+    The cache observes the index, so rows are appended or subtracted in the same critical
+    section that commits them, and a guild's columns are read from the table only once.
+    Once the loaded columns outgrow ``max_bytes``, the least recently queried guilds are dropped.
+    """
+
+    def __init__(self, index, max_bytes=DEFAULT_MAX_BYTES):
+        self.index = index
+        self.max_bytes = max_bytes
+        self.guilds = OrderedDict()  # guild_id -> ActivityColumns, least recently queried first
+        self.catch_up = {}  # guild_id -> [(segment, rows)] written to the index while the guild loads
+        self.load_locks = {}  # guild_id -> lock held by the thread loading that guild
+        index.observers.append(self)
+
+    def rows_added(self, rows):
+        self._apply(rows, 'rows')
+
+    def rows_removed(self, rows):
+        self._apply(rows, 'removed')
+
+    def _apply(self, rows, segment):
+        by_guild = {}
+        for _, guild_id, channel_id, author_id, created_at, *_ in rows:
+            if guild_id in self.guilds or guild_id in self.catch_up:
+                by_guild.setdefault(guild_id, []).append((created_at, channel_id, author_id))
+        for guild_id, guild_rows in by_guild.items():
+            if guild_id in self.catch_up:
+                self.catch_up[guild_id].append((segment, guild_rows))
+            columns = self.guilds.get(guild_id)
+            if columns is not None:
+                columns.append(*zip(*guild_rows), getattr(columns, segment))
+                if columns.removed.size > COMPACT_FRACTION * columns.rows.size:
+                    columns.compact()
+
+    def _load(self, guild_id):
+        with self.index.lock:
+            load_lock = self.load_locks.setdefault(guild_id, threading.Lock())
+        # Concurrent queries for a guild wait for one load rather than each reading the table
+        with load_lock:
+            with self.index.lock:
+                complete = frozenset(
+                    row[0] for row in self.index.conn.execute(
+                        'SELECT channel_id FROM backfill_cursors WHERE guild_id = ? AND complete = 1', (guild_id,)
+                    )
+                )
+                columns = self.guilds.get(guild_id)
+                if columns is not None:
+                    # Every row written since the load was appended as it landed, so a channel
+                    # whose backfill completed since then only needs adding to the filter
+                    columns.complete = complete
+                    self.guilds.move_to_end(guild_id)
+                    return columns
+                # Writes happen under the index lock, so each row lands either in the read
+                # snapshot started here or in the catch-up log, never both
+                reader = sqlite3.connect(self.index.path, check_same_thread=False)
+                reader.execute('BEGIN')
+                reader.execute('SELECT 1 FROM messages LIMIT 1').fetchall()
+                self.catch_up[guild_id] = []
+            try:
+                columns = ActivityColumns(complete)
+                cursor = reader.execute('SELECT created_at, channel_id, author_id FROM messages WHERE guild_id = ?', (guild_id,))
+                while True:
+                    chunk = cursor.fetchmany(LOAD_CHUNK)
+                    if not chunk:
+                        break
+                    block = np.array(chunk, np.int64)
+                    columns.append(block[:, 0], block[:, 1], block[:, 2])
+            except BaseException:
+                with self.index.lock:
+                    del self.catch_up[guild_id]
+                raise
+            finally:
+                reader.close()
+            with self.index.lock:
+                for segment, guild_rows in self.catch_up.pop(guild_id):
+                    columns.append(*zip(*guild_rows), getattr(columns, segment))
+                self.guilds[guild_id] = columns
+                self.guilds.move_to_end(guild_id)
+                self._evict(keep=guild_id)
+                return columns
+
+    def _evict(self, keep=None):
+        total = sum(columns.nbytes for columns in self.guilds.values())
+        for guild_id in list(self.guilds):
+            if total <= self.max_bytes:
+                break
+            if guild_id != keep:
+                total -= self.guilds.pop(guild_id).nbytes
+
+    def _query(self, guild_id, method, *args, **kwargs):
+        columns = self._load(guild_id)
+        with self.index.lock:
+            return columns.complete, getattr(columns, method)(*args, channel_ids=columns.complete, **kwargs)
+
+    async def count(self, guild_id, by, start=None, end=None, author_ids=None):
+        """Like ActivityColumns.count over the channels whose backfill is complete.
+
+        Returns (complete channel IDs, counts), so callers know which channels still need crawling.
+        """
+        return await asyncio.to_thread(self._query, guild_id, 'count', by, start, end, author_ids=author_ids)
+
+    async def hour_of_week(self, guild_id, start=None, end=None, author_ids=None):
+        """Like ActivityColumns.hour_of_week, returning (complete channel IDs, 7x24 counts)."""
+        return await asyncio.to_thread(self._query, guild_id, 'hour_of_week', start, end, author_ids=author_ids)
+
+    def drop(self, guild_id):
+        self.guilds.pop(guild_id, None)
+        self.load_locks.pop(guild_id, None)
+
+    def _row_count(self, guild_id):
+        return self.index.conn.execute('SELECT COUNT(*) FROM messages WHERE guild_id = ?', (guild_id,)).fetchone()[0]
+
+    def dump(self):
+        parts = []
+        with self.index.lock:
+            for guild_id, columns in self.guilds.items():
+                parts.append(SNAPSHOT_GUILD.pack(guild_id, columns.live_rows))
+                parts.extend(columns.to_buffers())
+        return parts
+
+    def restore(self, parts, age):
+        # Only the bot writes to the index, so a guild whose row count still matches hasn't changed since
+        with self.index.lock:
+            for position in range(0, len(parts), SNAPSHOT_ARRAYS + 1):
+                guild_id, rows = SNAPSHOT_GUILD.unpack(parts[position])
+                if self._row_count(guild_id) != rows:
+                    continue
+                columns = ActivityColumns.from_buffers(parts[position + 1:position + 1 + SNAPSHOT_ARRAYS])
+                if columns.live_rows == rows:
+                    self.guilds[guild_id] = columns
+            self._evict()
+
+
+def hour_of_week_key(message):
+    """Returns (weekday, hour) in UTC for a message, for crawls that feed a heatmap."""
+    created_at = message.created_at
+    return created_at.weekday(), created_at.hour
+
+
+def get_columns(bot):
+    """Returns the bot's shared column cache over the activity index."""
+    if getattr(bot, 'activity_columns', None) is None:
+        bot.activity_columns = ColumnCache(get_index(bot))
+        # Reloading a large guild from SQLite takes much longer than reading its columns back
+        get_snapshots(bot).register('activity_columns', SNAPSHOT_VERSION, bot.activity_columns.dump, bot.activity_columns.restore, max_age=None)
+    return bot.activity_columns
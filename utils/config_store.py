@@ -0,0 +1,99 @@
+# utils/config_store.py
+import asyncio
+import json
+import os
+
+CONFIG_PATH = 'config.json'
+DEFAULT_DEBOUNCE = 1.0
+
+# Per-cog JSON files used before the shared store existed, imported once on first start
+LEGACY_FILES = {
+    'allowed_roles': 'roles.json',
+    'log_channels': 'log_channels.json',
+    'member_log': 'member_log_config.json',
+}
+
+
+class ConfigStore:
+    """All bot configuration in one in-memory dict, persisted with debounced atomic writes.
+
+    Reads are plain dict lookups. Callers mutate a section in place and call ``mark_dirty``;
+    the file is rewritten once things settle, off the event loop, through a temp file and
+    ``os.replace`` so a crash mid-write leaves the previous version intact.
+    """
+
+    def __init__(self, path=CONFIG_PATH, debounce=DEFAULT_DEBOUNCE):
+        self.path = path
+        self.debounce = debounce
+        self.dirty = False
+        self.save_handle = None
+        self._flush_task = None  # the debounced flush, kept referenced so it can't be collected mid-write
+        self.save_lock = asyncio.Lock()
+        self.data = self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                return json.load(f)
+
+        data = {}
+        for section, filename in LEGACY_FILES.items():
+            if os.path.exists(filename):
+                with open(filename, 'r') as f:
+                    data[section] = json.load(f)
+        if data:
+            self.write(json.dumps(data, indent=4))
+        return data
+
+    def section(self, name):
+        return self.data.setdefault(name, {})
+
+    def mark_dirty(self):
+        self.dirty = True
+        if self.save_handle is not None:
+            self.save_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self.save_handle = loop.call_later(self.debounce, self._start_flush)
+
+    def _start_flush(self):
+        self.save_handle = None
+        self._flush_task = asyncio.create_task(self.flush())
+        self._flush_task.add_done_callback(self._flushed)
+
+    def _flushed(self, task):
+        if self._flush_task is task:
+            self._flush_task = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f'Could not save {self.path}: {task.exception()}')
+
+    async def close(self):
+        """Writes any pending changes now, waiting for a debounced write that is already running."""
+        if self.save_handle is not None:
+            self.save_handle.cancel()
+            self.save_handle = None
+        if self._flush_task is not None:
+            await asyncio.wait([self._flush_task])
+        await self.flush()
+
+    async def flush(self):
+        async with self.save_lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            payload = json.dumps(self.data, indent=4)
+            await asyncio.to_thread(self.write, payload)
+
+    def write(self, payload):
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+
+def get_config_store(bot):
+    """Returns the bot's shared config store, loading it on first use."""
+    if getattr(bot, 'config_store', None) is None:
+        bot.config_store = ConfigStore()
+    return bot.config_store
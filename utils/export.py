@@ -0,0 +1,119 @@
+# utils/export.py
+import asyncio
+import csv
+import gzip
+import io
+import os
+
+COLUMNS = ('message_id', 'channel_id', 'author_id', 'created_at', 'length')
+BATCH_SIZE = 5000
+# Compressors hold back some output, so parts are closed this far below the upload limit
+UPLOAD_HEADROOM = 1024 * 1024
+
+
+class CsvPart:
+    extension = 'csv.gz'
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.text = io.TextIOWrapper(gzip.GzipFile(fileobj=self.file, mode='wb'), encoding='utf-8', newline='')
+        self.writer = csv.writer(self.text)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.text.flush()
+
+    @property
+    def size(self):
+        return self.file.tell()
+
+    def close(self):
+        self.text.close()
+        self.file.close()
+
+
+class ParquetPart:
+    extension = 'parquet'
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.path = path
+        self.schema = pa.schema([(name, pa.int64()) for name in COLUMNS])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        # Each batch becomes one row group, so only one batch is ever held in memory
+        columns = [self.pa.array(column, self.pa.int64()) for column in zip(*rows)]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def close(self):
+        self.writer.close()
+
+
+FORMATS = {'csv': CsvPart, 'parquet': ParquetPart}
+
+
+def format_available(name):
+    """Returns False when the format's optional dependency isn't installed."""
+    if name == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            return False
+    return name in FORMATS
+
+
+class ExportWriter:
+    """Streams row batches into compressed files, starting a new part before one outgrows ``part_limit``.
+
+    Each finished part is passed to ``upload(path, part_number)`` and deleted, so disk and
+    memory use stay bounded however many rows are written. Call ``close()`` once every row is
+    written, or ``abort()`` if the export failed.
+    """
+
+    def __init__(self, directory, name, file_format, part_limit, upload):
+        self.directory = directory
+        self.name = name
+        self.part_class = FORMATS[file_format]
+        self.part_limit = part_limit - min(UPLOAD_HEADROOM, part_limit // 4)
+        self.upload = upload
+        self.part = None
+        self.part_path = None
+        self.parts = 0
+        self.rows = 0
+
+    async def write(self, rows):
+        if not rows:
+            return
+        if self.part is None:
+            self.parts += 1
+            self.part_path = os.path.join(self.directory, f'{self.name}-{self.parts}.{self.part_class.extension}')
+            self.part = await asyncio.to_thread(self.part_class, self.part_path)
+        await asyncio.to_thread(self.part.write, rows)
+        self.rows += len(rows)
+        if self.part.size >= self.part_limit:
+            await self.finish_part()
+
+    async def finish_part(self):
+        if self.part is not None:
+            part, self.part = self.part, None
+            await asyncio.to_thread(part.close)
+            await self.upload(self.part_path, self.parts)
+            os.remove(self.part_path)
+
+    async def close(self):
+        await self.finish_part()
+
+    async def abort(self):
+        """Deletes the unfinished part without uploading it, so a failed export never sends a truncated file."""
+        if self.part is not None:
+            part, self.part = self.part, None
+            await asyncio.to_thread(part.close)
+            os.remove(self.part_path)
@@ -0,0 +1,127 @@
+# utils/guild_summary.py
+import asyncio
+import struct
+import discord
+from utils.result_cache import ResultCache
+from utils.snapshot import get_snapshots
+
+SNAPSHOT_VERSION = 1
+# guild ID, humans, bots
+SNAPSHOT_COUNTS = struct.Struct('<QII')
+MEMBER_COUNT_TTL = 60
+MEMBER_COUNT_ENTRIES = 32
+# Owners found (or not) over the gateway are looked up again after this many seconds
+OWNER_TTL = 600
+OWNER_ENTRIES = 1024
+
+
+class GuildSummary:
+    __slots__ = ('humans', 'bots')
+
+    def __init__(self, humans, bots):
+        self.humans = humans
+        self.bots = bots
+
+
+class GuildSummaries:
+    """Per-guild human and bot counts, built once and kept current from gateway events.
+
+    Channel and role counts are read straight off the cached guild, so only members are counted here.
+    """
+
+    def __init__(self):
+        self.guilds = {}
+        self.restored = {}  # guild_id -> (humans, bots) from the last snapshot
+        self.member_counts = ResultCache(ttl=MEMBER_COUNT_TTL, max_entries=MEMBER_COUNT_ENTRIES)
+        self.owners = ResultCache(ttl=OWNER_TTL, max_entries=OWNER_ENTRIES)
+        self.counting = {}  # guild_id -> background member count, kept referenced until it finishes
+
+    def build(self, guild):
+        """Counts a chunked guild's members from the cache; unchunked guilds are counted by get()."""
+        self.guilds.pop(guild.id, None)
+        restored = self.restored.pop(guild.id, None)
+        if guild.chunked:
+            bots = sum(1 for member in guild.members if member.bot)
+            self.guilds[guild.id] = GuildSummary(len(guild.members) - bots, bots)
+        elif restored is not None and sum(restored) == guild.member_count:
+            # Counts from before a restart still hold if nobody joined or left in between
+            self.guilds[guild.id] = GuildSummary(*restored)
+
+    async def get(self, guild):
+        """Returns the guild's summary, whose humans and bots are None while an unchunked guild is still being counted."""
+        summary = self.guilds.get(guild.id)
+        if summary is None:
+            self.build(guild)
+            summary = self.guilds.get(guild.id)
+        if summary is None:
+            # Lean member mode never chunks into the cache, so members are counted from an uncached
+            # gateway chunk in the background; until that finishes, callers only have guild.member_count
+            if guild.id not in self.counting:
+                self.start_count(guild)
+            summary = GuildSummary(None, None)
+        return summary
+
+    async def owner(self, guild):
+        """Returns the guild's owner as a member, or None if they couldn't be found."""
+        if guild.owner is not None:
+            return guild.owner
+        # Without the member cache, the owner is looked up over the gateway once per OWNER_TTL,
+        # misses included, and kept current from member and guild updates
+        return await self.owners.get_or_compute((guild.id, guild.owner_id), lambda: self.query_owner(guild))
+
+    async def query_owner(self, guild):
+        owners = await guild.query_members(user_ids=[guild.owner_id], cache=False)
+        return owners[0] if owners else None
+
+    def owner_changed(self, guild_id, owner_id, member=None):
+        """Replaces the cached owner lookup, with ``member`` if it is known, after a member or guild update."""
+        self.owners.invalidate(guild_id)
+        if member is not None:
+            self.owners.put((guild_id, owner_id), member)
+
+    def start_count(self, guild):
+        task = self.counting[guild.id] = asyncio.create_task(self._count(guild))
+        task.add_done_callback(lambda _: self.counting.pop(guild.id, None))
+
+    async def _count(self, guild):
+        # Every count of a guild shares one crawl of the member list through the single-flight cache
+        try:
+            humans, bots = await self.member_counts.get_or_compute((guild.id, 'member_counts'), lambda: self.count_members(guild))
+        except (discord.ClientException, asyncio.TimeoutError) as e:
+            print(f'Could not count members of guild {guild.id}: {e}')
+            return
+        if guild.id not in self.guilds:
+            self.guilds[guild.id] = GuildSummary(humans, bots)
+
+    async def count_members(self, guild):
+        # A gateway chunk rather than fetch_members, which pages over REST at 1000 members a request
+        members = await guild.chunk(cache=False)
+        bots = sum(1 for member in members if member.bot)
+        return len(members) - bots, bots
+
+    def drop(self, guild_id):
+        self.guilds.pop(guild_id, None)
+        self.owners.invalidate(guild_id)
+
+    def dump(self):
+        return [b''.join(SNAPSHOT_COUNTS.pack(guild_id, summary.humans, summary.bots) for guild_id, summary in self.guilds.items())]
+
+    def restore(self, parts, age):
+        self.restored = {guild_id: (humans, bots) for guild_id, humans, bots in SNAPSHOT_COUNTS.iter_unpack(parts[0])}
+
+    def member_changed(self, guild_id, user, delta):
+        summary = self.guilds.get(guild_id)
+        if summary is not None:
+            if user.bot:
+                summary.bots += delta
+            else:
+                summary.humans += delta
+
+
+def get_guild_summaries(bot):
+    """Returns the bot's shared guild summaries."""
+    if getattr(bot, 'guild_summaries', None) is None:
+        bot.guild_summaries = GuildSummaries()
+        # Unchunked guilds otherwise need a full member chunk to count humans and bots again
+        get_snapshots(bot).register('guild_summaries', SNAPSHOT_VERSION, bot.guild_summaries.dump, bot.guild_summaries.restore)
+    return bot.guild_summaries
@@ -0,0 +1,65 @@
+# utils/history.py
+import asyncio
+import discord
+from collections import Counter
+from datetime import datetime, timezone
+from utils.jobs import report_progress
+
+DEFAULT_PARTITIONS = 4
+PROGRESS_EVERY = 100
+
+
+def snowflake_bounds(start=None, end=None):
+    """Turns [start, end) epoch bounds into (after, before) snowflake bounds for channel.history."""
+    after = before = None
+    if start is not None:
+        after = discord.Object(id=discord.utils.time_snowflake(datetime.fromtimestamp(start, timezone.utc)) - 1)
+    if end is not None:
+        before = discord.Object(id=discord.utils.time_snowflake(datetime.fromtimestamp(end, timezone.utc)))
+    return after, before
+
+
+def snowflake_windows(after_id, before_id, partitions):
+    """Splits the open snowflake range (after_id, before_id) into contiguous windows.
+
+    Snowflakes grow with their timestamp, so equal ID ranges are equal stretches of time.
+    """
+    step = max((before_id - after_id) // partitions, 1)
+    # Ranges narrower than ``partitions`` IDs would otherwise get windows past before_id
+    edges = [min(after_id + step * i, before_id) for i in range(partitions)] + [before_id]
+    return [(edges[i] - (i > 0), edges[i + 1]) for i in range(partitions) if edges[i] < edges[i + 1]]
+
+
+async def count_partitioned(channel, key, after=None, before=None, partitions=DEFAULT_PARTITIONS):
+    """Counts ``key(message)`` over a channel's history, crawling time windows in parallel.
+
+    ``key`` returns the counter key for a message, or None to skip it. By default the whole
+    channel is read: no message can be older than the channel itself, whose ID bounds it from below.
+    """
+    after_id = after.id if after is not None else channel.id
+    before_id = before.id if before is not None else discord.utils.time_snowflake(discord.utils.utcnow(), high=True) + 1
+
+    async def crawl(window_after, window_before):
+        counts = Counter()
+        scanned = 0
+        history = channel.history(limit=None, after=discord.Object(id=window_after), before=discord.Object(id=window_before))
+        async for message in history:
+            message_key = key(message)
+            if message_key is not None:
+                counts[message_key] += 1
+            scanned += 1
+            if scanned == PROGRESS_EVERY:
+                report_progress(messages_scanned=scanned)
+                scanned = 0
+        report_progress(messages_scanned=scanned)
+        return counts
+
+    windows = snowflake_windows(after_id, before_id, partitions)
+    results = await asyncio.gather(*(crawl(*window) for window in windows))
+    return sum(results, Counter())
+
+
+async def count_channel_months(channel, start=None, end=None):
+    """Counts a channel's messages per 'YYYY-MM' month in [start, end), reading only that range's pages."""
+    after, before = snowflake_bounds(start, end)
+    return await count_partitioned(channel, lambda message: message.created_at.strftime('%Y-%m'), after, before)
@@ -0,0 +1,171 @@
+# utils/jobs.py
+import asyncio
+import contextvars
+import itertools
+import time
+from collections import deque
+import discord
+
+DEFAULT_PER_GUILD = 1
+DEFAULT_GLOBAL = 3
+STATUS_INTERVAL = 3.0
+
+# The job whose work is running in the current task, so crawlers deep in the call stack can report progress
+current_job = contextvars.ContextVar('current_job', default=None)
+
+
+def report_progress(channels_done=0, messages_scanned=0, channels_total=None):
+    job = current_job.get()
+    if job is not None:
+        job.channels_done += channels_done
+        job.messages_scanned += messages_scanned
+        if channels_total is not None:
+            job.channels_total = channels_total
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, ctx, kind, work, key=None):
+        self.id = next(self._ids)
+        self.ctx = ctx
+        self.guild_id = ctx.guild.id
+        self.author_id = ctx.author.id
+        self.kind = kind
+        self.work = work
+        self.key = key
+        self.follower = False  # started next to an identical running job, outside the limits
+        self.state = 'queued'
+        self.channels_done = 0
+        self.channels_total = 0
+        self.messages_scanned = 0
+        self.created_at = time.monotonic()
+        self.started_at = None
+        self.task = None
+        self.status_message = None
+
+    def describe(self):
+        if self.state == 'queued':
+            return f'Job #{self.id} ({self.kind}) is queued.'
+        elapsed = time.monotonic() - (self.started_at or self.created_at)
+        progress = f'{self.channels_done}/{self.channels_total} channels, {self.messages_scanned:,} messages scanned'
+        if self.state == 'running':
+            return f'Job #{self.id} ({self.kind}) is running: {progress} ({elapsed:.0f}s). Use `.cancel {self.id}` to stop it.'
+        return f'Job #{self.id} ({self.kind}) {self.state} after {elapsed:.0f}s: {progress}.'
+
+
+class JobManager:
+    """Runs long stats commands as background jobs with per-guild and global concurrency limits.
+
+    Waiting jobs are queued per guild and started round-robin across guilds, so one
+    guild queueing many jobs can't starve the others.
+    """
+
+    def __init__(self, per_guild=DEFAULT_PER_GUILD, global_limit=DEFAULT_GLOBAL):
+        self.per_guild = per_guild
+        self.global_limit = global_limit
+        self.jobs = {}
+        self.queues = {}  # guild_id -> deque of waiting jobs
+        self.rotation = deque()  # guild IDs with waiting jobs, in turn order
+        self.running = {}  # guild_id -> number of running jobs
+
+    async def submit(self, ctx, kind, work, key=None):
+        """Queues ``work()`` and acknowledges the command with a status message that tracks its progress.
+
+        Jobs given the same ``key`` in a guild share one computation through the result cache, so
+        a job submitted while an identical one is running starts at once instead of waiting its turn.
+        """
+        job = Job(ctx, kind, work, key)
+        self.jobs[job.id] = job
+        if job.guild_id not in self.queues:
+            self.queues[job.guild_id] = deque()
+            self.rotation.append(job.guild_id)
+        self.queues[job.guild_id].append(job)
+        job.status_message = await ctx.send(job.describe())
+        self._dispatch()
+        return job
+
+    def _dispatch(self):
+        running_keys = {(job.guild_id, job.key) for job in self.jobs.values() if job.state == 'running' and job.key is not None}
+        for guild_id in list(self.queues):
+            for job in [job for job in self.queues[guild_id] if (guild_id, job.key) in running_keys]:
+                self._dequeue(job)
+                self._start(job, follower=True)
+
+        while sum(self.running.values()) < self.global_limit:
+            for _ in range(len(self.rotation)):
+                guild_id = self.rotation[0]
+                self.rotation.rotate(-1)
+                if self.running.get(guild_id, 0) < self.per_guild:
+                    job = self.queues[guild_id][0]
+                    self._dequeue(job)
+                    self._start(job)
+                    break
+            else:
+                return
+
+    def _dequeue(self, job):
+        self.queues[job.guild_id].remove(job)
+        if not self.queues[job.guild_id]:
+            del self.queues[job.guild_id]
+            self.rotation.remove(job.guild_id)
+
+    def _start(self, job, follower=False):
+        # A follower only awaits the running job's shared result, so it doesn't count against the limits
+        job.follower = follower
+        if not follower:
+            self.running[job.guild_id] = self.running.get(job.guild_id, 0) + 1
+        job.state = 'running'
+        job.started_at = time.monotonic()
+        job.task = asyncio.create_task(self._run(job))
+
+    async def _run(self, job):
+        current_job.set(job)
+        updater = asyncio.create_task(self._update_status(job))
+        try:
+            await job.work()
+            job.state = 'finished'
+        except asyncio.CancelledError:
+            job.state = 'cancelled'
+        except Exception as e:
+            job.state = 'failed'
+            await job.ctx.send(f'Job #{job.id} failed: {e}')
+        finally:
+            updater.cancel()
+            if not job.follower:
+                self.running[job.guild_id] -= 1
+                if not self.running[job.guild_id]:
+                    del self.running[job.guild_id]
+            self.jobs.pop(job.id, None)
+            await self._edit_status(job)
+            self._dispatch()
+
+    async def _update_status(self, job):
+        while True:
+            await self._edit_status(job)
+            await asyncio.sleep(STATUS_INTERVAL)
+
+    async def _edit_status(self, job):
+        try:
+            await job.status_message.edit(content=job.describe())
+        except discord.HTTPException:
+            pass
+
+    def cancel(self, job):
+        if job.state == 'queued':
+            self._dequeue(job)
+            job.state = 'cancelled'
+            self.jobs.pop(job.id, None)
+            asyncio.create_task(self._edit_status(job))
+        elif job.task is not None:
+            job.task.cancel()
+
+    def guild_jobs(self, guild_id):
+        return [job for job in self.jobs.values() if job.guild_id == guild_id]
+
+
+def get_job_manager(bot):
+    """Returns the bot's shared job manager."""
+    if getattr(bot, 'job_manager', None) is None:
+        bot.job_manager = JobManager()
+    return bot.job_manager
@@ -0,0 +1,34 @@
+# utils/members.py
+from utils.result_cache import ResultCache
+
+ROLE_MEMBERS_TTL = 300
+ROLE_MEMBERS_ENTRIES = 32
+
+
+class RoleMembers:
+    """Finds a role's members, from the member cache when the guild is chunked and over the gateway otherwise.
+
+    In lean member mode (LEAN_MEMBERS=1) guilds are never chunked, so the member list is requested
+    as a gateway chunk without caching it, keeping only the matches, and cached briefly for the
+    next command. Paging it over REST would cost one request per 1000 members.
+    """
+
+    def __init__(self, ttl=ROLE_MEMBERS_TTL, max_entries=ROLE_MEMBERS_ENTRIES):
+        self.cache = ResultCache(ttl=ttl, max_entries=max_entries)
+
+    async def members(self, role):
+        guild = role.guild
+        if guild.chunked:
+            return role.members
+        return await self.cache.get_or_compute((guild.id, 'role_members', role.id), lambda: self.fetch(role))
+
+    async def fetch(self, role):
+        members = await role.guild.chunk(cache=False)
+        return [member for member in members if member.get_role(role.id) is not None]
+
+
+def get_role_members(bot):
+    """Returns the bot's shared role member lookup."""
+    if getattr(bot, 'role_members', None) is None:
+        bot.role_members = RoleMembers()
+    return bot.role_members
@@ -0,0 +1,140 @@
+# utils/message_store.py
+import struct
+import sys
+from collections import OrderedDict
+from utils.snapshot import get_snapshots
+
+DEFAULT_GUILD_BUDGET = 4 * 1024 * 1024  # bytes of recent messages kept per guild
+# Rough cost of a record, its OrderedDict entry and its key, on top of the content itself
+RECORD_OVERHEAD = 200
+SNAPSHOT_VERSION = 1
+# message ID, author ID, channel ID, then the UTF-8 lengths of the author name and content that follow
+SNAPSHOT_RECORD = struct.Struct('<QQQHI')
+SNAPSHOT_GUILD = struct.Struct('<Q')
+
+
+class MessageRecord:
+    """The parts of a message the logs need. The creation time is part of the message ID."""
+    __slots__ = ('id', 'author_id', 'author_name', 'channel_id', 'content')
+
+    def __init__(self, message_id, author_id, author_name, channel_id, content):
+        self.id = message_id
+        self.author_id = author_id
+        self.author_name = author_name
+        self.channel_id = channel_id
+        self.content = content
+
+    @property
+    def size(self):
+        return RECORD_OVERHEAD + len(self.content)
+
+
+def author_name(username, discriminator='0'):
+    """Formats an author the way str(user) does, from a user object's fields or a raw payload's."""
+    # Author names repeat across a guild's messages, so they're shared rather than copied
+    return sys.intern(username if discriminator in ('0', None) else f'{username}#{discriminator}')
+
+
+def record_from(message):
+    author = message.author
+    return MessageRecord(message.id, author.id, author_name(author.name, author.discriminator), message.channel.id, message.content)
+
+
+class GuildMessages:
+    def __init__(self, budget):
+        self.budget = budget
+        self.records = OrderedDict()  # message_id -> MessageRecord, least recently used first
+        self.used = 0
+
+    def put(self, record):
+        old = self.records.pop(record.id, None)
+        if old is not None:
+            self.used -= old.size
+        self.records[record.id] = record
+        self.used += record.size
+        while self.used > self.budget and self.records:
+            _, evicted = self.records.popitem(last=False)
+            self.used -= evicted.size
+
+    def pop(self, message_id):
+        record = self.records.pop(message_id, None)
+        if record is not None:
+            self.used -= record.size
+        return record
+
+
+class RecentMessageStore:
+    """Keeps the content of recent messages so deletes and edits can be logged after discord.py forgets them.
+
+    Each guild gets its own memory budget; once it is spent, the least recently
+    seen messages are dropped first.
+    """
+
+    def __init__(self, guild_budget=DEFAULT_GUILD_BUDGET):
+        self.guild_budget = guild_budget
+        self.guilds = {}
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, message):
+        self.put(message.guild.id, record_from(message))
+
+    def put(self, guild_id, record):
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = GuildMessages(self.guild_budget)
+        guild.put(record)
+
+    def pop(self, guild_id, message_id):
+        guild = self.guilds.get(guild_id)
+        record = guild.pop(message_id) if guild is not None else None
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def drop_guild(self, guild_id):
+        self.guilds.pop(guild_id, None)
+
+    def dump(self):
+        parts = []
+        for guild_id, guild in self.guilds.items():
+            chunks = [SNAPSHOT_GUILD.pack(guild_id)]
+            for record in guild.records.values():
+                name, content = record.author_name.encode(), record.content.encode()
+                chunks += (SNAPSHOT_RECORD.pack(record.id, record.author_id, record.channel_id, len(name), len(content)), name, content)
+            parts.append(b''.join(chunks))
+        return parts
+
+    def restore(self, parts, age):
+        for part in parts:
+            (guild_id,) = SNAPSHOT_GUILD.unpack_from(part)
+            data = bytes(part)
+            offset = SNAPSHOT_GUILD.size
+            # Records were written least recently used first, so putting them back keeps that order
+            while offset < len(data):
+                message_id, author_id, channel_id, name_length, content_length = SNAPSHOT_RECORD.unpack_from(data, offset)
+                offset += SNAPSHOT_RECORD.size
+                name = sys.intern(data[offset:offset + name_length].decode())
+                offset += name_length
+                content = data[offset:offset + content_length].decode()
+                offset += content_length
+                self.put(guild_id, MessageRecord(message_id, author_id, name, channel_id, content))
+
+    def stats(self):
+        return {
+            'messages': sum(len(guild.records) for guild in self.guilds.values()),
+            'bytes': sum(guild.used for guild in self.guilds.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+def get_message_store(bot):
+    """Returns the bot's shared store of recent message content."""
+    if getattr(bot, 'message_store', None) is None:
+        bot.message_store = RecentMessageStore()
+        # Messages sent shortly before a restart can still be logged when they're deleted after it
+        get_snapshots(bot).register('message_store', SNAPSHOT_VERSION, bot.message_store.dump, bot.message_store.restore)
+    return bot.message_store
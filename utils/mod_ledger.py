@@ -0,0 +1,110 @@
+# utils/mod_ledger.py
+import sqlite3
+import threading
+from collections import Counter
+import discord
+
+LEDGER_PATH = 'moderation.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS mod_actions (
+    action_id INTEGER PRIMARY KEY,
+    entry_id INTEGER UNIQUE,
+    guild_id INTEGER NOT NULL,
+    moderator_id INTEGER NOT NULL,
+    target_id INTEGER,
+    action TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_mod_actions_guild_time ON mod_actions (guild_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_mod_actions_moderator ON mod_actions (guild_id, moderator_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_mod_actions_target ON mod_actions (guild_id, target_id, created_at);
+'''
+
+AUDIT_LOG_ACTIONS = {
+    discord.AuditLogAction.kick: 'kick',
+    discord.AuditLogAction.ban: 'ban',
+    discord.AuditLogAction.unban: 'unban',
+}
+
+
+def audit_log_action(entry):
+    """Returns the ledger action for an audit log entry, or None for entries the ledger doesn't track."""
+    if entry.action is discord.AuditLogAction.member_update:
+        # Timeouts are member updates that set communication_disabled_until
+        return 'timeout' if getattr(entry.after, 'timed_out_until', None) is not None else None
+    return AUDIT_LOG_ACTIONS.get(entry.action)
+
+
+class ModerationLedger:
+    """SQLite (WAL) record of moderator actions, one row per kick, ban, unban or timeout.
+
+    Actions issued through the bot are recorded with the moderator who ran the command;
+    everything else comes from audit log entries, keyed by entry ID so none is stored twice.
+    """
+
+    def __init__(self, path=LEDGER_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def record(self, guild_id, moderator_id, target_id, action, created_at, reason=None, entry_id=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO mod_actions (entry_id, guild_id, moderator_id, target_id, action, created_at, reason) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (entry_id, guild_id, moderator_id, target_id, action, int(created_at), reason),
+            )
+
+    def action_counts(self, guild_id, moderator_ids=None, start=None, end=None, month=None):
+        """Counts actions taken in [start, end) as a Counter of {(moderator_id, action): n}.
+
+        ``month`` keeps only that month of the year, and ``moderator_ids`` only those moderators.
+        """
+        clause = 'guild_id = ? AND created_at >= ? AND created_at < ?'
+        params = [guild_id, start if start is not None else 0, end if end is not None else 2**62]
+        if month is not None:
+            clause += " AND CAST(strftime('%m', created_at, 'unixepoch') AS INTEGER) = ?"
+            params.append(month)
+        counts = Counter()
+        moderator_ids = list(moderator_ids) if moderator_ids is not None else None
+        chunks = [moderator_ids[i:i + 500] for i in range(0, len(moderator_ids), 500)] if moderator_ids is not None else [None]
+        with self.lock:
+            for chunk in chunks:
+                chunk_clause, chunk_params = clause, params
+                if chunk is not None:
+                    chunk_clause += f" AND moderator_id IN ({', '.join('?' * len(chunk))})"
+                    chunk_params = params + chunk
+                query = f'SELECT moderator_id, action, COUNT(*) FROM mod_actions WHERE {chunk_clause} GROUP BY moderator_id, action'
+                for moderator_id, action, count in self.conn.execute(query, chunk_params):
+                    counts[(moderator_id, action)] += count
+        return counts
+
+    def target_actions(self, guild_id, target_id, limit=10):
+        """Returns the latest (moderator_id, action, created_at, reason) rows taken against a user, newest first."""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT moderator_id, action, created_at, reason FROM mod_actions '
+                'WHERE guild_id = ? AND target_id = ? ORDER BY created_at DESC LIMIT ?',
+                (guild_id, target_id, limit),
+            ).fetchall()
+
+
+def describe_actions(counts):
+    """Formats {action: n} as e.g. '3 kicks, 1 ban'."""
+    return ', '.join(f"{count} {action}{'s' if count != 1 else ''}" for action, count in sorted(counts.items()))
+
+
+def get_mod_ledger(bot):
+    """Returns the bot's shared moderation ledger, opening it on first use."""
+    if getattr(bot, 'mod_ledger', None) is None:
+        bot.mod_ledger = ModerationLedger()
+    return bot.mod_ledger
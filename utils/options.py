@@ -0,0 +1,84 @@
+# utils/options.py
+from datetime import datetime, timezone
+from discord.ext import commands
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m', '%Y')
+
+
+def parse_options(args, flags=(), switches=()):
+    """Splits command arguments into positionals and ``--flag value`` / ``--switch`` options."""
+    positionals = []
+    options = {}
+    args = iter(args)
+    for arg in args:
+        if not arg.startswith('--'):
+            positionals.append(arg)
+            continue
+        name = arg[2:].lower()
+        if name in switches:
+            options[name] = True
+        elif name in flags:
+            value = next(args, None)
+            if value is None:
+                raise commands.BadArgument(f'--{name} needs a value.')
+            options[name] = value
+        else:
+            raise commands.BadArgument(f'Unknown option --{name}.')
+    return positionals, options
+
+
+def parse_month(value):
+    """Parses a month name or its three-letter abbreviation into 1-12, or returns None."""
+    for month_format in ('%B', '%b'):
+        try:
+            return datetime.strptime(value, month_format).month
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date(value, end=False):
+    """Parses YYYY, YYYY-MM or YYYY-MM-DD into an epoch timestamp.
+
+    With ``end=True`` the result is the exclusive end of that period, so ``--to 2024-06``
+    covers all of June.
+    """
+    for date_format in DATE_FORMATS:
+        try:
+            date = datetime.strptime(value, date_format).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        if end:
+            if date_format == '%Y':
+                date = date.replace(year=date.year + 1)
+            elif date_format == '%Y-%m':
+                date = date.replace(year=date.year + (date.month == 12), month=date.month % 12 + 1)
+            else:
+                return int(date.timestamp()) + 86400
+        return int(date.timestamp())
+    raise commands.BadArgument(f'Invalid date "{value}". Use YYYY, YYYY-MM or YYYY-MM-DD.')
+
+
+def parse_range(options):
+    """Returns (start, end) epoch bounds from ``--from``/``--to`` options, or (None, None)."""
+    start = parse_date(options['from']) if 'from' in options else None
+    end = parse_date(options['to'], end=True) if 'to' in options else None
+    if start is not None and end is not None and start >= end:
+        raise commands.BadArgument('--from must be before --to.')
+    return start, end
+
+
+MAX_TOP = 100
+
+
+def parse_top(options, default=None):
+    """Returns the ``--top N`` option as an int from 1 to MAX_TOP, or ``default`` when it's absent."""
+    if 'top' not in options:
+        return default
+    try:
+        top = int(options['top'])
+    except ValueError:
+        raise commands.BadArgument('--top needs a whole number.')
+    if not 1 <= top <= MAX_TOP:
+        raise commands.BadArgument(f'--top must be between 1 and {MAX_TOP}.')
+    return top
@@ -0,0 +1,71 @@
+# utils/pagination.py
+import discord
+
+DEFAULT_TIMEOUT = 180
+
+
+class Paginator(discord.ui.View):
+    """Shows embeds one page at a time with Previous/Next buttons.
+
+    ``build_page(index)`` returns the embed for a page and is only called the first time that
+    page is shown, so the first page goes out without building the rest.
+    """
+
+    def __init__(self, author_id, page_count, build_page, timeout=DEFAULT_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.page_count = page_count
+        self.build_page = build_page
+        self.pages = {}
+        self.index = 0
+        self.message = None
+
+    def page(self, index):
+        if index not in self.pages:
+            embed = self.build_page(index)
+            if self.page_count > 1:
+                footer = embed.footer.text
+                page_text = f'Page {index + 1}/{self.page_count}'
+                embed.set_footer(text=f'{footer} • {page_text}' if footer else page_text)
+            self.pages[index] = embed
+        return self.pages[index]
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= self.page_count - 1
+
+    async def start(self, ctx):
+        if self.page_count <= 1:
+            self.stop()
+            self.message = await ctx.send(embed=self.page(0))
+            return
+        self.update_buttons()
+        self.message = await ctx.send(embed=self.page(0), view=self)
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message('Only the person who ran the command can turn these pages.', ephemeral=True)
+            return False
+        return True
+
+    async def show(self, interaction, index):
+        self.index = index
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.page(index), view=self)
+
+    @discord.ui.button(label='Previous', style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self.show(interaction, max(self.index - 1, 0))
+
+    @discord.ui.button(label='Next', style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction, button):
+        await self.show(interaction, min(self.index + 1, self.page_count - 1))
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
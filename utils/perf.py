@@ -0,0 +1,168 @@
+# utils/perf.py
+import asyncio
+import contextvars
+import functools
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+import aiohttp
+
+# Upper bounds in seconds; a fixed layout keeps an observation to one bisect and one increment
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, float('inf'))
+
+# Name of the command running in the current task, inherited by tasks it spawns
+current_command = contextvars.ContextVar('current_command', default=None)
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count', 'max')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class PerfRegistry:
+    def __init__(self):
+        self.command_latency = defaultdict(Histogram)
+        self.listener_latency = defaultdict(Histogram)
+        self.loop_lag = Histogram()
+        self.rest_calls = Counter()
+        self.rate_limits = Counter()
+        self.global_rate_limits = Counter()
+        self.started_at = time.time()
+        self.lag_task = None
+        self.original_request = None
+        self.metrics_server = None
+        # Passed to the bot as http_trace, so every REST response is seen, including the
+        # 429s discord.py retries itself and that never reach the bot.http.request wrapper
+        self.http_trace = aiohttp.TraceConfig()
+        self.http_trace.on_request_end.append(self.on_request_end)
+
+    def install(self, bot):
+        """Hooks command timing and REST counting into a bot; 429s are counted through http_trace."""
+        original_request = self.original_request = bot.http.request
+
+        async def request(route, **kwargs):
+            self.rest_calls[current_command.get() or 'background'] += 1
+            return await original_request(route, **kwargs)
+
+        bot.http.request = request
+        bot.before_invoke(self.before_command)
+        bot.after_invoke(self.after_command)
+        self.lag_task = asyncio.create_task(self.sample_loop_lag())
+
+    async def uninstall(self, bot):
+        bot.http.request = self.original_request
+        if self.lag_task is not None:
+            self.lag_task.cancel()
+        if self.metrics_server is not None:
+            await self.metrics_server.cleanup()
+            self.metrics_server = None
+
+    async def on_request_end(self, session, context, params):
+        response = params.response
+        if response.status == 429:
+            # Trace callbacks run in the requesting task, so the command is still current here
+            key = current_command.get() or 'background'
+            self.rate_limits[key] += 1
+            if response.headers.get('X-RateLimit-Global') == 'true' or response.headers.get('X-RateLimit-Scope') == 'global':
+                self.global_rate_limits[key] += 1
+
+    async def before_command(self, ctx):
+        ctx.perf_started = time.perf_counter()
+        current_command.set(ctx.command.qualified_name)
+
+    async def after_command(self, ctx):
+        started = getattr(ctx, 'perf_started', None)
+        if started is not None:
+            self.command_latency[ctx.command.qualified_name].observe(time.perf_counter() - started)
+
+    async def sample_loop_lag(self, interval=0.5):
+        # How late a sleep wakes up is how long something else held the event loop
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(loop.time() - started - interval, 0.0))
+
+    def prometheus(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name, help_text, series, label):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for key, hist in series.items():
+                labels = f'{label}="{key}"' if label else ''
+                cumulative = 0
+                for bound, count in zip(BUCKETS, hist.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    bucket_labels = f'{labels},le="{le}"' if labels else f'le="{le}"'
+                    lines.append(f'{name}_bucket{{{bucket_labels}}} {cumulative}')
+                suffix = f'{{{labels}}}' if labels else ''
+                lines.append(f'{name}_sum{suffix} {hist.total}')
+                lines.append(f'{name}_count{suffix} {hist.count}')
+
+        def counter(name, help_text, values):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for key, value in values.items():
+                lines.append(f'{name}{{command="{key}"}} {value}')
+
+        histogram('statwizard_command_seconds', 'Command latency.', self.command_latency, 'command')
+        histogram('statwizard_listener_seconds', 'Event listener latency.', self.listener_latency, 'listener')
+        histogram('statwizard_event_loop_lag_seconds', 'Event loop lag.', {'': self.loop_lag}, None)
+        counter('statwizard_rest_calls_total', 'REST requests issued.', self.rest_calls)
+        counter('statwizard_rate_limits_total', 'REST 429 responses.', self.rate_limits)
+        counter('statwizard_global_rate_limits_total', 'REST 429 responses to the global rate limit.', self.global_rate_limits)
+        return '\n'.join(lines) + '\n'
+
+    async def serve_metrics(self, port, host='127.0.0.1'):
+        from aiohttp import web
+
+        async def metrics(request):
+            return web.Response(text=self.prometheus(), content_type='text/plain')
+
+        app = web.Application()
+        app.router.add_get('/metrics', metrics)
+        self.metrics_server = web.AppRunner(app)
+        await self.metrics_server.setup()
+        await web.TCPSite(self.metrics_server, host, port).start()
+
+
+perf = PerfRegistry()
+
+
+def timed_listener(func):
+    """Records how long an event listener takes; put it below @commands.Cog.listener()."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            perf.listener_latency[func.__name__].observe(time.perf_counter() - started)
+    return wrapper
@@ -0,0 +1,116 @@
+# utils/result_cache.py
+import asyncio
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 256
+# Results for windows that reach the present may lag new messages by this many seconds
+LIVE_STALENESS = 10
+
+
+class InFlight:
+    __slots__ = ('task', 'window', 'waiters', 'stale')
+
+    def __init__(self, task, window):
+        self.task = task
+        self.window = window
+        self.waiters = 0
+        self.stale = False  # a message landed in the window while this was computing
+
+
+class ResultCache:
+    """Caches stats results per guild and deduplicates identical requests that are still running.
+
+    Keys start with the guild ID. Each entry remembers the [start, end) time window it
+    covers (None for open-ended), so a new message only expires the results it changes.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, (start, end), value)
+        self.guild_keys = {}  # guild_id -> set of keys
+        self.in_flight = {}  # key -> InFlight
+
+    async def get_or_compute(self, key, compute, window=(None, None)):
+        """Returns the cached value for ``key``, or awaits ``compute()`` once for all concurrent callers.
+
+        The computation runs in its own task, so cancelling one caller leaves the others waiting;
+        it is only cancelled once every caller has gone.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                return entry[2]
+            self._discard(key)
+
+        flight = self.in_flight.get(key)
+        if flight is None:
+            flight = self.in_flight[key] = InFlight(asyncio.ensure_future(compute()), window)
+            flight.task.add_done_callback(self._finished(key, flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+
+    def _finished(self, key, flight):
+        def callback(task):
+            if self.in_flight.get(key) is flight:
+                del self.in_flight[key]
+            # Mark failures as retrieved even when every caller was cancelled
+            if not task.cancelled() and task.exception() is None:
+                self._store(key, task.result(), flight.window, LIVE_STALENESS if flight.stale else self.ttl)
+        return callback
+
+    def put(self, key, value, window=(None, None)):
+        """Stores ``value`` for ``key`` as if it had just been computed."""
+        self._store(key, value, window, self.ttl)
+
+    def _store(self, key, value, window, ttl):
+        self.entries[key] = (time.monotonic() + ttl, window, value)
+        self.entries.move_to_end(key)
+        self.guild_keys.setdefault(key[0], set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._discard(next(iter(self.entries)))
+
+    def _discard(self, key):
+        self.entries.pop(key, None)
+        keys = self.guild_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.guild_keys[key[0]]
+
+    def invalidate(self, guild_id, timestamp=None):
+        """Drops a guild's results whose window contains ``timestamp`` (all of them if None).
+
+        Windows that reach the present change with every message, so rather than being dropped
+        they expire LIVE_STALENESS seconds later, and commands fired together still share a result.
+        """
+        def contains(window):
+            start, end = window
+            return timestamp is None or ((start is None or start <= timestamp) and (end is None or timestamp < end))
+
+        for key, flight in self.in_flight.items():
+            if key[0] == guild_id and contains(flight.window):
+                flight.stale = True
+        now = time.time()
+        for key in list(self.guild_keys.get(guild_id, ())):
+            expires_at, (start, end), value = self.entries[key]
+            if not contains((start, end)):
+                continue
+            if timestamp is not None and (end is None or end > now):
+                self.entries[key] = (min(expires_at, time.monotonic() + LIVE_STALENESS), (start, end), value)
+            else:
+                self._discard(key)
+
+def get_result_cache(bot):
+    """Returns the bot's shared stats result cache."""
+    if getattr(bot, 'result_cache', None) is None:
+        bot.result_cache = ResultCache()
+    return bot.result_cache
@@ -0,0 +1,57 @@
+# utils/scanner.py
+import asyncio
+import discord
+
+DEFAULT_CONCURRENCY = 5
+DEFAULT_RETRIES = 3
+
+
+def retry_after(error):
+    """Reads the wait time Discord sent with a 429, falling back to one second."""
+    headers = getattr(error.response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After', 1))
+    except ValueError:
+        return 1.0
+
+
+class ChannelScanner:
+    """Crawls several channels at once behind a shared concurrency limit.
+
+    discord.py already waits on its per-route buckets; when a 429 still escapes
+    (usually a global or shared limit) the channel is retried after ``Retry-After``.
+    Channels the bot can't read are reported with a ``None`` result instead of failing the scan.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.retries = retries
+
+    async def _run(self, channel, scan):
+        async with self.semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    return channel, await scan(channel)
+                except discord.Forbidden:
+                    return channel, None
+                except discord.HTTPException as error:
+                    if error.status != 429 or attempt == self.retries:
+                        raise
+                    await asyncio.sleep(retry_after(error))
+
+    async def scan(self, channels, scan):
+        """Runs ``await scan(channel)`` for every channel, yielding (channel, result) as each finishes."""
+        tasks = [asyncio.create_task(self._run(channel, scan)) for channel in channels]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def get_scanner(bot):
+    """Returns the bot's shared channel scanner, so all stats commands share one concurrency budget."""
+    if getattr(bot, 'channel_scanner', None) is None:
+        bot.channel_scanner = ChannelScanner()
+    return bot.channel_scanner
@@ -0,0 +1,157 @@
+# utils/snapshot.py
+import mmap
+import os
+import struct
+import time
+import zlib
+
+SNAPSHOT_PATH = 'snapshot.bin'
+MAGIC = b'SWSNAP\r\n'
+FORMAT_VERSION = 1
+# magic, format version, part count, written at (unix time)
+HEADER = struct.Struct('<8sIId')
+# section name, section version, part number, offset, length, crc32
+PART = struct.Struct('<32sHIQQI')
+# Parts start on 64-byte boundaries so arrays can be read straight out of the mapped file
+ALIGNMENT = 64
+DEFAULT_MAX_AGE = 15 * 60
+
+
+class Section:
+    __slots__ = ('version', 'dump', 'load', 'max_age')
+
+    def __init__(self, version, dump, load, max_age):
+        self.version = version
+        self.dump = dump
+        self.load = load
+        self.max_age = max_age
+
+
+class SnapshotRegistry:
+    """Saves registered in-memory state to one binary file at shutdown and restores it at startup.
+
+    A section registers a ``dump()`` returning a list of bytes-like parts and a ``load(parts, age)``
+    taking memoryviews over the mapped file, which it must copy from. Sections are restored as
+    they register, skipped when their version changed, their checksum fails or they're older
+    than ``max_age`` seconds, and the file is removed once startup is done so it is only ever
+    restored once.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self.sections = {}
+        self.file = None
+        self.mapped = None
+        self.parts = {}  # name -> (version, [(offset, length, crc32)])
+        self.written_at = None
+        self._open()
+
+    def _open(self):
+        try:
+            self.file = open(self.path, 'rb')
+            self.mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # missing or empty file
+            self._close()
+            return
+        try:
+            magic, version, count, written_at = HEADER.unpack_from(self.mapped, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f'unsupported snapshot format {version}')
+            for number in range(count):
+                name, section_version, part, offset, length, crc = PART.unpack_from(self.mapped, HEADER.size + number * PART.size)
+                if offset + length > len(self.mapped):
+                    raise ValueError('truncated snapshot')
+                entry = self.parts.setdefault(name.rstrip(b'\0').decode(), (section_version, []))
+                entry[1].append((offset, length, crc))
+            self.written_at = written_at
+        except (struct.error, ValueError, UnicodeDecodeError) as e:
+            print(f'Ignoring snapshot {self.path}: {e}')
+            self.parts.clear()
+            self._close()
+
+    def register(self, name, version, dump, load, max_age=DEFAULT_MAX_AGE):
+        """Adds a section to future snapshots, restoring it from the current one if it's usable."""
+        self.sections[name] = Section(version, dump, load, max_age)
+        entry = self.parts.pop(name, None)
+        if entry is None or self.mapped is None:
+            return
+        age = time.time() - self.written_at
+        if entry[0] != version:
+            print(f'Snapshot section {name} is version {entry[0]}, expected {version}; starting cold')
+            return
+        if max_age is not None and age > max_age:
+            print(f'Snapshot section {name} is {age:.0f}s old; starting cold')
+            return
+        with memoryview(self.mapped) as view:
+            parts = [view[offset:offset + length] for offset, length, _ in entry[1]]
+            try:
+                if any(zlib.crc32(part) != crc for part, (_, _, crc) in zip(parts, entry[1])):
+                    print(f'Snapshot section {name} failed its checksum; starting cold')
+                    return
+                started = time.perf_counter()
+                load(parts, age)
+                print(f'Restored {name} from snapshot in {(time.perf_counter() - started) * 1000:.1f} ms')
+            except Exception as e:
+                print(f'Could not restore {name} from snapshot: {e}')
+            finally:
+                for part in parts:
+                    part.release()
+
+    def finish_restore(self):
+        """Drops the snapshot once every cog has had the chance to restore from it."""
+        self._close()
+        self.parts.clear()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _close(self):
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def save(self):
+        """Writes every registered section to the snapshot file, replacing it atomically."""
+        started = time.perf_counter()
+        directory = []
+        dumped = []
+        offset = HEADER.size
+        for name, section in self.sections.items():
+            try:
+                parts = section.dump()
+            except Exception as e:
+                print(f'Could not snapshot {name}: {e}')
+                continue
+            for number, part in enumerate(parts):
+                dumped.append(memoryview(part).cast('B'))
+                directory.append((name, section.version, number))
+        offset += len(directory) * PART.size
+
+        entries = []
+        for (name, version, number), part in zip(directory, dumped):
+            offset += -offset % ALIGNMENT
+            entries.append(PART.pack(name.encode(), version, number, offset, len(part), zlib.crc32(part)))
+            offset += len(part)
+
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(entries), time.time()))
+            f.writelines(entries)
+            for part in dumped:
+                f.write(b'\0' * (-f.tell() % ALIGNMENT))
+                f.write(part)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        print(f'Saved snapshot of {len(self.sections)} sections, {offset / 2**20:.1f} MiB, in {time.perf_counter() - started:.2f}s')
+
+
+def get_snapshots(bot):
+    """Returns the bot's snapshot registry, restoring from the last snapshot as sections register."""
+    if getattr(bot, 'snapshots', None) is None:
+        bot.snapshots = SnapshotRegistry()
+    return bot.snapshots
@@ -0,0 +1,97 @@
+# utils/user_cache.py
+import asyncio
+import re
+import time
+from collections import OrderedDict
+import discord
+from discord.ext import commands
+
+DEFAULT_TTL = 600
+DEFAULT_NEGATIVE_TTL = 60
+DEFAULT_MAX_ENTRIES = 5000
+USER_ID = re.compile(r'<@!?([0-9]{15,20})>$|([0-9]{15,20})$')
+
+
+class UserCache:
+    """Caches full user objects from fetch_user, which is a globally rate-limited REST route.
+
+    Unknown IDs are remembered for a shorter time so repeated lookups of them don't reach
+    the API either, and concurrent lookups of one ID share a single request.
+    """
+
+    def __init__(self, bot, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.bot = bot
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # user_id -> (expires_at, user or None if not found)
+        self.in_flight = {}  # user_id -> Future
+
+    async def fetch(self, user_id):
+        """Returns the full user for ``user_id``, raising discord.NotFound if there is none."""
+        entry = self.entries.get(user_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.entries.move_to_end(user_id)
+                if entry[1] is None:
+                    raise discord.NotFound(_NotFoundResponse(), 'Unknown User')
+                return entry[1]
+            del self.entries[user_id]
+
+        future = self.in_flight.get(user_id)
+        if future is None:
+            future = self.in_flight[user_id] = asyncio.ensure_future(self._fetch(user_id))
+            future.add_done_callback(self._fetched(user_id))
+        return await asyncio.shield(future)
+
+    def _fetched(self, user_id):
+        def callback(future):
+            self.in_flight.pop(user_id, None)
+            # Mark failures as retrieved even when every waiter was cancelled
+            future.cancelled() or future.exception()
+        return callback
+
+    async def _fetch(self, user_id):
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            self._store(user_id, None, self.negative_ttl)
+            raise
+        self._store(user_id, user, self.ttl)
+        return user
+
+    def _store(self, user_id, user, ttl):
+        self.entries[user_id] = (time.monotonic() + ttl, user)
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        self.entries.pop(user_id, None)
+
+
+class UserID(commands.Converter):
+    """Converts a user mention or ID to the ID, leaving the fetch to UserCache.
+
+    discord.py's UserConverter calls fetch_user for every uncached ID before the command
+    runs, so lookups through it would never reach the cache. Names still resolve from cache.
+    """
+
+    async def convert(self, ctx, argument):
+        match = USER_ID.match(argument)
+        if match:
+            return int(match.group(1) or match.group(2))
+        return (await commands.UserConverter().convert(ctx, argument)).id
+
+
+class _NotFoundResponse:
+    # discord.NotFound expects an aiohttp response; cached misses only need its status and reason
+    status = 404
+    reason = 'Not Found'
+
+
+def get_user_cache(bot):
+    """Returns the bot's shared user profile cache."""
+    if getattr(bot, 'user_cache', None) is None:
+        bot.user_cache = UserCache(bot)
+    return bot.user_cache
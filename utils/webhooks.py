@@ -0,0 +1,113 @@
+# utils/webhooks.py
+import asyncio
+from collections import deque
+import discord
+from discord.ext import tasks
+
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARACTER_LIMIT = 6000
+DEFAULT_QUEUE_SIZE = 1000
+# How long stop() lets a flush in progress finish before cancelling it
+STOP_TIMEOUT = 10.0
+
+
+class WebhookBatcher:
+    """Delivers log embeds through one long-lived webhook per channel, up to 10 embeds per request.
+
+    Embeds are queued per channel and flushed on a short interval. A queue that fills up
+    drops its oldest embeds rather than growing without bound during a purge.
+    """
+
+    def __init__(self, bot, name, flush_interval=2.0, queue_size=DEFAULT_QUEUE_SIZE):
+        self.bot = bot
+        self.name = name
+        self.queue_size = queue_size
+        self.webhooks = {}
+        self.queues = {}
+        self.dropped = 0
+        self.flushing = False
+        self.flush_loop.change_interval(seconds=flush_interval)
+
+    def start(self):
+        self.flush_loop.start()
+
+    async def stop(self, timeout=STOP_TIMEOUT):
+        """Stops the flush loop, letting a flush in progress drain before delivering what is left."""
+        task = self.flush_loop.get_task()
+        if self.flushing and task is not None:
+            self.flush_loop.stop()
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                print(f'Warning: {self.name} flush still running after {timeout:.0f}s; cancelling it.')
+        self.flush_loop.cancel()
+        await self.flush()
+
+    def enqueue(self, channel, embed):
+        queue = self.queues.get(channel.id)
+        if queue is None:
+            queue = self.queues[channel.id] = deque(maxlen=self.queue_size)
+        if len(queue) == queue.maxlen:
+            self.dropped += 1
+        queue.append(embed)
+
+    async def get_webhook(self, channel):
+        webhook = self.webhooks.get(channel.id)
+        if webhook is None:
+            # Reuse a webhook left over from a previous run before creating a new one
+            for existing in await channel.webhooks():
+                if existing.name == self.name and existing.user == self.bot.user:
+                    webhook = existing
+                    break
+            else:
+                webhook = await channel.create_webhook(name=self.name)
+            self.webhooks[channel.id] = webhook
+        return webhook
+
+    async def send_batch(self, channel, embeds):
+        bot_user = self.bot.user
+        for attempt in range(2):
+            webhook = await self.get_webhook(channel)
+            try:
+                await webhook.send(embeds=embeds, username=bot_user.display_name, avatar_url=bot_user.display_avatar.url)
+                return
+            except discord.NotFound:
+                # Someone deleted the webhook; recreate it once and retry
+                self.webhooks.pop(channel.id, None)
+        print(f'Warning: {self.name} webhook in channel {channel.id} keeps disappearing; sending {len(embeds)} log embeds directly.')
+        await channel.send(embeds=embeds)
+
+    async def flush(self):
+        self.flushing = True
+        try:
+            await self._flush()
+        finally:
+            self.flushing = False
+
+    async def _flush(self):
+        for channel_id, queue in list(self.queues.items()):
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                queue.clear()
+                continue
+            while queue:
+                embeds = [queue.popleft()]
+                size = len(embeds[0])
+                while queue and len(embeds) < EMBEDS_PER_MESSAGE and size + len(queue[0]) <= EMBED_CHARACTER_LIMIT:
+                    size += len(queue[0])
+                    embeds.append(queue.popleft())
+                try:
+                    await self.send_batch(channel, embeds)
+                except asyncio.CancelledError:
+                    # Put the batch back so the final flush on stop still delivers it
+                    queue.extendleft(reversed(embeds))
+                    raise
+                except discord.Forbidden:
+                    print(f'Error: Missing permissions to manage webhooks in channel {channel_id}.')
+                    queue.clear()
+                except discord.HTTPException as e:
+                    print(f'Error: Failed to deliver {len(embeds)} log embeds to channel {channel_id}: {e}')
+
+    @tasks.loop(seconds=2)
+    async def flush_loop(self):
+        await self.flush()